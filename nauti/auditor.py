@@ -1,11 +1,15 @@
-from typing import Optional
+from typing import Optional, Callable, Any, Tuple, List, Iterator, Iterable
+from typing import Awaitable, Dict, Sequence
+import asyncio
 
 from nauti.collection import Collection
-from nauti.diff import DiffResults, diff
-from nauti.log import get_logger
+from nauti.diff import DiffResults, DiffEvent, diff, idiff
+from nauti.filtering import create_filter, parse_constraints
+from nauti.log import get_logger, log_context
+from nauti.igather import iawait
 from nauti.tasks.registrar import _registered_plugins
 from nauti.collection import get_collection
-from nauti.source import get_source
+from nauti.source import Source, get_source
 
 
 _PLUGIN_NAME = "auditors"
@@ -21,6 +25,10 @@ class Auditor(object):
     # The set of field keys
     key_fields = None
 
+    # The field name used to partition the collections when auditing by
+    # shards, for example "site" or "hostname".
+    shard_field = None
+
     def __init__(self, origin: Collection, target: Collection, **options):
         self.name = origin.name
 
@@ -41,37 +49,319 @@ class Auditor(object):
         ident = f"{self.origin.source.name}/{self.name}"
         log.info(f"Fetching {ident} collection ...")
         orig_ff = self.options.get("origin_filter") or self.origin_fetch_filter()
-        await self.origin.fetch(filters=orig_ff)
-
-        log.info(f"Fetched {ident}, fetched {len(self.origin.source_records)} records.")
+        orig_ff, key_filter = self.pushdown(
+            self.origin,
+            self.options.get("origin_include"),
+            fetch_filter=orig_ff,
+            key_filter=self.origin_key_filter,
+        )
+        with self.origin.source.track_progress(f"Fetching {ident}"):
+            await self.fetch_collection(self.origin, orig_ff, key_filter)
 
-        self.origin.make_keys(with_filter=self.origin_key_filter)
+        log.info(f"Fetched {ident}, keyed {len(self.origin.items)} items.")
 
     async def fetch_target(self):
         log = get_logger()
 
         target_ff = self.options.get("target_filter") or self.target_fetch_filter()
+        target_ff, key_filter = self.pushdown(
+            self.target,
+            self.options.get("target_include"),
+            fetch_filter=target_ff,
+            key_filter=self.target_key_filter,
+        )
         ident = f"{self.target.source.name}/{self.name}"
 
         log.info(f"Fetching {ident} collection ...")
 
-        await self.target.fetch(filters=target_ff)
-        log.info(f"Fetched {ident}, fetched {len(self.target.source_records)} records.")
-
-        self.target.make_keys(with_filter=self.target_key_filter)
+        with self.target.source.track_progress(f"Fetching {ident}"):
+            await self.fetch_collection(self.target, target_ff, key_filter)
+
+        log.info(f"Fetched {ident}, keyed {len(self.target.items)} items.")
+
+    async def fetch_collection(self, collection: Collection, fetch_filter, key_filter):
+        """
+        Fetch and key the collection.  When the "incremental" option is set, and
+        the collection supports `fetch_since`, then the collection is refreshed
+        incrementally; see `Collection.fetch_incremental`.
+        The "lean" option enables the collection lean mode, when supported
+        by the collection; see `Collection.supports_lean`.  The collections
+        of multiple source instances are fetched using `fetch_instances`.
+        """
+        if self.options.get("lean") and not collection.lean:
+            if collection.supports_lean:
+                collection.lean = True
+            else:
+                get_logger().warning(
+                    f"{collection.source.name}/{collection.name}: lean mode is not "
+                    "supported, the collection does not define RECORD_FIELDS."
+                )
+
+        if collection.instances:
+            await collection.fetch_instances(
+                with_filter=key_filter, filters=fetch_filter
+            )
+            return
+
+        if not (self.options.get("incremental") and collection.supports_fetch_since):
+            await collection.fetch(filters=fetch_filter)
+            collection.make_keys(with_filter=key_filter)
+            return
+
+        await collection.fetch_incremental(
+            full_sweep_interval=self.options.get("full_sweep_interval"),
+            with_filter=key_filter,
+            filters=fetch_filter,
+        )
 
-    async def audit(self) -> DiffResults:
+    def prepare(self):
+        """ apply the auditor key fields and fields to the collections """
         if self.key_fields:
             self.origin.key_fields = self.target.key_fields = self.key_fields
 
         if self.fields:
             self.origin.fields = self.target.fields = self.fields
 
-        await self.fetch_origin()
-        await self.fetch_target()
-        self.diff_res = diff(origin=self.origin, target=self.target)
+    async def fetch(self):
+        self.prepare()
+
+        with log_context(
+            source=self.origin.source.name, collection=self.name, phase="fetch"
+        ):
+            await self.fetch_origin()
+
+        with log_context(
+            source=self.target.source.name, collection=self.name, phase="fetch"
+        ):
+            await self.fetch_target()
+
+    def compute_diff(self) -> DiffResults:
+        """ diff the fetched origin and target collections """
+        with log_context(collection=self.name, phase="diff"):
+            self.diff_res = diff(
+                origin=self.origin,
+                target=self.target,
+                engine=self.options.get("diff_engine") or "python",
+            )
+
         return self.diff_res
 
+    async def audit(self) -> DiffResults:
+        await self.fetch()
+        return self.compute_diff()
+
+    @staticmethod
+    async def audit_targets(auditors: Sequence["Auditor"]) -> List[DiffResults]:
+        """
+        Audit one origin collection against multiple targets.  The origin
+        collection of the first auditor is fetched and keyed once, and is then
+        shared, read-only, by all of the auditors; so the auditors are
+        expected to use the same origin source, filters, and key fields.  The
+        target collections are fetched and diffed concurrently.
+
+        The Caller is expected to have logged into the origin and target
+        sources.
+
+        Returns
+        -------
+        The list of DiffResults, in the order of the `auditors`.
+        """
+        first = auditors[0]
+        first.prepare()
+
+        with log_context(
+            source=first.origin.source.name, collection=first.name, phase="fetch"
+        ):
+            await first.fetch_origin()
+
+        async def audit_target(auditor: Auditor):
+            auditor.origin = first.origin
+            auditor.prepare()
+
+            with log_context(
+                source=auditor.target.source.name,
+                collection=auditor.name,
+                phase="fetch",
+            ):
+                await auditor.fetch_target()
+
+            return auditor.compute_diff()
+
+        return list(await asyncio.gather(*map(audit_target, auditors)))
+
+    async def iaudit(self) -> Iterator[DiffEvent]:
+        """
+        Fetch the origin and target collections, and return the `idiff`
+        iterator of diff events rather than the complete DiffResults.
+        """
+        await self.fetch()
+        return idiff(origin=self.origin, target=self.target)
+
+    @staticmethod
+    def pushdown(
+        collection: Collection,
+        constraints: Optional[List[str]],
+        fetch_filter: Optional[Any],
+        key_filter: Callable[[dict], bool],
+    ) -> Tuple[Optional[Any], Callable[[dict], bool]]:
+        """
+        Push the "<field>=<value>" `constraints` down into the collection fetch
+        filter.  The constraints that the collection could not translate are
+        applied client-side, in addition to the `key_filter`, when the records
+        are keyed.
+
+        Returns
+        -------
+        Tuple of the fetch filter and key filter to use.
+        """
+        if not constraints:
+            return fetch_filter, key_filter
+
+        field_names = collection.fields or collection.FIELDS
+
+        fetch_filter, remaining = collection.pushdown_filter(
+            parse_constraints(constraints, field_names), filters=fetch_filter
+        )
+
+        if not remaining:
+            return fetch_filter, key_filter
+
+        get_logger().debug(
+            f"{collection.source.name}/{collection.name}: "
+            f"client-side filtering: {remaining}"
+        )
+
+        remaining_filter = create_filter(
+            constraints=[f"{fieldn}={value}" for fieldn, value in remaining],
+            field_names=field_names,
+        )
+
+        def filter_fn(item: dict):
+            return remaining_filter(item) and key_filter(item)
+
+        return fetch_filter, filter_fn
+
+    # -------------------------------------------------------------------------
+    # Sharded audits
+    # -------------------------------------------------------------------------
+
+    async def shard_values(self) -> List[str]:
+        """
+        Returns the list of shard values used to partition the audit.  By
+        default these are provided by the "shards" option; a subclass could
+        override this method to discover them, for example from the sites
+        collection.
+        """
+        if not (shards := self.options.get("shards")):
+            raise RuntimeError(f"Auditor {self.name}: no shard values provided.")
+
+        return list(shards)
+
+    def fresh(self) -> "Auditor":
+        """
+        Returns a new auditor, with the same options, using new collections
+        bound to the same sources; see `Collection.fresh`.
+        """
+        auditor = self.__class__(origin=self.origin.fresh(), target=self.target.fresh())
+        auditor.options = dict(self.options)
+        return auditor
+
+    def shard_auditor(self, shard: str) -> "Auditor":
+        """
+        Returns a new auditor, using new collections bound to the same sources,
+        that is constrained to the items where the shard field matches the
+        `shard` value.  The `shard` value is a create_filter style value, so
+        that a hostname prefix can be given as "atl.*"
+        """
+        shard_field = self.options.get("shard_field") or self.shard_field
+        constraint = f"{shard_field}={shard}"
+
+        auditor = self.fresh()
+        for include in ("origin_include", "target_include"):
+            auditor.options[include] = [*(self.options.get(include) or []), constraint]
+
+        return auditor
+
+    def shard_unpushed(self, shard: str) -> List[Collection]:
+        """
+        Returns the list of the origin and target collections that cannot push
+        the `shard` constraint down into their fetch filter; each partition of
+        these collections is fetched in full, and filtered client-side.
+        """
+        shard_field = self.options.get("shard_field") or self.shard_field
+        unpushed = list()
+
+        for collection in (self.origin, self.target):
+            constraints = parse_constraints(
+                [f"{shard_field}={shard}"], collection.fields or collection.FIELDS
+            )
+            _, remaining = collection.pushdown_filter(constraints)
+            if remaining:
+                unpushed.append(collection)
+
+        return unpushed
+
+    async def audit_shards(
+        self,
+        shards: Iterable[str],
+        on_diff: Callable[[str, DiffResults], Awaitable],
+        limit: Optional[int] = 1,
+    ):
+        """
+        Audit the collection one partition at a time, where each partition is
+        constrained by a shard value; see `shard_auditor`.  Each partition is
+        fetched, keyed, and diffed, and the results are passed to the `on_diff`
+        coroutine, for example to report and reconcile them.  The partition
+        data is released before the next partition is audited so that peak
+        memory scales with the largest partition rather than the whole
+        collection.
+
+        The shard field must be a field whose value is the same in the origin
+        and target for a given item; otherwise the item will appear as an add
+        in one partition and a delete in another.  A warning is logged for a
+        collection that cannot push the shard constraint down into the fetch,
+        since each partition would then fetch the whole collection.
+
+        The Caller is expected to have logged into the origin and target
+        sources, since they are shared by all of the partitions.
+
+        Parameters
+        ----------
+        shards:
+            The shard values, see `shard_values`.
+
+        on_diff:
+            The coroutine called with (shard, diff_results) for each partition.
+
+        limit:
+            The number of partitions to audit concurrently.
+        """
+        if not (self.options.get("shard_field") or self.shard_field):
+            raise RuntimeError(f"Auditor {self.name}: no shard field provided.")
+
+        log = get_logger()
+        shards = list(shards)
+
+        for collection in self.shard_unpushed(shards[0]) if shards else ():
+            log.warning(
+                f"Auditor {self.name}: {collection.source.name}/{collection.name} "
+                "cannot push down the shard constraint; each shard fetches the "
+                "whole collection."
+            )
+
+        async def audit_shard(shard):
+            auditor = self.shard_auditor(shard)
+            log.info(f"Auditing {self.name} shard: {shard}")
+
+            try:
+                await on_diff(shard, await auditor.audit())
+            finally:
+                auditor.origin.clear()
+                auditor.target.clear()
+                auditor.diff_res = None
+
+        await iawait((audit_shard(shard) for shard in shards), limit=limit or 1)
+
     def origin_fetch_filter(self):  # noqa
         """ returns a source specific fetch filter for the origin source """
         return None
@@ -99,13 +389,65 @@ class Auditor(object):
 
     @staticmethod
     def get_registered(
-        origin: str, target: str, collection: str, name=None
+        origin: str,
+        target: str,
+        collection: str,
+        name=None,
+        sources: Optional[Dict[str, Source]] = None,
+        origin_instances: Optional[Sequence[str]] = None,
+        target_instances: Optional[Sequence[str]] = None,
     ) -> "Auditor":
+        """
+        Returns the registered auditor instance for the given origin, target,
+        and collection names; or an Auditor instance if there is not one
+        registered.
+
+        When `sources` is provided, it is used as a cache of Source instances
+        by name so that the Caller can share the sources, and their logins,
+        across auditors.
+
+        When `origin_instances` or `target_instances` are provided, the
+        collection is the merged collection of the named source instances,
+        see `Collection.fetch_instances`.
+        """
 
         key = (name or "default", origin, target, collection)
         cls = _registered_plugins[_PLUGIN_NAME].get(key) or Auditor
 
+        def instance_collection(source_name, instances):
+            if not instances:
+                return get_collection(get_source(source_name), collection)
+
+            inst_sources = {
+                inst_name: get_source(source_name, instance=inst_name)
+                for inst_name in instances
+            }
+            return get_collection(
+                next(iter(inst_sources.values())), collection, instances=inst_sources
+            )
+
+        if sources is None:
+            return cls(
+                origin=instance_collection(origin, origin_instances),
+                target=instance_collection(target, target_instances),
+            )
+
+        def shared_collection(source_name, instances):
+            inst_sources = dict()
+
+            for inst_name in instances or (None,):
+                src_key = f"{source_name}/{inst_name}" if inst_name else source_name
+                if src_key not in sources:
+                    sources[src_key] = get_source(source_name, instance=inst_name)
+                inst_sources[inst_name] = sources[src_key]
+
+            primary = next(iter(inst_sources.values()))
+            if not instances:
+                return get_collection(primary, collection)
+
+            return get_collection(primary, collection, instances=inst_sources)
+
         return cls(
-            origin=get_collection(get_source(origin), collection),
-            target=get_collection(get_source(target), collection),
+            origin=shared_collection(origin, origin_instances),
+            target=shared_collection(target, target_instances),
         )
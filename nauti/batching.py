@@ -0,0 +1,85 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Iterable, Iterator, List, Optional, Any
+from urllib.parse import quote
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["chunk_query_values", "DEFAULT_MAX_QUERY_LENGTH"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The default maximum length of the query string built from the values of a
+# multi-value filter, which leaves room for the rest of the URL within the
+# common 8KB request-line limit of web servers.
+DEFAULT_MAX_QUERY_LENGTH = 4000
+
+
+def chunk_query_values(
+    values: Iterable[Any],
+    param: str,
+    max_length: Optional[int] = DEFAULT_MAX_QUERY_LENGTH,
+    max_count: Optional[int] = None,
+) -> Iterator[List[Any]]:
+    """
+    Split the `values` of a multi-value query parameter, for example
+    "?name=a&name=b", into chunks so that the query string of each chunk is no
+    longer than `max_length`, and no chunk has more than `max_count` values.
+    A single value that is longer than `max_length` is returned in its own
+    chunk.
+
+    Parameters
+    ----------
+    values:
+        The filter values
+
+    param:
+        The query parameter name, used to size the query string.
+
+    max_length:
+        The maximum length of each chunk query string.
+
+    max_count:
+        The maximum number of values in each chunk.
+    """
+    chunk, length = list(), 0
+    param_len = len(quote(param)) + 2  # for the "&" and "="
+
+    for value in values:
+        value_len = param_len + len(quote(str(value), safe=""))
+
+        if chunk and (
+            length + value_len > max_length or (max_count and len(chunk) >= max_count)
+        ):
+            yield chunk
+            chunk, length = list(), 0
+
+        chunk.append(value)
+        length += value_len
+
+    if chunk:
+        yield chunk
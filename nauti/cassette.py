@@ -0,0 +1,242 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import json
+import time
+import asyncio
+import hashlib
+from base64 import b64encode, b64decode
+from pathlib import Path
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Optional, Dict, Tuple, Deque
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+import httpx
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "Cassette",
+    "CassetteTransport",
+    "CASSETTE_MODES",
+    "use_cassettes",
+    "get_cassette",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+CASSETTE_MODES = ("record", "replay")
+
+# `g_cassettes` is the dict of the cassette mode, directory, latency scale, and
+# the cassettes by source, used by all of the Source clients; see
+# `use_cassettes`.
+
+g_cassettes: ContextVar[Optional[Dict]] = ContextVar("cassettes", default=None)
+
+
+def use_cassettes(mode: str, directory: Path, latency_scale: Optional[float] = 1.0):
+    """
+    Record the requests and responses of all of the Source clients into, or
+    replay them from, the cassette files in the `directory`; one file per
+    source instance.
+
+    Parameters
+    ----------
+    mode:
+        One of `CASSETTE_MODES`.
+
+    directory:
+        The cassettes directory.
+
+    latency_scale:
+        The replayed responses are delayed by their recorded latency
+        multiplied by this value; 0 replays without delay.
+    """
+    if mode not in CASSETTE_MODES:
+        raise RuntimeError(f"Unsupported cassette mode: {mode}")
+
+    directory = Path(directory)
+    if mode == "record":
+        directory.mkdir(parents=True, exist_ok=True)
+
+    g_cassettes.set(
+        dict(mode=mode, directory=directory, latency_scale=latency_scale, cassettes={})
+    )
+
+
+def get_cassette(source) -> Optional["Cassette"]:
+    """returns the cassette of the `source` instance, if cassettes are used"""
+    if (settings := g_cassettes.get()) is None:
+        return None
+
+    name = f"{source.name}-{source.instance}"
+    if (cassette := settings["cassettes"].get(name)) is None:
+        cassette = settings["cassettes"][name] = Cassette(
+            settings["directory"].joinpath(f"{name}.jsonl"),
+            mode=settings["mode"],
+            latency_scale=settings["latency_scale"],
+        )
+
+    return cassette
+
+
+class Cassette(object):
+    """
+    The JSON-lines file of the recorded requests and responses of a source.
+    The responses are replayed by matching the request method, URL, and body;
+    identical requests are replayed in the order they were recorded.
+
+    Parameters
+    ----------
+    filepath:
+        The cassette file
+
+    mode:
+        One of `CASSETTE_MODES`.
+
+    latency_scale:
+        The multiplier of the recorded latency of the replayed responses.
+    """
+
+    def __init__(self, filepath: Path, mode: str, latency_scale: Optional[float] = 1.0):
+        self.filepath = Path(filepath)
+        self.mode = mode
+        self.latency_scale = latency_scale or 0
+        self.responses: Dict[Tuple, Deque[Dict]] = defaultdict(deque)
+
+        if mode == "record":
+            self.filepath.write_text("")
+            return
+
+        if not self.filepath.exists():
+            raise RuntimeError(f"Cassette not found: {self.filepath}")
+
+        with self.filepath.open() as ifile:
+            for line in ifile:
+                entry = json.loads(line)
+                self.responses[self._entry_key(entry)].append(entry)
+
+    @staticmethod
+    def _entry_key(entry: Dict) -> Tuple:
+        return entry["method"], entry["url"], entry["body_hash"]
+
+    @staticmethod
+    def request_entry(request: httpx.Request) -> Dict:
+        return dict(
+            method=request.method,
+            url=str(request.url),
+            body_hash=hashlib.sha256(request.content).hexdigest(),
+        )
+
+    def record(
+        self,
+        request: httpx.Request,
+        response: httpx.Response,
+        content: bytes,
+        elapsed: float,
+    ):
+        entry = self.request_entry(request)
+        entry.update(
+            status=response.status_code,
+            headers=response.headers.multi_items(),
+            content=b64encode(content).decode(),
+            elapsed=elapsed,
+        )
+
+        with self.filepath.open("a") as ofile:
+            ofile.write(json.dumps(entry) + "\n")
+
+    def match(self, request: httpx.Request) -> Dict:
+        """
+        Returns the recorded response entry of the `request`.  The last of the
+        recorded responses is replayed for any additional identical requests.
+        """
+        entry = self.request_entry(request)
+
+        if not (responses := self.responses.get(self._entry_key(entry))):
+            raise RuntimeError(
+                f"Cassette {self.filepath.name}: no recorded response for "
+                f"{request.method} {request.url}"
+            )
+
+        return responses.popleft() if len(responses) > 1 else responses[0]
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a transport to record the requests and responses, with their
+    latency, into the `cassette`; or, in replay mode, to serve the recorded
+    responses without sending the requests.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, cassette: Cassette):
+        self.transport = transport
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+
+        if self.cassette.mode == "replay":
+            entry = self.cassette.match(request)
+
+            if delay := entry["elapsed"] * self.cassette.latency_scale:
+                await asyncio.sleep(delay)
+
+            return httpx.Response(
+                status_code=entry["status"],
+                headers=entry["headers"],
+                stream=httpx.ByteStream(b64decode(entry["content"])),
+                request=request,
+                extensions={"nauti_cassette": "replay"},
+            )
+
+        started = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+
+        # the response is recorded with its raw content, still encoded, so that
+        # the client decodes it as it would the original response.
+
+        try:
+            content = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+
+        self.cassette.record(request, response, content, time.monotonic() - started)
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=httpx.ByteStream(content),
+            request=request,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -1,2 +1,3 @@
 from .__main__ import main
 from . import sync
+from . import watch
@@ -9,7 +9,8 @@ from parsimonious.exceptions import ParseError
 
 from nauti.config import load_config_file
 from nauti import consts
-from nauti.log import setup_logging
+from nauti.log import setup_logging, stop_logging, set_log_format, LOG_FORMATS
+from nauti.cassette import use_cassettes
 
 VERSION = metadata.version("nauti")
 
@@ -24,9 +25,39 @@ VERSION = metadata.version("nauti")
     default=lambda: os.environ.get(consts.ENV_CONFIG_FILE, consts.DEFAULT_CONFIG_FILE),
     callback=lambda ctx, param, value: load_config_file(filepath=value),
 )
-def cli(**kwargs):  # noqa
+@click.option(
+    "--log-format",
+    help="log output format",
+    type=click.Choice(LOG_FORMATS),
+    default=lambda: os.environ.get(consts.ENV_LOG_FORMAT, "text"),
+    callback=lambda ctx, param, value: set_log_format(value),
+)
+@click.option(
+    "--record",
+    help="record the source requests and responses into this cassettes directory",
+    type=click.Path(file_okay=False),
+)
+@click.option(
+    "--replay",
+    help="replay the source responses from this cassettes directory",
+    type=click.Path(file_okay=False, exists=True),
+)
+@click.option(
+    "--replay-latency",
+    help="scale of the recorded latency of the replayed responses, 0 for none",
+    type=click.FloatRange(min=0),
+    default=1.0,
+)
+def cli(record, replay, replay_latency, **kwargs):  # noqa
     """ Network automation tools integrator """
-    pass
+    if record and replay:
+        raise click.UsageError("--record cannot be used with --replay")
+
+    if record:
+        use_cassettes("record", record)
+
+    elif replay:
+        use_cassettes("replay", replay, latency_scale=replay_latency)
 
 
 def main():
@@ -46,6 +77,12 @@ def main():
     except (httpx.ReadTimeout, httpx.PoolTimeout) as exc:
         print(f"FAIL: HTTP read timeout on URL: {exc.request.url}")
         print(f"BODY: {exc.request.stream._body}")  # noqa
+        if isinstance(exc, httpx.PoolTimeout):
+            print(
+                "HINT: the connection pool is smaller than the request concurrency;"
+                " see the source concurrency, max_connections, and pool_timeout"
+                " options."
+            )
 
     except RuntimeError as exc:
         import traceback
@@ -53,6 +90,9 @@ def main():
         print(exc.args[0])
         traceback.print_exc(limit=3)
 
+    finally:
+        stop_logging()
+
 
 if __name__ == "__main__":
     main()
@@ -13,40 +13,235 @@
 #      You should have received a copy of the GNU General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import sys
 import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import List, Dict, Tuple, Sequence, Optional
+
 import click
 
 from nauti.cli.__main__ import cli
 from .cli_opts import opt_dry_run  # opt_verbose, csv_list
-from nauti.diff import diff_report
+from nauti.diff import diff_report, DiffResults, DIFF_REPORT_FORMATS, DIFF_ENGINES
 
 from nauti.auditor import Auditor
+from nauti.collection import Collection
+from nauti.source import Source, DEFAULT_INSTANCE
 
 from nauti.tasks.reconile import Reconciler
-from nauti.log import get_logger
+from nauti.tasks.plan import estimate_plan, plan_report
+from nauti.journal import WriteJournal
+from nauti.log import get_logger, set_log_stream
+
+
+@asynccontextmanager
+async def login(*collections: Collection):
+    """log into the sources, of each source instance, of the `collections`"""
+    async with AsyncExitStack() as stack:
+        entered = set()
+
+        for collection in collections:
+            for source in collection.sources:
+                if id(source) not in entered:
+                    entered.add(id(source))
+                    await stack.enter_async_context(source)
+
+        yield
+
+
+async def run_reconcile(reconciler, journal: WriteJournal = None):
+    origin, target = reconciler.origin, reconciler.target
+
+    async with login(origin, target):
+        if not journal:
+            await reconciler.reconcile()
+            return
+
+        await run_target_reconcile(reconciler, journal)
+
+
+async def run_stream_reconcile(auditor: Auditor, sync_opts):
+    async with login(auditor.origin, auditor.target):
+        events = await auditor.iaudit()
+        diff_res = DiffResults(origin=auditor.origin, target=auditor.target)
+
+        if (reconciler := Reconciler.get_registered(diff_res, name="default")) is None:
+            get_logger().error("Missing registered reconcile task")
+            return
+
+        reconciler.options = sync_opts
+        await reconciler.reconcile_events(events, actions=sync_opts)
+
+
+async def run_sharded_audit(auditor: Auditor, options):
+    sync_opts = options["sync_action"]
+
+    async def on_diff(shard, diff_res):  # noqa
+        diff_report(
+            diff_res,
+            reports=options.get("diff_report"),
+            fmt=options["diff_format"],
+            output=options["diff_output"],
+        )
 
+        if not sync_opts:
+            return
 
-async def run_reconcile(reconciler):
-    diff_res = reconciler.diff_res
-    origin, target = diff_res.origin, diff_res.target
-    sync_opts = reconciler.options
+        if (reconciler := get_reconciler(diff_res, sync_opts, options)) is None:
+            return
 
-    async with origin.source, target.source:
-        if diff_res.missing and any(("all" in sync_opts, "add" in sync_opts)):
-            await reconciler.add_items()
+        if options["dry_run"]:
+            plan_report(reconciler, estimate_plan(reconciler, sync_opts))
+            return
 
-        if diff_res.extras and any(("all" in sync_opts, "del" in sync_opts)):
-            await reconciler.delete_items()
+        await reconciler.reconcile()
 
-        if diff_res.changes and any(("all" in sync_opts, "upd" in sync_opts)):
-            await reconciler.update_items()
+    async with login(auditor.origin, auditor.target):
+        await auditor.audit_shards(
+            shards=await auditor.shard_values(),
+            on_diff=on_diff,
+            limit=options["shard_limit"],
+        )
 
 
 async def run_audit(auditor: Auditor):
-    async with auditor.origin.source, auditor.target.source:
+    async with login(auditor.origin, auditor.target):
         return await auditor.audit()
 
 
+async def run_multi_target(
+    auditors: List[Auditor], sources: Dict[str, Source], options: Dict
+):
+    """
+    Audit the origin collection against each of the auditor targets, fetching
+    the origin once, then report and reconcile each target concurrently.
+    """
+    async with AsyncExitStack() as stack:
+        for source in sources.values():
+            await stack.enter_async_context(source)
+
+        diff_results = await Auditor.audit_targets(auditors)
+
+        for diff_res in diff_results:
+            diff_report(
+                diff_res,
+                reports=options.get("diff_report"),
+                fmt=options["diff_format"],
+                output=options["diff_output"],
+                title=target_label(diff_res.target),
+            )
+
+        if not (sync_opts := options["sync_action"]):
+            return
+
+        reconcilers = list()
+
+        for diff_res in diff_results:
+            target_name = target_label(diff_res.target)
+            if (reconciler := get_reconciler(diff_res, sync_opts, options)) is None:
+                continue
+
+            if options["dry_run"]:
+                plan_report(reconciler, estimate_plan(reconciler, sync_opts))
+                continue
+
+            if not options["journal"]:
+                reconcilers.append(reconciler.reconcile())
+                continue
+
+            journal = begin_journal(
+                diff_res.origin.source.name,
+                target_name,
+                diff_res.origin.name,
+                diff_res=diff_res,
+                sync_opts=sync_opts,
+            )
+            reconcilers.append(run_target_reconcile(reconciler, journal))
+
+        await asyncio.gather(*reconcilers)
+
+
+def get_reconciler(
+    diff_res: DiffResults, sync_opts: Sequence[str], options: Dict
+) -> Optional[Reconciler]:
+    """
+    Returns the registered reconciler of the `diff_res`, for the `sync_opts`
+    actions, with its phases run concurrently when the --concurrent-phases
+    option is given; or None, reporting the error, when there is none.
+    """
+    if (reconciler := Reconciler.get_registered(diff_res, name="default")) is None:
+        get_logger().error(
+            f"Missing registered reconcile task: {target_label(diff_res.target)}"
+        )
+        return None
+
+    reconciler.options = sync_opts
+
+    if options.get("concurrent_phases"):
+        reconciler.concurrent_phases = True
+
+    return reconciler
+
+
+async def run_target_reconcile(reconciler: Reconciler, journal: WriteJournal):
+    try:
+        with journal.observe():
+            await reconciler.reconcile()
+        journal.complete()
+    finally:
+        journal.close()
+
+
+def parse_target(spec: str, target_instances: Sequence[str]) -> Tuple[str, Sequence]:
+    """
+    Returns the tuple of the target source name and instance names of the
+    `spec`, "<name>[:<instance>]"; the `target_instances` are used when the
+    spec does not name an instance.
+    """
+    name, _, instance = spec.partition(":")
+    if not instance:
+        return name, target_instances
+
+    if target_instances:
+        raise click.UsageError(f"--target {spec} cannot be used with --target-instance")
+
+    return name, (instance,)
+
+
+def target_label(collection: Collection) -> str:
+    """
+    Returns the name of the target, used in the reports and the journal file
+    name; the source name, with the instance names when not the default.
+    """
+    instances = [source.instance for source in collection.sources]
+    if instances == [DEFAULT_INSTANCE]:
+        return collection.source.name
+
+    return f"{collection.source.name}:{'+'.join(instances)}"
+
+
+def begin_journal(
+    origin: str,
+    target: str,
+    collection: str,
+    diff_res: DiffResults,
+    sync_opts: Sequence[str],
+) -> WriteJournal:
+    """
+    Returns the new write journal of the origin/target/collection, with the
+    planned writes of the `diff_res`.  The journal file errors are reported as
+    usage errors.
+    """
+    try:
+        journal = WriteJournal.for_sync(origin, target, collection)
+        journal.begin(diff_res, sync_opts)
+
+    except OSError as exc:
+        raise click.ClickException(f"Unable to write the reconcile journal: {exc}")
+
+    return journal
+
+
 def opt_extra_callback(ctx, param, value):
     extras = dict()
 
@@ -64,18 +259,62 @@ def opt_extra_callback(ctx, param, value):
 @cli.command("sync")
 @click.option("--spec", help="user-defined sync task name", default="default")
 @click.option("--origin", help="origin source name", required=True)
-@click.option("--target", help="target source name", required=True)
+@click.option(
+    "--target",
+    "targets",
+    help="target source name[:instance]; repeat to sync the origin to multiple targets",
+    required=True,
+    multiple=True,
+)
 @click.option("--collection", help="collection name", required=True)
 @click.option(
     "--filter-name", "auditor", help="user-defined sync filter name", default="default"
 )
+@click.option(
+    "--origin-instance",
+    help="origin source instance name; repeat to merge multiple instances",
+    multiple=True,
+)
+@click.option(
+    "--target-instance",
+    help="target source instance name; repeat to merge multiple instances",
+    multiple=True,
+)
 @click.option("--origin-filter", help="origin specific filter expression")
+@click.option(
+    "--origin-include",
+    help="origin <field>=<value> constraint, pushed down into the fetch when supported",
+    multiple=True,
+)
+@click.option(
+    "--target-include",
+    help="target <field>=<value> constraint, pushed down into the fetch when supported",
+    multiple=True,
+)
 @click.option(
     "--diff-report",
     "--dr",
     type=click.Choice(["all", "add", "del", "upd"]),
     multiple=True,
 )
+@click.option(
+    "--diff-format",
+    help="diff report format, of the items selected by --diff-report",
+    type=click.Choice(DIFF_REPORT_FORMATS),
+    default="table",
+)
+@click.option(
+    "--diff-engine",
+    help="diff engine; numpy, the nauti[columnar] extra, for very large collections",
+    type=click.Choice(DIFF_ENGINES),
+    default="python",
+)
+@click.option(
+    "--diff-output",
+    help="diff report output file",
+    type=click.File("w"),
+    default="-",
+)
 @click.option(
     "--sync-action",
     "--sync",
@@ -83,6 +322,11 @@ def opt_extra_callback(ctx, param, value):
     type=click.Choice(["all", "add", "del", "upd"]),
     multiple=True,
 )
+@click.option(
+    "--concurrent-phases",
+    is_flag=True,
+    help="run the add, delete, and update phases of the reconcile concurrently",
+)
 @click.option(
     "-e",
     "--extra",
@@ -91,23 +335,141 @@ def opt_extra_callback(ctx, param, value):
     multiple=True,
     callback=opt_extra_callback,
 )
+@click.option(
+    "--shard-by", "shard_field", help="audit the collection partitioned by this field"
+)
+@click.option(
+    "--shard",
+    "shards",
+    help="shard field value (expression), used with --shard-by",
+    multiple=True,
+)
+@click.option(
+    "--shard-limit",
+    help="number of shards audited concurrently",
+    type=click.IntRange(min=1),
+    default=1,
+)
+@click.option(
+    "--lean",
+    is_flag=True,
+    help="keep only the write-relevant attributes of the keyed source records",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="reconcile the diff items as they are found, without a diff report",
+)
+@click.option(
+    "--journal",
+    is_flag=True,
+    help="journal the reconcile writes so that an interrupted reconcile can be resumed",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="resume the interrupted reconcile from the write journal, without an audit",
+)
 @opt_dry_run
 @click.pass_context
-def cli_sync(ctx, origin, target, collection, **options):
+def cli_sync(ctx, origin, targets, collection, **options):
+
+    # when the jsonl/csv report rows are written to stdout, the logs, and so
+    # the progress, are written to stderr so they do not mix with the rows.
+
+    if (
+        options["diff_format"] != "table"
+        and getattr(options["diff_output"], "name", None) == "<stdout>"
+    ):
+        set_log_stream(sys.stderr)
+
+    if len(targets) > 1:
+        cli_sync_targets(ctx, origin, targets, collection, options)
+        return
+
+    target, target_instances = parse_target(targets[0], options["target_instance"])
 
     # ensure that there is a sync task registered for this
     # origin/target/collection, and if not exit with error.
 
     auditor = Auditor.get_registered(
-        origin=origin, target=target, collection=collection, name=options["auditor"]
+        origin=origin,
+        target=target,
+        collection=collection,
+        name=options["auditor"],
+        origin_instances=options["origin_instance"],
+        target_instances=target_instances,
     )
 
     auditor.options = options
+    target = target_label(auditor.target)
 
     loop = asyncio.get_event_loop()
+
+    if options["resume"]:
+        if options["stream"]:
+            ctx.fail("--resume cannot be used with --stream")
+
+        try:
+            journal = WriteJournal.for_sync(origin, target, collection)
+        except OSError as exc:
+            raise click.ClickException(f"Unable to read the reconcile journal: {exc}")
+
+        if (resumed := journal.load(auditor.origin, auditor.target)) is None:
+            ctx.fail(f"No interrupted reconcile to resume: {journal.filepath}")
+
+        diff_res, sync_opts = resumed
+        get_logger().info(
+            f"Resuming reconcile, {len(journal.done)} writes done, "
+            f"{diff_res.count} remaining."
+        )
+
+        if (reconciler := get_reconciler(diff_res, sync_opts, options)) is None:
+            return
+
+        if options["dry_run"]:
+            plan_report(reconciler, estimate_plan(reconciler, sync_opts))
+            return
+
+        # the loaded journal is continued, so that the resumed writes are
+        # journaled as done.
+
+        try:
+            journal.open()
+        except OSError as exc:
+            raise click.ClickException(f"Unable to write the reconcile journal: {exc}")
+
+        loop.run_until_complete(run_reconcile(reconciler, journal))
+        return
+
+    if options["stream"]:
+        if not (sync_opts := options["sync_action"]):
+            ctx.fail("--stream requires --sync-action")
+
+        if options["dry_run"]:
+            ctx.fail("--stream cannot be used with --dry-run")
+
+        loop.run_until_complete(run_stream_reconcile(auditor, sync_opts))
+        return
+
+    if options["shard_field"] or auditor.shard_field:
+        if not options["shards"] and type(auditor).shard_values is Auditor.shard_values:
+            raise click.UsageError("--shard-by requires the --shard values")
+
+        loop.run_until_complete(run_sharded_audit(auditor, options))
+        return
+
+    if options["shards"]:
+        raise click.UsageError("--shard requires --shard-by")
+
     diff_res = loop.run_until_complete(run_audit(auditor))
 
-    diff_report(diff_res, reports=options.get("diff_report"))
+    diff_report(
+        diff_res,
+        reports=options.get("diff_report"),
+        fmt=options["diff_format"],
+        output=options["diff_output"],
+    )
 
     if not (sync_opts := options["sync_action"]):
         return
@@ -115,13 +477,56 @@ def cli_sync(ctx, origin, target, collection, **options):
     # Determine if there is a reconciler class registered for this combination.
     # if not, then report the error and exit.
 
-    if (reconciler := Reconciler.get_registered(diff_res, name="default")) is None:
-        get_logger().error("Missing registered reconcile task")
+    if (reconciler := get_reconciler(diff_res, sync_opts, options)) is None:
         return
 
-    # Execute the sync reconcile process.
+    # In dry-run mode report the estimated cost of the reconcile process
+    # rather than executing it.
 
-    reconciler.options = sync_opts
-    loop.run_until_complete(run_reconcile(reconciler))
+    if options["dry_run"]:
+        plan_report(reconciler, estimate_plan(reconciler, sync_opts))
+        return
+
+    # Execute the sync reconcile process, optionally journaling the writes so
+    # that an interrupted reconcile can be resumed.
+
+    journal = (
+        begin_journal(origin, target, collection, diff_res, sync_opts)
+        if options["journal"]
+        else None
+    )
+    loop.run_until_complete(run_reconcile(reconciler, journal))
 
     # all done.
+
+
+def cli_sync_targets(ctx, origin, targets, collection, options):
+    """sync the origin collection to each of the `targets`"""
+    for opt_name, opt_flag in (
+        ("stream", "--stream"),
+        ("resume", "--resume"),
+        ("shard_field", "--shard-by"),
+    ):
+        if options[opt_name]:
+            ctx.fail(f"{opt_flag} cannot be used with multiple targets")
+
+    sources = dict()
+    auditors = list()
+
+    for spec in dict.fromkeys(targets):
+        target, target_instances = parse_target(spec, options["target_instance"])
+        auditor = Auditor.get_registered(
+            origin=origin,
+            target=target,
+            collection=collection,
+            name=options["auditor"],
+            sources=sources,
+            origin_instances=options["origin_instance"],
+            target_instances=target_instances,
+        )
+        auditor.options = options
+        auditors.append(auditor)
+
+    asyncio.get_event_loop().run_until_complete(
+        run_multi_target(auditors, sources, options)
+    )
@@ -0,0 +1,116 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import click
+
+from nauti.cli.__main__ import cli
+from nauti.auditor import Auditor
+from nauti.watch import Watcher, WatchTask
+
+
+def opt_audit_callback(ctx, param, value):  # noqa
+    audits = list()
+
+    for audit_expr in value:
+        try:
+            origin, target, collection = audit_expr.split(":")
+        except ValueError:
+            ctx.fail(
+                f"Invalid audit expression: {audit_expr}, "
+                "expected origin:target:collection"
+            )
+
+        audits.append((origin, target, collection))
+
+    return audits
+
+
+@cli.command("watch")
+@click.option(
+    "--audit",
+    "audits",
+    help="origin:target:collection to audit",
+    multiple=True,
+    required=True,
+    callback=opt_audit_callback,
+)
+@click.option(
+    "--filter-name", "auditor", help="user-defined sync filter name", default="default"
+)
+@click.option(
+    "--interval",
+    help="seconds between audits",
+    type=click.FloatRange(min=1),
+    default=300,
+)
+@click.option(
+    "--sync-action",
+    "--sync",
+    help="reconcile action(s) applied after each audit",
+    type=click.Choice(["all", "add", "del", "upd"]),
+    multiple=True,
+)
+@click.option(
+    "--max-changes",
+    help="skip the reconcile when the diff count exceeds this value",
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="refresh the collections that support it with fetch-since",
+)
+@click.option(
+    "--full-sweep",
+    help="seconds between the full fetches of incrementally refreshed collections",
+    type=click.FloatRange(min=1),
+    default=3600,
+)
+@click.option(
+    "--lean",
+    is_flag=True,
+    help="keep only the write-relevant attributes of the keyed source records",
+)
+@click.option("--host", help="status endpoint address", default="127.0.0.1")
+@click.option("--port", help="status endpoint port", type=int, default=8765)
+def cli_watch(audits, interval, sync_action, max_changes, host, port, **options):
+    """Periodically audit, and optionally reconcile, collections"""
+    sources = dict()
+    tasks = list()
+
+    for origin, target, collection in audits:
+        auditor = Auditor.get_registered(
+            origin=origin,
+            target=target,
+            collection=collection,
+            name=options["auditor"],
+            sources=sources,
+        )
+        auditor.options["lean"] = options["lean"]
+
+        tasks.append(
+            WatchTask(
+                auditor,
+                interval=interval,
+                sync_actions=sync_action,
+                max_changes=max_changes,
+                incremental=options["incremental"],
+                full_sweep_interval=options["full_sweep"],
+            )
+        )
+
+    watcher = Watcher(tasks, sources=sources)
+    asyncio.get_event_loop().run_until_complete(watcher.run(host=host, port=port))
@@ -17,10 +17,13 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
-from typing import List, Dict, Any, Callable, Tuple, Optional, Type
+from typing import List, Dict, Any, Callable, Tuple, Optional, Type, Iterable, Set
+from typing import Hashable
 from abc import ABC
 from operator import itemgetter
 from functools import lru_cache
+import asyncio
+from time import time
 
 # -----------------------------------------------------------------------------
 # Public Imports
@@ -32,8 +35,12 @@ from functools import lru_cache
 
 from nauti.log import get_logger
 from nauti.source import Source
+from nauti.progress import Progress
 from nauti.config import get_config
 from nauti.config_models import CollectionsModel
+from nauti.batching import chunk_query_values, DEFAULT_MAX_QUERY_LENGTH
+from nauti.igather import iawait
+from nauti.indexes import ItemIndex
 
 __all__ = ["Collection", "CollectionMixin", "CollectionCallback", "get_collection"]
 
@@ -62,6 +69,16 @@ class CollectionMixin(object):
     # the collection provides a subset of FIELDS.
     NO_FIELDS = None
 
+    # List of field name tuples used to create the secondary indexes of the
+    # collection items, for example (("hostname",), ("hostname", "ipaddr")).
+    INDEXES = None
+
+    # List of the source record attributes that are kept in the
+    # `source_record_keys` when the collection is in lean mode, for example
+    # ("id", "site").  These are the attributes needed to write to the source,
+    # and must include those used by `record_uid`.  See `project_record`.
+    RECORD_FIELDS = None
+
 
 class Collection(ABC, CollectionMixin):
 
@@ -74,7 +91,8 @@ class Collection(ABC, CollectionMixin):
     async def fetch(self, **fetch_args):
         """
         This method is used to fetch source records of information and append
-        them into the `source_records` attribute.
+        them into the `source_records` attribute.  The records of paginated
+        source APIs should be fetched using `nauti.paginate.Paginator`.
 
         Other Parameters
         ----------------
@@ -92,7 +110,10 @@ class Collection(ABC, CollectionMixin):
         source based on the items in another.
 
         This subclass is expected to implement this method by making concurrent
-        calls to the `fetch` method; thus ensuring a consisten behavior.
+        calls to the `fetch` method; thus ensuring a consisten behavior.  When
+        the source API supports multi-value filters, the subclass should use
+        `fetch_coalesced` so that the items are fetched in a few batched
+        requests rather than one request per item.
 
         Parameters
         ----------
@@ -106,6 +127,16 @@ class Collection(ABC, CollectionMixin):
         """ Translate a source specific record into a dict of field items """
         raise NotImplementedError()
 
+    def record_uid(self, rec: Any) -> Optional[Hashable]:
+        """
+        Returns the source specific unique ID of the record, for example the
+        NetBox object ID.  When provided, the collection tracks the key of each
+        record so that `upsert_records` can remove the previous item of a
+        record whose key fields have changed.  By default records do not have
+        a uid.
+        """
+        return None
+
     async def add_items(
         self, items: Dict, callback: Optional[CollectionCallback] = None
     ):
@@ -124,6 +155,113 @@ class Collection(ABC, CollectionMixin):
         """ remove the `items` from the collection """
         raise NotImplementedError()
 
+    # -------------------------------------------------------------------------
+    #
+    #                     Optional Subclass Methods
+    #
+    # -------------------------------------------------------------------------
+
+    def pushdown_filter(
+        self, constraints: List[Tuple[str, str]], filters: Optional[Any] = None
+    ) -> Tuple[Optional[Any], List[Tuple[str, str]]]:
+        """
+        This method is used to translate normalized field constraints into the
+        source specific fetch filter so that only the needed records are
+        fetched from the source.  The subclass is expected to translate the
+        constraints that the source API supports, for example using
+        `nauti.filtering.is_literal` to select the values that can be matched
+        exactly, and return the remaining constraints so that the Caller can
+        apply them once the records are itemized.
+
+        The default implementation does not push down any constraints.
+
+        Parameters
+        ----------
+        constraints: List[Tuple[str, str]]
+            The list of (field-name, value) constraints, as returned by
+            `nauti.filtering.parse_constraints`.
+
+        filters: Any, optional
+            The source specific fetch filter that was otherwise going to be
+            used; the subclass must merge the translated constraints into it.
+
+        Returns
+        -------
+        Tuple of the fetch filter to use, and the list of constraints that were
+        not pushed down.
+        """
+        return filters, constraints
+
+    async def fetch_since(self, watermark: Any, **fetch_args):
+        """
+        This method is used to fetch only the source records that were created
+        or modified since the `watermark`, and append them into the
+        `source_records` attribute.  Collections that implement this method
+        must also implement `record_watermark`.  See `fetch_incremental`.
+
+        Parameters
+        ----------
+        watermark:
+            The largest `record_watermark` value of the previous fetch.
+
+        Other Parameters
+        ----------------
+        The same as `fetch`.
+        """
+        raise NotImplementedError()
+
+    def record_watermark(self, rec: Any) -> Optional[Any]:
+        """
+        Returns the last-modified value of the source record, for example the
+        ISO-8601 timestamp string.  The value must be comparable with the
+        values of other records; the largest is the collection `watermark`.
+        """
+        raise NotImplementedError()
+
+    def project_record(self, rec: Any) -> Any:
+        """
+        Returns the projection of the source record that is kept in the
+        `source_record_keys` when the collection is in lean mode; that is only
+        the write-relevant attributes of the record, such as the uid and parent
+        ids.  The `record_uid` method must support the projected record.  By
+        default the `RECORD_FIELDS` of a dict record are kept, or the record
+        when RECORD_FIELDS is not defined.
+        """
+        if not (rec_fields := self.RECORD_FIELDS) or not isinstance(rec, dict):
+            return rec
+
+        return {field: rec[field] for field in rec_fields if field in rec}
+
+    def response_record(self, res: Any) -> Optional[Any]:
+        """
+        Returns the source record of the response of a write, for example the
+        JSON object of the created or updated NetBox record, so that the write
+        is applied to the collection by `write_through`.  By default None,
+        meaning the written item is applied to the collection without a
+        source record.
+        """
+        return None
+
+    def fetch_batch_args(self, field: str, values: List[Any]) -> Dict:
+        """
+        Returns the `fetch` arguments used to fetch the records where the
+        normalized `field` value is any one of the `values`; that is a source
+        specific multi-value filter, for example "?name=a&name=b".  This method
+        is required by `fetch_coalesced`.
+        """
+        raise NotImplementedError()
+
+    @property
+    def supports_fetch_since(self) -> bool:
+        return type(self).fetch_since is not Collection.fetch_since
+
+    @property
+    def supports_lean(self) -> bool:
+        """ True when the collection projects the records kept in lean mode """
+        return bool(self.RECORD_FIELDS) or (
+            type(self).project_record is not Collection.project_record
+        )
+
     # -------------------------------------------------------------------------
     #
     #                     Class Init
@@ -164,15 +302,61 @@ class Collection(ABC, CollectionMixin):
 
         self.source_record_keys: Dict[Tuple, Any] = dict()
 
+        # `indexes` is a dict key=<field-names-tuple>, value=<ItemIndex> of the
+        # secondary indexes of `items`, used by `query`.  By default these are
+        # created from the class definition; see also `add_index`.
+
+        self.indexes: Dict[Tuple[str, ...], ItemIndex] = {
+            tuple(fields): ItemIndex(fields) for fields in self.__class__.INDEXES or ()
+        }
+
+        # `uid_keys` is a dict key=<record-uid>, value=<fields-key> used to find
+        # the current key of a source record; see `record_uid`.
+
+        self.uid_keys: Dict[Hashable, Tuple] = dict()
+
+        # `key_translate` is the key translate function given to `make_keys`
+        # so that the same keys are formed by `upsert_records` and `rekey`.
+
+        self.key_translate: Optional[Callable] = None
+
+        # `lean` when True, the `source_record_keys` values are the projected
+        # source records, see `project_record`, and the `source_records` are
+        # released once they are keyed.  By default this is taken from the
+        # collection config option "lean".
+
+        self.lean = False
+
         # The Source instance providing connectivity for the Collection
         # processing.
 
         self.source = source
 
+        # `instances` is a dict key=<source-instance-name>, value=<Collection>
+        # of the per source instance collections that are fetched and merged
+        # into this collection, see `fetch_instances`; empty when the
+        # collection uses a single source instance.
+
+        self.instances: Dict[str, "Collection"] = dict()
+
+        # `provenance` is a dict key=<fields-key>, value=<source-instance-name>
+        # of the merged items, used to write the item back to the source
+        # instance it came from; see `instance_of`.
+
+        self.provenance: Dict[Tuple, str] = dict()
+
+        # `watermark` is the largest `record_watermark` value of the fetched
+        # records, and `swept` is the time of the last full fetch; both are
+        # used to refresh the collection incrementally, see `fetch_incremental`.
+
+        self.watermark: Optional[Any] = None
+        self.swept: Optional[float] = None
+
         # `cache` is expected to be used by the subclass to store information
-        # that it may need across various calls; for example caching device
-        # records that may have information required by processing other
-        # collections (ipaddrs).
+        # that it may need across various calls.  References that are needed
+        # by other collections, for example the device records required when
+        # processing ipaddrs, should use the resolvers shared by the source;
+        # see `Source.resolver`.
 
         self.cache = dict()
 
@@ -188,7 +372,7 @@ class Collection(ABC, CollectionMixin):
         with_translate=None,
         with_inventory=None,
     ):
-        if not len(self.source_records):
+        if not len(with_inventory or self.source_records):
             get_logger().info(
                 f"Collection {self.name}:{self.source_class.__name__}: inventory empty."
             )
@@ -199,16 +383,48 @@ class Collection(ABC, CollectionMixin):
         # again.
 
         self.key_fields = key_fields or self.key_fields
+        self.key_translate = with_translate or self.key_translate
+
+        if not with_inventory:
+            self._clear_items()
+
+        self.upsert_records(with_inventory or self.source_records, with_filter)
+
+        if self.lean:
+            self.source_records.clear()
+
+    def upsert_records(
+        self,
+        records: Iterable[Any],
+        with_filter: Optional[Callable[[Dict], bool]] = None,
+        instance: Optional[str] = None,
+    ) -> List[Tuple]:
+        """
+        Itemize and key the source `records`, adding them to, or replacing
+        them in, the collection `items`, `source_record_keys`, and `indexes`.
+        If a record has a `record_uid` that was previously keyed with
+        different key, then the previous item is removed.  The records are not
+        added to `source_records`.  In lean mode the projected records are
+        stored in `source_record_keys`.  When `instance` is given it is the
+        `provenance` of the upserted items, otherwise the provenance of an
+        existing item is kept.
 
+        Returns
+        -------
+        The list of the upserted item keys.
+        """
         with_filter = with_filter if with_filter else lambda x: True
-        with_translate = with_translate or (lambda x: x)
+        with_translate = self.key_translate or (lambda x: x)
 
         kf_getter = itemgetter(*self.key_fields)
+        upserted = list()
 
-        if not with_inventory:
-            self.items.clear()
+        records = records if isinstance(records, list) else list(records)
+        progress = Progress(f"Keying {self.name}", total=len(records))
+
+        for rec in records:
+            progress.advance()
 
-        for rec in with_inventory or self.source_records:
             try:
 
                 # allow the itemize function to return None, indicating that
@@ -231,8 +447,434 @@ class Collection(ABC, CollectionMixin):
                 )
 
             as_key = with_translate(kf_getter(item))
-            self.items[as_key] = item
-            self.source_record_keys[as_key] = rec
+            if instance is not None:
+                self.provenance[as_key] = instance
+
+            self._set_item(as_key, item, rec)
+            upserted.append(as_key)
+
+        progress.close()
+        return upserted
+
+    def remove_keys(self, keys: Iterable[Tuple]):
+        """ remove the items, and their source records, by key """
+        for key in keys:
+            self._remove_item(key)
+
+    def remove_records(self, records: Iterable[Any]):
+        """
+        Remove the items of the source `records`.  The records are found by
+        their `record_uid` when supported, or otherwise by their item key.
+        """
+        kf_getter = itemgetter(*self.key_fields)
+        with_translate = self.key_translate or (lambda x: x)
+
+        for rec in records:
+            if not self.instances and (uid := self.record_uid(rec)) is not None:
+                if (key := self.uid_keys.get(uid)) is not None:
+                    self._remove_item(key)
+                continue
+
+            if (item := self.itemize(rec)) is not None:
+                self._remove_item(with_translate(kf_getter(item)))
+
+    def rekey(self, *key_fields, with_translate=None):
+        """
+        Re-key the existing items using the new `key_fields`, without
+        re-itemizing the source records.  The item `provenance` is kept.
+        """
+        self.key_fields = key_fields or self.key_fields
+        self.key_translate = with_translate or self.key_translate
+
+        kf_getter = itemgetter(*self.key_fields)
+        with_translate = self.key_translate or (lambda x: x)
+
+        recs, provenance = self.source_record_keys, self.provenance
+        keyed = [
+            (item, recs[key], provenance.get(key)) for key, item in self.items.items()
+        ]
+        self._clear_items()
+
+        for item, rec, inst_name in keyed:
+            as_key = with_translate(kf_getter(item))
+            if inst_name is not None:
+                provenance[as_key] = inst_name
+
+            self._set_item(as_key, item, rec)
+
+    def write_through(self, action: str, key: Tuple, item: Dict, res: Any):
+        """
+        Apply the result `res` of a reconcile write to the collection `items`
+        and `source_record_keys`, so that the collection is current without a
+        refetch.
+
+        Parameters
+        ----------
+        action: str
+            One of "add", "del", "upd".
+
+        key: tuple
+            The item key
+
+        item: dict
+            The added item, or the field changes of the updated item.
+
+        res:
+            The write result, see `response_record`.
+        """
+        if action == "del":
+            self._remove_item(key)
+            return
+
+        if (rec := self.response_record(res)) is not None:
+            self.upsert_records([rec], instance=self.provenance.get(key))
+            return
+
+        rec = self.source_record_keys.get(key)
+        if action == "upd" and (prev_item := self.items.get(key)) is not None:
+            item = {**prev_item, **item}
+
+        self._set_item(key, item, rec)
+
+    def _clear_items(self):
+        self.items.clear()
+        self.source_record_keys.clear()
+        self.uid_keys.clear()
+        self.provenance.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+    def _remove_item(self, key: Tuple):
+        if (item := self.items.pop(key, None)) is None:
+            return
+
+        rec = self.source_record_keys.pop(key, None)
+
+        uid = self._uid_key(key, rec)
+        if uid is not None and self.uid_keys.get(uid) == key:
+            del self.uid_keys[uid]
+
+        self.provenance.pop(key, None)
+
+        for index in self.indexes.values():
+            index.remove(key, item)
+
+    def _uid_key(self, key: Tuple, rec: Any) -> Optional[Hashable]:
+        # the uid of the records of merged source instances are only unique
+        # within the instance.
+
+        if (uid := self.record_uid(rec)) is None or not self.instances:
+            return uid
+
+        return self.provenance.get(key), uid
+
+    def _set_item(self, key: Tuple, item: Dict, rec: Any):
+        if self.lean:
+            rec = self.project_record(rec)
+
+        if (uid := self._uid_key(key, rec)) is not None:
+            if (prev_key := self.uid_keys.get(uid)) is not None and prev_key != key:
+                self._remove_item(prev_key)
+            self.uid_keys[uid] = key
+
+        if self.indexes:
+            if (prev_item := self.items.get(key)) is not None:
+                for index in self.indexes.values():
+                    index.remove(key, prev_item)
+
+            for index in self.indexes.values():
+                index.add(key, item)
+
+        self.items[key] = item
+        self.source_record_keys[key] = rec
+
+    # -------------------------------------------------------------------------
+    #
+    #                     Secondary Indexes
+    #
+    # -------------------------------------------------------------------------
+
+    def add_index(self, *fields: str) -> ItemIndex:
+        """
+        Add a secondary index on the item `fields`, building it from the
+        existing items.  The index is kept up to date as items are keyed.
+        """
+        if (index := self.indexes.get(fields)) is not None:
+            return index
+
+        index = self.indexes[fields] = ItemIndex(fields)
+        for key, item in self.items.items():
+            index.add(key, item)
+
+        return index
+
+    def query(self, **field_values) -> Set[Tuple]:
+        """
+        Returns the set of item keys where the item fields match the given
+        `field_values`, for example `query(hostname="sw1")`.  The lookup uses
+        the index on exactly these fields if there is one; otherwise the items
+        are scanned.
+        """
+        fields = tuple(field_values)
+
+        index = self.indexes.get(fields) or next(
+            (
+                index
+                for index_fields, index in self.indexes.items()
+                if set(index_fields) == set(fields)
+            ),
+            None,
+        )
+
+        if index is not None:
+            value = tuple(field_values[field] for field in index.fields)
+            return set(index.get(value if len(value) > 1 else value[0]))
+
+        return {
+            key
+            for key, item in self.items.items()
+            if all(item.get(field) == value for field, value in field_values.items())
+        }
+
+    def query_items(self, **field_values) -> List[Dict]:
+        """ Returns the list of items that match the `field_values`, see `query` """
+        return [self.items[key] for key in self.query(**field_values)]
+
+    async def fetch_incremental(
+        self,
+        full_sweep_interval: Optional[float] = None,
+        with_filter: Optional[Callable[[Dict], bool]] = None,
+        **fetch_args,
+    ) -> bool:
+        """
+        Refresh the collection using `fetch_since` when possible.  The records
+        fetched since the collection `watermark` are keyed and merged into the
+        existing `items` and `source_record_keys`.  A full fetch, or "sweep",
+        is made when the collection is empty, there is no watermark, or the
+        last sweep is older than `full_sweep_interval` seconds; the sweep is
+        what removes the items that were deleted from the source.
+
+        Returns
+        -------
+        True if the refresh was incremental, False if it was a full fetch.
+        """
+        if (
+            self.watermark is None
+            or not self.items
+            or (
+                full_sweep_interval is not None
+                and (time() - (self.swept or 0)) >= full_sweep_interval
+            )
+        ):
+            self.clear()
+            await self.fetch(**fetch_args)
+            watermark = self._max_watermark(self.source_records, None)
+            self.make_keys(with_filter=with_filter)
+            self.watermark, self.swept = watermark, time()
+            return False
+
+        start = len(self.source_records)
+        await self.fetch_since(self.watermark, **fetch_args)
+
+        if changed := self.source_records[start:]:
+            self.upsert_records(changed, with_filter)
+            self.watermark = self._max_watermark(changed, self.watermark)
+
+        # the changed records are kept in the `source_record_keys`, so they
+        # are not accumulated in the `source_records` by each refresh.
+
+        del self.source_records[start:]
+        return True
+
+    # -------------------------------------------------------------------------
+    #
+    #                     Source Instances
+    #
+    # -------------------------------------------------------------------------
+
+    @property
+    def sources(self) -> List[Source]:
+        """ the Source instances used by the collection """
+        return [col.source for col in self.instances.values()] or [self.source]
+
+    def instance_of(self, key: Tuple) -> "Collection":
+        """
+        Returns the collection of the source instance that the item `key` came
+        from, so that writes of the item are made to that source instance; or
+        this collection when it uses a single source instance.  The items, and
+        source records, of the instance collections are released once merged,
+        so they are only found in this collection.
+        """
+        if not self.instances:
+            return self
+
+        inst_col = self.instances.get(self.provenance.get(key))
+        return self if inst_col is None else inst_col
+
+    async def fetch_instances(
+        self, with_filter: Optional[Callable[[Dict], bool]] = None, **fetch_args
+    ):
+        """
+        Fetch and key the collections of each of the source `instances`
+        concurrently, each within the concurrency of its own source instance,
+        and merge their items into this collection.  The `provenance` of each
+        item is the name of the source instance it came from.  When the same
+        key is found in more than one instance, the item of the last instance
+        is used.  The instance collections are cleared as they are merged.
+
+        Other Parameters
+        ----------------
+        The same as `fetch`.
+        """
+
+        async def fetch_instance(inst_name: str, inst_col: Collection):
+            inst_col.key_fields, inst_col.fields = self.key_fields, self.fields
+            inst_col.key_translate, inst_col.lean = self.key_translate, self.lean
+
+            with inst_col.source.track_progress(
+                f"Fetching {inst_col.source.name}/{inst_name}/{self.name}"
+            ):
+                await inst_col.fetch(**fetch_args)
+
+            inst_col.make_keys(with_filter=with_filter)
+
+        await asyncio.gather(
+            *(
+                fetch_instance(inst_name, inst_col)
+                for inst_name, inst_col in self.instances.items()
+            )
+        )
+
+        self.clear()
+        log = get_logger()
+
+        for inst_name, inst_col in self.instances.items():
+            recs = inst_col.source_record_keys
+
+            for key, item in inst_col.items.items():
+                if (prev_name := self.provenance.get(key)) is not None:
+                    log.warning(
+                        f"Collection {self.name}: item {key} found in instances "
+                        f"{prev_name} and {inst_name}, using {inst_name}."
+                    )
+                    self._remove_item(key)
+
+                self.provenance[key] = inst_name
+                self._set_item(key, item, recs[key])
+
+            inst_col.clear()
+
+    async def fetch_coalesced(
+        self,
+        field: str,
+        values: Iterable[Any],
+        param: Optional[str] = None,
+        max_length: Optional[int] = DEFAULT_MAX_QUERY_LENGTH,
+        max_count: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[Any, List[Any]]:
+        """
+        Fetch the records where the normalized `field` value is any one of the
+        `values`.  The values are deduplicated and grouped into batches of
+        bounded query length, see `nauti.batching.chunk_query_values`, and
+        each batch is fetched concurrently using the `fetch_batch_args`.  The
+        fetched records are appended into `source_records` as with `fetch`.
+
+        Parameters
+        ----------
+        field:
+            The normalized field name
+
+        values:
+            The normalized field values
+
+        param:
+            The source query parameter name, used to size the batches; by
+            default the `field` name.
+
+        max_length:
+            The maximum query string length of each batch.
+
+        max_count:
+            The maximum number of values in each batch.
+
+        limit:
+            The maximum number of concurrent batch fetches.
+
+        Returns
+        -------
+        The dict of key=<value>, value=<list of fetched source records> so that
+        the Caller can demultiplex the records back to the requested items.
+        """
+        values = list(dict.fromkeys(values))
+        start = len(self.source_records)
+
+        batches = chunk_query_values(
+            values, param or field, max_length=max_length, max_count=max_count
+        )
+
+        await iawait(
+            (self.fetch(**self.fetch_batch_args(field, batch)) for batch in batches),
+            limit=limit,
+        )
+
+        by_value = {value: list() for value in values}
+
+        for rec in self.source_records[start:]:
+            if (item := self.itemize(rec)) is None:
+                continue
+
+            if (recs := by_value.get(item.get(field))) is not None:
+                recs.append(rec)
+
+        return by_value
+
+    def _max_watermark(self, records, watermark):
+        marks = (mark for rec in records if (mark := self.record_watermark(rec)))
+        return max(marks, default=watermark)
+
+    def clear(self):
+        """ release the fetched source records and the keyed items """
+        self.source_records.clear()
+        self._clear_items()
+
+    def fresh(self) -> "Collection":
+        """
+        Returns a new, empty, collection of the same class that is bound to the
+        same source, and source instances, and uses the same config, fields,
+        keys, and indexes.  The new collection can be fetched while this
+        collection is still in use.
+        """
+        col = self.__class__(source=self.source)
+        col.config, col.lean = self.config, self.lean
+        col.fields, col.key_fields = self.fields, self.key_fields
+        col.key_translate = self.key_translate
+
+        for fields in self.indexes:
+            col.add_index(*fields)
+
+        col.instances = {
+            inst_name: inst_col.fresh()
+            for inst_name, inst_col in self.instances.items()
+        }
+        return col
+
+    def copy_items(self, other: "Collection"):
+        """
+        Replace the keyed items of this collection with a copy of those of the
+        `other` collection, and its watermark; for example so that a fresh
+        collection can be refreshed incrementally.
+        """
+        self._clear_items()
+        self.items.update(other.items)
+        self.source_record_keys.update(other.source_record_keys)
+        self.uid_keys.update(other.uid_keys)
+        self.provenance.update(other.provenance)
+        self.watermark, self.swept = other.watermark, other.swept
+
+        for index in self.indexes.values():
+            for key, item in self.items.items():
+                index.add(key, item)
 
     @lru_cache()
     def map_field_value(self, field, value):
@@ -273,7 +915,15 @@ class Collection(ABC, CollectionMixin):
         return len(self.source_records)
 
 
-def get_collection(source: Source, name: str) -> Collection:
+def get_collection(
+    source: Source, name: str, instances: Optional[Dict[str, Source]] = None
+) -> Collection:
+    """
+    Returns the collection `name` of the `source`.  When the `instances` dict of
+    key=<source-instance-name>, value=<Source> is provided, the collection is
+    the merged collection of the source instances, see
+    `Collection.fetch_instances`.
+    """
     cfg = get_config()
 
     if name not in cfg.collections:
@@ -295,4 +945,20 @@ def get_collection(source: Source, name: str) -> Collection:
 
     col_obj: Collection = cls(source=source)
     col_obj.config = cfg.collections.get(name)
+
+    if (col_obj.config.options or {}).get("lean"):
+        if col_obj.supports_lean:
+            col_obj.lean = True
+        else:
+            get_logger().warning(
+                f"{source.name}/{name}: lean mode is not supported, the "
+                "collection does not define RECORD_FIELDS."
+            )
+
+    if instances:
+        col_obj.instances = {
+            inst_name: get_collection(inst_source, name)
+            for inst_name, inst_source in instances.items()
+        }
+
     return col_obj
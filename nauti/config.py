@@ -18,6 +18,7 @@
 # -----------------------------------------------------------------------------
 
 import os
+from pathlib import Path
 from typing import TextIO
 from contextvars import ContextVar
 
@@ -41,7 +42,13 @@ from nauti import consts
 # -----------------------------------------------------------------------------
 
 
-__all__ = ["get_config", "load_config_file", "load_default_config_file", "ConfigModel"]
+__all__ = [
+    "get_config",
+    "get_state_dir",
+    "load_config_file",
+    "load_default_config_file",
+    "ConfigModel",
+]
 
 # -----------------------------------------------------------------------------
 #
@@ -56,6 +63,21 @@ def get_config() -> ConfigModel:
     return g_config.get()
 
 
+def get_state_dir() -> Path:
+    """
+    Returns the directory used to persist the nauti state files, creating it if
+    needed.  The directory is taken from the environment variable, or is the
+    default directory next to the configuration file.
+    """
+    if not (state_dir := os.environ.get(consts.ENV_STATE_DIR)):
+        cfg_dir = Path(get_config().config_file).parent
+        state_dir = cfg_dir.joinpath(consts.DEFAULT_STATE_DIR)
+
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    return state_dir
+
+
 def load_config_file(filepath: TextIO) -> ConfigModel:
 
     try:
@@ -112,6 +112,11 @@ class SourceInstanceModel(BaseModel):
 
 class SourcesModel(BaseModel):
     default: SourceInstanceModel
+
+    # additional named instances of the source, for example regional
+    # instances, see `get_source`.
+    instances: Optional[Dict[str, SourceInstanceModel]] = Field(default_factory=dict)
+
     vars: Optional[Dict[str, EnvSecretStr]]
     expands: Optional[Dict[str, BiDict]]
     maps: Optional[Dict[str, BiDict]]
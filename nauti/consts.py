@@ -15,3 +15,6 @@
 
 DEFAULT_CONFIG_FILE = "nauti.toml"
 ENV_CONFIG_FILE = "NAUTI_CONFIG"
+ENV_LOG_FORMAT = "NAUTI_LOG_FORMAT"
+ENV_STATE_DIR = "NAUTI_STATE_DIR"
+DEFAULT_STATE_DIR = ".nauti"
@@ -13,22 +13,60 @@
 #      You should have received a copy of the GNU General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Dict, Callable, Optional, Iterable
+import sys
+import csv
+import json
+from typing import Dict, Callable, Optional, Iterable, Iterator, Tuple, TextIO
+from typing import NamedTuple
 from tabulate import tabulate
 from operator import itemgetter
-from dataclasses import dataclass
+from dataclasses import dataclass, field as dc_field
 
 from nauti.collection import Collection
 
+DIFF_REPORT_FORMATS = ("table", "jsonl", "csv")
+DIFF_ENGINES = ("python", "numpy")
+
 
 @dataclass()
 class DiffResults(object):
     origin: Collection
     target: Collection
-    count: int
-    missing: dict
-    extras: dict
-    changes: dict
+    count: int = 0
+    missing: dict = dc_field(default_factory=dict)
+    extras: dict = dc_field(default_factory=dict)
+    changes: dict = dc_field(default_factory=dict)
+
+
+class DiffEvent(NamedTuple):
+    """
+    A single diff result produced by `idiff`.  The `action` is one of "add",
+    "del", or "upd".  The `item` is the origin item for "add", the target item
+    for "del", and the dict of changed fields for "upd"; that is the same
+    values found in the DiffResults missing, extras, and changes dicts.
+    """
+
+    action: str
+    key: Tuple
+    item: Dict
+
+
+def _identity(value):
+    return value
+
+
+def _fields_cmp(
+    origin: Collection,
+    fields: Optional[Iterable] = None,
+    fields_cmp: Optional[Dict[str, Callable]] = None,
+) -> Dict[str, Callable]:
+    fields_cmp = dict(fields_cmp or {})
+
+    for field_name in fields or origin.fields or origin.FIELDS:
+        if field_name not in fields_cmp:
+            fields_cmp[field_name] = _identity
+
+    return fields_cmp
 
 
 def diff(
@@ -36,6 +74,7 @@ def diff(
     target: Collection,
     fields: Optional[Iterable] = None,
     fields_cmp: Optional[Dict[str, Callable]] = None,
+    engine: Optional[str] = "python",
 ):
     """
     The source and other collections have already been fetched, fingerprinted, and keyed.
@@ -62,12 +101,25 @@ def diff(
         `str.lower` to convert a field (hostname) to lower for comparison
         purposes.
 
+    engine:
+        The diff engine, one of `DIFF_ENGINES`.  The "numpy" engine is the
+        columnar engine, see `nauti.diff_columnar`, used for collections of
+        millions of items; it requires numpy.
+
     Returns
     -------
     DiffResults:
         missing: Dict[Tuple]
         changes: List[Tuple[Dict, Dict]]
     """
+    if engine == "numpy":
+        from nauti.diff_columnar import columnar_diff
+
+        return columnar_diff(origin, target, fields=fields, fields_cmp=fields_cmp)
+
+    if engine != "python":
+        raise RuntimeError(f"Unsupported diff engine: {engine}")
+
     sync_to_keys = set(target.items)
     source_from_keys = set(origin.items)
 
@@ -80,13 +132,7 @@ def diff(
     extra_key_items = {key: target.items[key] for key in extra_keys}
 
     changes = dict()
-
-    if not fields_cmp:
-        fields_cmp = {}
-
-    for field in fields or origin.fields or origin.FIELDS:
-        if field not in fields_cmp:
-            fields_cmp[field] = lambda f: f
+    fields_cmp = _fields_cmp(origin, fields, fields_cmp)
 
     for key in shared_keys:
         source_fp = origin.items[key]
@@ -114,36 +160,168 @@ def diff(
     )
 
 
-def diff_report(diff_res: DiffResults, reports: Optional[set] = None):
+def idiff(
+    origin: Collection,
+    target: Collection,
+    fields: Optional[Iterable] = None,
+    fields_cmp: Optional[Dict[str, Callable]] = None,
+) -> Iterator[DiffEvent]:
+    """
+    The iterator form of `diff`.  Rather than building the complete
+    DiffResults, this generator yields a DiffEvent for each difference as it
+    walks the collection keys; first the "add" and "upd" events while walking
+    the origin keys, then the "del" events while walking the target keys.  The
+    Caller can therefore start acting on the differences, for example with
+    `Reconciler.reconcile_events`, while the diff is still being computed.
+
+    The target keys are walked from a snapshot taken before the first event,
+    so that the target items can be changed, for example by the write-through
+    of the reconciled events, while the events are produced.
+
+    The parameters are the same as `diff`.
+    """
+    fields_cmp = _fields_cmp(origin, fields, fields_cmp)
+    target_items = target.items
+    origin_items = origin.items
+    target_keys = list(target_items)
+
+    for key, source_fp in origin_items.items():
+        if (sync_fp := target_items.get(key)) is None:
+            yield DiffEvent("add", key, source_fp)
+            continue
+
+        item_changes = {
+            field_name: source_fp[field_name]
+            for field_name, field_fn in fields_cmp.items()
+            if field_fn(source_fp[field_name]) != field_fn(sync_fp[field_name])
+        }
+
+        if item_changes:
+            yield DiffEvent("upd", key, item_changes)
+
+    for key in target_keys:
+        if key in origin_items:
+            continue
+
+        if (sync_fp := target_items.get(key)) is not None:
+            yield DiffEvent("del", key, sync_fp)
+
+
+def diff_report(
+    diff_res: DiffResults,
+    reports: Optional[set] = None,
+    fmt: Optional[str] = "table",
+    output: Optional[TextIO] = None,
+    title: Optional[str] = None,
+):
+    """
+    Report the diff summary counts, and the items of the `reports`, any of
+    "all", "add", "del", "upd", by default none.  The "table" format uses
+    tabulate; the "jsonl" and "csv" formats stream one row per item to
+    `output`, with the summary written to stderr.  The optional `title`, for
+    example the target name, is added to the summary.
+    """
+    fmt = fmt or "table"
+    output = output or sys.stdout
+    summary = sys.stdout if fmt == "table" else sys.stderr
+
+    title = f": {title}" if title else ""
+
     if not diff_res.count:
-        print("\nNo Diffs.")
+        print(f"\nNo Diffs{title}.", file=summary)
         return
 
-    print("\nDiff Report")
-    print(f"   Add items: count {len(diff_res.missing)}")
-    print(f"   Remove items: count {len(diff_res.extras)}")
-    print(f"   Update items: count {len(diff_res.changes)}")
-    print("\n")
+    print(f"\nDiff Report{title}", file=summary)
+    print(f"   Add items: count {len(diff_res.missing)}", file=summary)
+    print(f"   Remove items: count {len(diff_res.extras)}", file=summary)
+    print(f"   Update items: count {len(diff_res.changes)}", file=summary)
+    print("\n", file=summary)
 
     if not reports:
         return
 
+    if fmt != "table":
+        diff_report_stream(diff_res, reports=reports, fmt=fmt, output=output)
+        return
+
     if diff_res.missing and any(("all" in reports, "add" in reports)):
-        diff_report_adds(diff_res.missing)
+        diff_report_adds(diff_res.missing, output=output)
 
     if diff_res.extras and any(("all" in reports, "del" in reports)):
-        diff_report_deletes(diff_res.extras)
+        diff_report_deletes(diff_res.extras, output=output)
 
     if diff_res.changes and any(("all" in reports, "upd" in reports)):
-        diff_report_updates(diff_res)
+        diff_report_updates(diff_res, output=output)
+
+
+def iter_diff_rows(
+    diff_res: DiffResults, reports: set
+) -> Iterator[Tuple[str, Tuple, Dict, Optional[Dict]]]:
+    """
+    Generate the diff report rows, one at a time, as the tuple (action, key,
+    item, changes).  The `item` is the origin item for "add", and the target
+    item for "del" and "upd".  The `changes` is only provided for "upd".
+    """
+    if any(("all" in reports, "add" in reports)):
+        for key, item in diff_res.missing.items():
+            yield "add", key, item, None
+
+    if any(("all" in reports, "del" in reports)):
+        for key, item in diff_res.extras.items():
+            yield "del", key, item, None
+
+    if any(("all" in reports, "upd" in reports)):
+        target_items = diff_res.target.items
+        for key, changes in diff_res.changes.items():
+            yield "upd", key, target_items[key], changes
+
+
+def iter_diff_jsonl(diff_res: DiffResults, reports: set) -> Iterator[str]:
+    """ generate the diff report rows as JSON lines """
+    for action, key, item, changes in iter_diff_rows(diff_res, reports):
+        rec = dict(action=action, key=key, item=item)
+        if changes is not None:
+            rec["changes"] = changes
+        yield json.dumps(rec, default=str) + "\n"
+
+
+def diff_report_stream(diff_res: DiffResults, reports: set, fmt: str, output: TextIO):
+    """ write the diff report rows incrementally to `output` in the `fmt` format """
+    if fmt == "jsonl":
+        output.writelines(iter_diff_jsonl(diff_res, reports))
+        return
+
+    rows = iter_diff_rows(diff_res, reports)
+
+    if fmt == "csv":
+        col = diff_res.origin
+        fields = list(col.fields or col.FIELDS)
+        writer = csv.DictWriter(
+            output, fieldnames=["_action", *fields, "_changed"], extrasaction="ignore"
+        )
+        writer.writeheader()
+
+        # update rows are written with the new field values, and the "_changed"
+        # column lists the names of the fields that are changing.  The report
+        # columns are prefixed so they do not collide with the field names.
+
+        for action, key, item, changes in rows:
+            row = dict(item)
+            row.update(changes or {})
+            row["_action"] = action
+            row["_changed"] = ";".join(changes or ())
+            writer.writerow(row)
+        return
+
+    raise ValueError(f"Unsupported diff report format: {fmt}")
 
 
-def diff_report_adds(items: dict):
+def diff_report_adds(items: dict, output: Optional[TextIO] = None):
     items = list(items.values())
     headers = list(items[0].keys())
     line = "-" * 80
 
-    print(f"{line}\nAdd Items: {len(items)}\n{line}\n")
+    print(f"{line}\nAdd Items: {len(items)}\n{line}\n", file=output)
     get_row = itemgetter(*headers)
 
     rows = [get_row(rec) for rec in items]
@@ -151,24 +329,25 @@ def diff_report_adds(items: dict):
         rows = [[row] for row in rows]
 
     print(
-        tabulate(tabular_data=rows, headers=headers), end="\n\n",
+        tabulate(tabular_data=rows, headers=headers), end="\n\n", file=output,
     )
 
 
-def diff_report_deletes(items: dict):
+def diff_report_deletes(items: dict, output: Optional[TextIO] = None):
     items = list(items.values())
     headers = items[0].keys()
     line = "-" * 80
 
-    print(f"{line}\nRemove Items: {len(items)}\n{line}\n")
+    print(f"{line}\nRemove Items: {len(items)}\n{line}\n", file=output)
 
     print(
         tabulate(tabular_data=map(itemgetter(*headers), items), headers=headers),
         end="\n\n",
+        file=output,
     )
 
 
-def diff_report_updates(diff_res: DiffResults):
+def diff_report_updates(diff_res: DiffResults, output: Optional[TextIO] = None):
     changes = diff_res.changes
     fk = next(iter(changes))
 
@@ -180,11 +359,11 @@ def diff_report_updates(diff_res: DiffResults):
 
     line = "-" * 80
 
-    print(f"{line}\nUpdate Items: {len(changes)}\n{line}\n")
+    print(f"{line}\nUpdate Items: {len(changes)}\n{line}\n", file=output)
 
     update_table = list()
 
     for key, upd_fields in changes.items():
         update_table.extend(get_fields(rec) for rec in [col.items[key], upd_fields, {}])
 
-    print(tabulate(tabular_data=update_table, headers=fields))
+    print(tabulate(tabular_data=update_table, headers=fields), file=output)
@@ -0,0 +1,217 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This file contains the optional columnar diff engine, which requires numpy.
+The keys of both collections are encoded as 64-bit hash columns, and the
+missing, extra, and shared keys are computed with a vectorized sorted-merge.
+The compared field values of the shared items are then encoded as typed
+columns and compared with vectorized element-wise comparisons.  The results
+are the same DiffResults as those produced by `nauti.diff.diff`.
+"""
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from operator import itemgetter, eq
+from typing import Dict, Callable, Optional, Iterable, List, Sequence
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from nauti.collection import Collection
+from nauti.diff import DiffResults, diff, _fields_cmp, _identity
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["columnar_diff"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The column dtypes of the field values of a single type; the columns of other
+# values, or of mixed types, are object columns.  The str values are compared
+# as object columns, since converting them to fixed-width unicode columns costs
+# more than the comparison.
+
+_TYPED_COLUMNS = {
+    int: "int64",
+    float: "float64",
+    bool: "bool",
+}
+
+
+def _object_column(values: Sequence):
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _hash_column(keys: Sequence):
+    return np.fromiter(map(hash, keys), dtype=np.int64, count=len(keys))
+
+
+def _field_column(values: Sequence):
+    """returns the typed column of the field `values`, or an object column"""
+    types = set(map(type, values))
+
+    if len(types) == 1 and (dtype := _TYPED_COLUMNS.get(types.pop())):
+        try:
+            return np.fromiter(values, dtype=dtype, count=len(values))
+        except OverflowError:
+            pass
+
+    return _object_column(values)
+
+
+def _changed_column(o_col, t_col):
+    """returns the bool column of the values that differ"""
+    if o_col.dtype != t_col.dtype:
+        o_col, t_col = o_col.astype(object), t_col.astype(object)
+
+    return np.asarray(o_col != t_col, dtype=bool)
+
+
+def _select(values: Sequence, rows) -> List:
+    """returns the `values` of the `rows` column of indexes"""
+    return list(map(values.__getitem__, rows.tolist()))
+
+
+def _has_duplicates(sorted_col) -> bool:
+    return bool(len(sorted_col) > 1 and (sorted_col[1:] == sorted_col[:-1]).any())
+
+
+def columnar_diff(
+    origin: Collection,
+    target: Collection,
+    fields: Optional[Iterable] = None,
+    fields_cmp: Optional[Dict[str, Callable]] = None,
+) -> DiffResults:
+    """
+    The columnar form of `nauti.diff.diff`, using numpy, for collections with
+    millions of items.  The parameters and results are the same as `diff`.
+
+    In the unlikely event that two keys of the same collection have the same
+    hash value, the diff is computed by `nauti.diff.diff`.
+    """
+    if np is None:
+        raise RuntimeError(
+            "The numpy diff engine requires the numpy package, "
+            "please install nauti[columnar]."
+        )
+
+    fields_cmp = _fields_cmp(origin, fields, fields_cmp)
+
+    o_keys, t_keys = list(origin.items), list(target.items)
+    o_count, t_count = len(o_keys), len(t_keys)
+
+    if not (o_count and t_count and fields_cmp):
+        return diff(origin, target, fields_cmp=fields_cmp)
+
+    # -------------------------------------------------------------------------
+    # Key columns; sorted-merge of the origin key hashes into the target key
+    # hashes, verifying the key equality of the matches.
+    # -------------------------------------------------------------------------
+
+    o_hash, t_hash = _hash_column(o_keys), _hash_column(t_keys)
+
+    t_order = np.argsort(t_hash, kind="stable")
+    t_sorted = t_hash[t_order]
+
+    if _has_duplicates(t_sorted) or _has_duplicates(np.sort(o_hash)):
+        return diff(origin, target, fields_cmp=fields_cmp)
+
+    pos = np.minimum(np.searchsorted(t_sorted, o_hash), t_count - 1)
+    matched = np.nonzero(t_sorted[pos] == o_hash)[0]
+    t_matched = t_order[pos[matched]]
+
+    verified = np.fromiter(
+        map(eq, _select(o_keys, matched), _select(t_keys, t_matched)),
+        dtype=bool,
+        count=len(matched),
+    )
+    o_shared, t_shared = matched[verified], t_matched[verified]
+
+    o_missing = np.ones(o_count, dtype=bool)
+    o_missing[o_shared] = False
+
+    t_extras = np.ones(t_count, dtype=bool)
+    t_extras[t_shared] = False
+
+    missing = {o_keys[i]: origin.items[o_keys[i]] for i in np.nonzero(o_missing)[0]}
+    extras = {t_keys[i]: target.items[t_keys[i]] for i in np.nonzero(t_extras)[0]}
+
+    # -------------------------------------------------------------------------
+    # Field columns of the shared items, normalized by the field compare
+    # functions.
+    # -------------------------------------------------------------------------
+
+    o_items = list(map(origin.items.__getitem__, _select(o_keys, o_shared)))
+    t_items = list(map(target.items.__getitem__, _select(t_keys, t_shared)))
+
+    changed = dict()
+
+    for field, field_fn in fields_cmp.items():
+        o_col = list(map(itemgetter(field), o_items))
+        t_col = list(map(itemgetter(field), t_items))
+
+        if field_fn is not _identity:
+            o_col, t_col = list(map(field_fn, o_col)), list(map(field_fn, t_col))
+
+        field_changed = _changed_column(_field_column(o_col), _field_column(t_col))
+        if field_changed.any():
+            changed[field] = field_changed
+
+    changes = dict()
+
+    if changed:
+        fields = list(changed)
+        rows = np.nonzero(np.logical_or.reduce(list(changed.values())))[0]
+        row_changed = np.column_stack([changed[field][rows] for field in fields])
+
+        for key, source_fp, field_flags in zip(
+            _select(o_keys, o_shared[rows]),
+            _select(o_items, rows),
+            row_changed.tolist(),
+        ):
+            changes[key] = {
+                field: source_fp[field]
+                for field, field_changed in zip(fields, field_flags)
+                if field_changed
+            }
+
+    return DiffResults(
+        origin=origin,
+        target=target,
+        count=len(missing) + len(changes) + len(extras),
+        missing=missing,
+        changes=changes,
+        extras=extras,
+    )
@@ -32,16 +32,17 @@ not specific to the netcfgbu source_records column names, can could be re-used
 for other CSV related tools and use-cases.
 """
 
-from typing import List, AnyStr, Optional, Callable, Dict, Sequence
+from typing import List, AnyStr, Optional, Callable, Dict, Sequence, Tuple
 import re
 import operator
 
 
-__all__ = ["create_filter"]
+__all__ = ["create_filter", "parse_constraints", "is_literal"]
 
 
 value_pattern = r"(?P<value>\S+)$"
 wordsep_re = re.compile(r"\s+|,")
+regex_meta_re = re.compile(r"[.^$*+?{}\[\]\\|()]")
 
 
 def mk_op_filter(_reg, _fieldn):
@@ -72,6 +73,48 @@ def create_filter_function(op_filters, optest_fn):
     return filter_fn
 
 
+def is_literal(value: AnyStr) -> bool:
+    """
+    Returns True if the constraint value does not contain any regular-expression
+    meta characters; meaning that a source could match it as an exact value
+    rather than as a pattern.
+    """
+    return regex_meta_re.search(value) is None
+
+
+def parse_constraints(
+    constraints: List[AnyStr], field_names: Sequence[AnyStr]
+) -> List[Tuple[str, str]]:
+    """
+    This function parses the constraint expressions, in the form
+    "<field-name>=<value>", into a list of (field-name, value) tuples.
+
+    Parameters
+    ----------
+    constraints:
+        A list of contraint expressions that are in the form "<field-name>=<value>".
+
+    field_names:
+        A list of known field names
+
+    Raises
+    ------
+    ValueError:
+        When a constraint expression is not valid for the given `field_names`.
+    """
+    fieldn_pattern = "^(?P<keyword>" + "|".join(fieldn for fieldn in field_names) + ")"
+    field_value_reg = re.compile(fieldn_pattern + "=" + value_pattern)
+
+    parsed = list()
+    for filter_expr in constraints:
+        if (mo := field_value_reg.match(filter_expr)) is None:
+            raise ValueError(f"Invalid filter expression: {filter_expr}")
+
+        parsed.append(tuple(mo.groupdict().values()))
+
+    return parsed
+
+
 def create_filter(
     constraints: List[AnyStr],
     field_names: Sequence[AnyStr],
@@ -103,18 +146,9 @@ def create_filter(
     The returning filter function expects an source_records record as the single
     input parameter, and the function returns True/False on match.
     """
-    fieldn_pattern = "^(?P<keyword>" + "|".join(fieldn for fieldn in field_names) + ")"
-    field_value_reg = re.compile(fieldn_pattern + "=" + value_pattern)
-
     op_filters = list()
-    for filter_expr in constraints:
-
-        # next check for keyword=value filtering use-case
-
-        if (mo := field_value_reg.match(filter_expr)) is None:
-            raise ValueError(f"Invalid filter expression: {filter_expr}")
-
-        fieldn, value = mo.groupdict().values()
+    for fieldn, value in parse_constraints(constraints, field_names):
+        filter_expr = f"{fieldn}={value}"
 
         try:
             value_reg = re.compile(f"^{value}$", re.IGNORECASE)
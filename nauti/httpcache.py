@@ -0,0 +1,306 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This file contains the on-disk HTTP response cache used by the Source
+clients.  The cache stores the ETag / Last-Modified validators of each GET
+response, sends conditional requests, and serves the "304 Not Modified"
+responses from the cached body.  The responses marked "no-store" or
+"private" by Cache-Control are not cached, and the cached entry is only used
+when the request headers named by the response Vary header are the same.
+See `Source.client_transport`.
+"""
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Dict, List
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+import httpx
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from nauti.log import get_logger
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["HTTPCacheTransport", "DEFAULT_HTTP_CACHE_SIZE"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The default maximum size, in bytes, of the cached response bodies.
+DEFAULT_HTTP_CACHE_SIZE = 512 * 1024 * 1024
+
+# When the cache exceeds its maximum size, the entries are evicted until the
+# size is below this fraction of the maximum, so that the eviction is not
+# repeated for each stored response.
+HTTP_CACHE_LOW_WATER = 0.9
+
+# The Cache-Control directives of the responses that are not cached.
+HTTP_CACHE_NO_STORE = {"no-store", "private"}
+
+
+class HTTPCacheTransport(httpx.AsyncBaseTransport):
+    """
+    A transport that wraps the client transport to provide the conditional
+    request cache.  Only the GET responses that have an ETag or Last-Modified
+    validator are cached.  When the total size of the cached bodies exceeds
+    `max_size`, the least recently used entries are evicted; the entry sizes,
+    in the least recently used order, are indexed in memory.  The cache files
+    are read and written by a thread so that the other requests do not wait
+    on the file I/O.
+
+    Parameters
+    ----------
+    transport:
+        The wrapped transport that makes the requests.
+
+    cache_dir:
+        The directory that stores the cache entries.
+
+    max_size:
+        The maximum total size, in bytes, of the cached response bodies, or
+        None for no maximum.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        cache_dir: Path,
+        max_size: Optional[int] = DEFAULT_HTTP_CACHE_SIZE,
+    ):
+        self.transport = transport
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+
+        # the single I/O thread keeps the file operations of an entry in the
+        # order they are made; it is started by the first request.
+        self._io: Optional[ThreadPoolExecutor] = None
+
+        # `index` is the dict key=<cache-key>, value=<body-size> of the cached
+        # entries, from the least to the most recently used.
+
+        bodies = sorted(
+            ((body.stat(), body) for body in self.cache_dir.glob("*.body")),
+            key=lambda st_body: st_body[0].st_mtime,
+        )
+        self.index: Dict[str, int] = OrderedDict(
+            (body.stem, st.st_size) for st, body in bodies
+        )
+        self.size = sum(self.index.values())
+
+    @staticmethod
+    def _cache_key(request: httpx.Request) -> str:
+        # the credentials are part of the key since the response content may
+        # depend on the permissions of the User.
+        auth = request.headers.get("authorization", "")
+        return sha256(f"{request.url}\n{auth}".encode()).hexdigest()
+
+    async def _run_io(self, func, *args):
+        if self._io is None:
+            self._io = ThreadPoolExecutor(max_workers=1)
+
+        return await asyncio.get_running_loop().run_in_executor(self._io, func, *args)
+
+    # -------------------------------------------------------------------------
+    # The cache file I/O, run in the I/O thread.
+    # -------------------------------------------------------------------------
+
+    def _load(self, key: str) -> Optional[dict]:
+        meta_file = self.cache_dir.joinpath(key + ".json")
+        try:
+            return json.loads(meta_file.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _read_body(self, key: str) -> bytes:
+        body_file = self.cache_dir.joinpath(key + ".body")
+        content = body_file.read_bytes()
+        os.utime(body_file)
+        return content
+
+    def _write_entry(self, key: str, meta: Dict, content: bytes):
+        self.cache_dir.joinpath(key + ".body").write_bytes(content)
+        self.cache_dir.joinpath(key + ".json").write_text(json.dumps(meta))
+
+    def _unlink(self, keys: List[str]):
+        for key in keys:
+            for suffix in (".body", ".json"):
+                self.cache_dir.joinpath(key + suffix).unlink(missing_ok=True)
+
+    # -------------------------------------------------------------------------
+    # The cache index, updated in the event loop.
+    # -------------------------------------------------------------------------
+
+    async def _store(
+        self,
+        key: str,
+        response: httpx.Response,
+        content: bytes,
+        vary: Dict[str, Optional[str]],
+    ):
+        meta = dict(
+            status=response.status_code,
+            headers=response.headers.multi_items(),
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            vary=vary,
+        )
+        await self._run_io(self._write_entry, key, meta, content)
+
+        self.size += len(content) - self.index.pop(key, 0)
+        self.index[key] = len(content)
+
+        if self.max_size is not None and self.size > self.max_size:
+            await self._evict()
+
+    async def _remove(self, *keys: str):
+        for key in keys:
+            self.size -= self.index.pop(key, 0)
+
+        await self._run_io(self._unlink, keys)
+
+    async def _evict(self):
+        """remove the least recently used entries until under the low-water size"""
+        low_water = self.max_size * HTTP_CACHE_LOW_WATER
+        evicted, size = list(), self.size
+
+        for key, body_size in self.index.items():
+            if size <= low_water:
+                break
+            evicted.append(key)
+            size -= body_size
+
+        await self._remove(*evicted)
+
+    @staticmethod
+    def _vary(request: httpx.Request, response: httpx.Response) -> Optional[Dict]:
+        """
+        Returns the dict of the request header values named by the response
+        Vary header, or None if the response is not to be cached.
+        """
+        directives = {
+            directive.strip().split("=")[0].lower()
+            for directive in response.headers.get("cache-control", "").split(",")
+        }
+
+        if directives & HTTP_CACHE_NO_STORE:
+            return None
+
+        names = [
+            name.strip().lower()
+            for name in response.headers.get("vary", "").split(",")
+            if name.strip()
+        ]
+
+        if "*" in names:
+            return None
+
+        return {name: request.headers.get(name) for name in names}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET":
+            return await self.transport.handle_async_request(request)
+
+        key = self._cache_key(request)
+
+        if (entry := await self._run_io(self._load, key)) and any(
+            request.headers.get(name) != value
+            for name, value in (entry.get("vary") or {}).items()
+        ):
+            entry = None
+
+        if entry:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = await self.transport.handle_async_request(request)
+
+        if response.status_code == 304 and entry:
+            await response.aclose()
+
+            try:
+                content = await self._run_io(self._read_body, key)
+                if key in self.index:
+                    self.index.move_to_end(key)
+            except OSError:
+                get_logger().debug(f"HTTP cache: missing body: {request.url}")
+                for header in ("If-None-Match", "If-Modified-Since"):
+                    request.headers.pop(header, None)
+                return await self.transport.handle_async_request(request)
+
+            self.hits += 1
+            return httpx.Response(
+                status_code=entry["status"],
+                headers=entry["headers"],
+                stream=httpx.ByteStream(content),
+                extensions={"nauti_cache": "hit"},
+            )
+
+        if response.status_code != 200 or not (
+            "etag" in response.headers or "last-modified" in response.headers
+        ):
+            return response
+
+        if (vary := self._vary(request, response)) is None:
+            if key in self.index:
+                await self._remove(key)
+            return response
+
+        # the response is cached with its raw content, still encoded, so that
+        # the client decodes it as it would the original response.
+
+        content = b"".join([chunk async for chunk in response.stream])
+        await response.aclose()
+        await self._store(key, response, content, vary)
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=httpx.ByteStream(content),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+        if self._io is not None:
+            self._io.shutdown(wait=False)
+            self._io = None
@@ -30,7 +30,7 @@ DEFAULT_MAX_TASKS = 100
 __all__ = ["igather", "iawait"]
 
 
-async def igather(coros, limit=None):
+async def igather(coros, limit=None, progress=None):
     coros = iter(coros)
 
     buf = asyncio.Queue()
@@ -54,6 +54,8 @@ async def igather(coros, limit=None):
             if _task:
                 v = await asyncio.wait_for(_task, None)
                 sem.release()
+                if progress:
+                    progress.advance()
                 yield _task.get_coro(), v  # the yield will be Tuple(original-coro, task-result)
             else:
                 break
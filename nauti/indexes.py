@@ -0,0 +1,78 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from operator import itemgetter
+from typing import Dict, Set, Tuple, Any, Hashable
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["ItemIndex"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class ItemIndex(object):
+    """
+    A secondary index of collection items, mapping the value of one or more
+    item fields to the set of item keys.  For a single field index the value
+    is the field value, for a composite index the value is the tuple of the
+    field values in the order of `fields`.
+
+    Parameters
+    ----------
+    fields:
+        The item field names
+    """
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = tuple(fields)
+        self.value_of = itemgetter(*self.fields)
+        self._keys: Dict[Any, Set[Hashable]] = dict()
+
+    def add(self, key: Hashable, item: Dict):
+        value = self.value_of(item)
+        if (keys := self._keys.get(value)) is None:
+            keys = self._keys[value] = set()
+        keys.add(key)
+
+    def remove(self, key: Hashable, item: Dict):
+        value = self.value_of(item)
+        if (keys := self._keys.get(value)) is None:
+            return
+
+        keys.discard(key)
+        if not keys:
+            del self._keys[value]
+
+    def get(self, value: Any) -> Set[Hashable]:
+        """returns the set of item keys with the field value(s)"""
+        return self._keys.get(value, set())
+
+    def clear(self):
+        self._keys.clear()
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,316 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import json
+from time import time
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Tuple, Iterable, List, TextIO
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from nauti.config import get_state_dir
+from nauti.collection import Collection
+from nauti.diff import DiffResults
+from nauti.source import observe_updates
+from nauti.log import RUN_ID, get_logger
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["WriteJournal"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+JOURNAL_DIRNAME = "journal"
+
+_ACTION_ITEMS = {"add": "missing", "del": "extras", "upd": "changes"}
+
+
+# The tags of the JSON objects that encode the tuples, and the dicts whose keys
+# are not all strings, so that the journaled keys and items are loaded with the
+# same types, and so compare equal to the fetched values.
+
+_TUPLE_TAG = "__tuple__"
+_ITEMS_TAG = "__items__"
+
+
+def _encode(value):
+    if isinstance(value, tuple):
+        return {_TUPLE_TAG: [_encode(each) for each in value]}
+
+    if isinstance(value, list):
+        return [_encode(each) for each in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    if all(isinstance(key, str) for key in value) and not (
+        _TUPLE_TAG in value or _ITEMS_TAG in value
+    ):
+        return {key: _encode(each) for key, each in value.items()}
+
+    return {_ITEMS_TAG: [[_encode(key), _encode(each)] for key, each in value.items()]}
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(each) for each in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    if len(value) == 1 and _TUPLE_TAG in value:
+        return tuple(_decode(each) for each in value[_TUPLE_TAG])
+
+    if len(value) == 1 and _ITEMS_TAG in value:
+        return {_decode(key): _decode(each) for key, each in value[_ITEMS_TAG]}
+
+    return {key: _decode(each) for key, each in value.items()}
+
+
+class WriteJournal(object):
+    """
+    The append-only JSON-lines journal of the reconcile writes of a collection,
+    used to resume an interrupted reconcile without a re-audit.  The journal
+    records the planned writes, with the diff item and the origin and target
+    items and source records, the completed writes, as observed from the
+    `Source.update` calls, and the end of the reconcile.  A write that
+    completed, but was not yet journaled when the process was interrupted, is
+    applied again on resume.
+
+    The tuples, and the dicts with keys that are not strings, are journaled so
+    that they are loaded with the same types; other values that are not JSON
+    types are journaled as strings.  The journal lines are written by a thread
+    so that the reconcile does not block on the file I/O.
+
+    Parameters
+    ----------
+    filepath: Path
+        The journal file, see `WriteJournal.for_sync`.
+    """
+
+    def __init__(self, filepath: Path):
+        self.filepath = Path(filepath)
+        self.planned: Dict[Any, str] = dict()
+        self.done = set()
+        self._fp: Optional[TextIO] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def for_sync(cls, origin: str, target: str, collection: str) -> "WriteJournal":
+        """returns the journal of the origin/target/collection in the state directory"""
+        journal_dir = get_state_dir().joinpath(JOURNAL_DIRNAME)
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        return cls(journal_dir.joinpath(f"{origin}-{target}-{collection}.jsonl"))
+
+    # -------------------------------------------------------------------------
+    # Writing
+    # -------------------------------------------------------------------------
+
+    def open(self):
+        """
+        Open the journal file for writing; an OSError is raised if the file
+        cannot be written.
+        """
+        if self._fp is None:
+            self._fp = self.filepath.open("a", buffering=1)
+            self._writer = ThreadPoolExecutor(max_workers=1)
+
+    def _write_lines(self, lines: List[str]):
+        try:
+            self._fp.writelines(lines)
+        except OSError as exc:
+            get_logger().error(f"Journal {self.filepath}: write failed: {exc}")
+
+    def _write(self, *entries: Dict):
+        # the single writer thread keeps the lines in the order written.
+        self.open()
+        lines = [json.dumps(_encode(entry), default=str) + "\n" for entry in entries]
+        self._writer.submit(self._write_lines, lines)
+
+    def begin(self, diff_res: DiffResults, actions: Iterable[str]):
+        """
+        Start a new journal, replacing any previous one, with the planned
+        writes of the diff results for the sync `actions`.
+        """
+        self.close()
+        self.filepath.unlink(missing_ok=True)
+        self.planned.clear()
+        self.done.clear()
+        self.open()
+
+        actions = tuple(actions)
+        origin, target = diff_res.origin, diff_res.target
+        entries = [
+            dict(
+                op="begin",
+                run_id=RUN_ID,
+                time=time(),
+                origin=origin.source.name,
+                target=target.source.name,
+                collection=target.name,
+                actions=actions,
+            )
+        ]
+
+        for action, attr in _ACTION_ITEMS.items():
+            if not any(("all" in actions, action in actions)):
+                continue
+
+            for key, item in getattr(diff_res, attr).items():
+                entry = dict(op="plan", action=action, key=key, item=item)
+
+                if action == "upd":
+                    entry["origin_item"] = origin.items.get(key)
+
+                if action != "del":
+                    entry["origin_record"] = origin.source_record_keys.get(key)
+
+                if action != "add":
+                    entry["target_item"] = target.items.get(key)
+                    entry["record"] = target.source_record_keys.get(key)
+                    entry["instance"] = target.provenance.get(key)
+
+                entries.append(entry)
+                self.planned[key] = action
+
+        self._write(*entries)
+
+    def record_done(self, item: Tuple[Any, Any], res: Any):
+        """the `Source.update` observer recording the completed writes"""
+        key, _ = item
+
+        if getattr(res, "is_error", False) or isinstance(res, Exception):
+            return
+
+        if key not in self.planned or key in self.done:
+            return
+
+        self.done.add(key)
+        self._write(dict(op="done", action=self.planned[key], key=key))
+
+    def complete(self):
+        """mark the end of the reconcile; there is nothing to resume"""
+        self._write(dict(op="end", time=time(), done=len(self.done)))
+        self.close()
+
+    def close(self):
+        """wait for the pending journal lines to be written, and close the file"""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    @contextmanager
+    def observe(self):
+        """context manager used to journal the completed writes of the reconcile"""
+        with observe_updates(self.record_done):
+            yield self
+
+    # -------------------------------------------------------------------------
+    # Resuming
+    # -------------------------------------------------------------------------
+
+    def entries(self) -> Iterable[Dict]:
+        if not self.filepath.exists():
+            return
+
+        with self.filepath.open() as ifile:
+            for line in ifile:
+
+                # the last line may be partial if the process was killed while
+                # writing it.
+
+                try:
+                    yield _decode(json.loads(line))
+                except ValueError:
+                    continue
+
+    def load(
+        self, origin: Collection, target: Collection
+    ) -> Optional[Tuple[DiffResults, Tuple[str, ...]]]:
+        """
+        Load the journal of an interrupted reconcile.  The `origin` and `target`
+        collections are populated with the journaled items, and source records,
+        of the remaining writes.
+
+        Returns
+        -------
+        None if there is nothing to resume, or otherwise the tuple of the
+        DiffResults of the remaining writes and the sync actions.
+        """
+        actions, plans = None, dict()
+        self.planned.clear()
+        self.done.clear()
+
+        for entry in self.entries():
+            if (op := entry.get("op")) == "begin":
+                actions, plans = tuple(entry["actions"]), dict()
+            elif op == "plan":
+                plans[entry["key"]] = entry
+            elif op == "done":
+                self.done.add(entry["key"])
+            elif op == "end":
+                actions = None
+
+        if actions is None:
+            return None
+
+        diff_res = DiffResults(origin=origin, target=target)
+
+        for key, entry in plans.items():
+            self.planned[key] = (action := entry["action"])
+
+            if key in self.done:
+                continue
+
+            getattr(diff_res, _ACTION_ITEMS[action])[key] = entry["item"]
+
+            # the items are set as keyed, so that the collection indexes and
+            # record uids are kept.
+
+            if action == "add":
+                origin._set_item(key, entry["item"], entry["origin_record"])
+                continue
+
+            if action == "upd":
+                origin._set_item(key, entry["origin_item"], entry["origin_record"])
+
+            if entry.get("instance") is not None:
+                target.provenance[key] = entry["instance"]
+
+            target._set_item(key, entry["target_item"], entry["record"])
+
+        diff_res.count = sum(
+            map(len, (diff_res.missing, diff_res.extras, diff_res.changes))
+        )
+        return diff_res, actions
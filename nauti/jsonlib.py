@@ -0,0 +1,202 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This file contains the JSON decoding functions used by the Source clients;
+the fast decoder, orjson when it is installed, and the incremental parser of
+the records of a streamed response body.
+"""
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import json
+import codecs
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Optional, Union
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["loads", "set_decoder", "iter_records", "decode_response"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+JsonDecoder = Callable[[Union[bytes, str]], Any]
+
+_decoder: JsonDecoder = orjson.loads if orjson else json.loads
+
+_WHITESPACE = " \t\n\r"
+
+# The characters that can follow a complete JSON value.
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """decode the JSON `data` using the configured decoder, see `set_decoder`"""
+    return _decoder(data)
+
+
+def set_decoder(decoder: Optional[JsonDecoder] = None):
+    """
+    Set the JSON decoder function used by `loads`; by default orjson when it is
+    installed, or otherwise the standard library decoder.
+    """
+    global _decoder
+    _decoder = decoder or (orjson.loads if orjson else json.loads)
+
+
+def decode_response(response) -> Any:
+    """decode the JSON body of the httpx `response`"""
+    return loads(response.content)
+
+
+class _StreamBuffer(object):
+    """the decoded text of a stream of byte chunks, read on demand"""
+
+    def __init__(self, chunks: AsyncIterable[bytes]):
+        self.chunks = chunks.__aiter__()
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    async def read_more(self) -> bool:
+        if self.eof:
+            return False
+
+        try:
+            chunk = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            self.eof = True
+            chunk = b""
+
+        # drop the consumed text so the buffer holds at most one record and
+        # the current chunk.
+
+        self.text = self.text[self.pos :] + self.decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    async def skip_ws(self) -> str:
+        """skip the whitespace and return the next character, "" at the end"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+
+            if not await self.read_more():
+                return ""
+
+    async def expect(self, chars: str) -> str:
+        if (char := await self.skip_ws()) == "" or char not in chars:
+            raise ValueError(f"JSON stream: expected one of {chars!r}, found {char!r}")
+
+        self.pos += 1
+        return char
+
+    async def decode(self, scanner: json.JSONDecoder) -> Any:
+        """
+        Decode the next JSON value.  A value that is not followed by a
+        delimiter is decoded again once more text is read, since a number
+        could continue in the next chunk; for example "-1" of "-1.5e3".
+        """
+        await self.skip_ws()
+
+        while True:
+            try:
+                value, end = scanner.raw_decode(self.text, self.pos)
+                if self.eof or (end < len(self.text) and self.text[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+            await self.read_more()
+
+
+async def iter_records(
+    chunks: AsyncIterable[bytes], key: Optional[str] = None
+) -> AsyncIterator[Any]:
+    """
+    Incrementally parse the records of a streamed JSON response body, yielding
+    each record as soon as it is complete, so that the body is not buffered
+    and the records can be itemized as they arrive.
+
+    Parameters
+    ----------
+    chunks:
+        The body byte chunks, for example the httpx `response.aiter_bytes()`.
+
+    key: str, optional
+        The key of the top-level object whose value is the array of records,
+        for example "results" or "data".  By default the body is the array of
+        records.
+
+    Examples
+    --------
+        async with client.stream("POST", "/tables/inventory/devices", json=body) as res:
+            async for rec in iter_records(res.aiter_bytes(), key="data"):
+                ...
+    """
+    stream = _StreamBuffer(chunks)
+    scanner = json.JSONDecoder()
+
+    if key is not None:
+        await stream.expect("{")
+
+        while True:
+            if await stream.skip_ws() == "}":
+                return
+
+            name = await stream.decode(scanner)
+            await stream.expect(":")
+
+            if name == key:
+                break
+
+            await stream.decode(scanner)
+            if await stream.expect(",}") == "}":
+                return
+
+    await stream.expect("[")
+
+    if await stream.skip_ws() == "]":
+        return
+
+    while True:
+        yield await stream.decode(scanner)
+
+        if await stream.expect(",]") == "]":
+            return
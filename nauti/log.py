@@ -18,14 +18,28 @@
 # -----------------------------------------------------------------------------
 
 import sys
+import json
+import atexit
 import logging
+from queue import SimpleQueue
+from uuid import uuid4
+from contextvars import ContextVar
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
 from functools import lru_cache
+from typing import Optional, TextIO
 
 # -----------------------------------------------------------------------------
 # Exports
 # -----------------------------------------------------------------------------
 
-__all__ = ["get_logger"]
+__all__ = [
+    "get_logger",
+    "setup_logging",
+    "set_log_format",
+    "set_log_stream",
+    "log_context",
+]
 
 
 # -----------------------------------------------------------------------------
@@ -34,16 +48,150 @@ __all__ = ["get_logger"]
 #
 # -----------------------------------------------------------------------------
 
+LOG_FORMATS = ("text", "json")
+
+# The context fields that are added to each log record, see `log_context`.
+LOG_CONTEXT_FIELDS = ("source", "collection", "phase")
+
+g_log_context = ContextVar("log_context", default={})
+
+g_log_listener: Optional[QueueListener] = None
+
+# The log output stream, stdout by default; see `set_log_stream`.
+g_log_stream: Optional[TextIO] = None
+
+# The log format, one of `LOG_FORMATS`; see `set_log_format`.
+g_log_format = "text"
+
+# The run-id is used to correlate the log records of a single nauti process.
+RUN_ID = uuid4().hex[:12]
+
 
 @lru_cache()
 def get_logger():
     return logging.getLogger("nauti")
 
 
-def setup_logging():
+@contextmanager
+def log_context(**fields):
+    """
+    Context manager used to add the fields, any of `LOG_CONTEXT_FIELDS`, to
+    the log records emitted within the context; for example:
+
+        with log_context(source="netbox", collection="devices", phase="fetch"):
+            ...
+
+    The context is bound to the current asyncio task.
+    """
+    token = g_log_context.set({**g_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        g_log_context.reset(token)
+
+
+class LogContextFilter(logging.Filter):
+    """
+    Adds the run-id and the `log_context` fields to the log record.  This
+    filter must be used on the handler that is called by the emitting code,
+    rather than the queue listener, so that it captures the task context.
+    """
+
+    def filter(self, record):
+        record.run_id = RUN_ID
+        context = g_log_context.get()
+        for field in LOG_CONTEXT_FIELDS:
+            setattr(record, field, context.get(field))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """format the log record as a single line JSON object"""
+
+    def format(self, record):
+        rec = dict(
+            time=self.formatTime(record),
+            level=record.levelname,
+            message=record.getMessage(),
+            run_id=getattr(record, "run_id", RUN_ID),
+        )
+
+        for field in LOG_CONTEXT_FIELDS:
+            if (value := getattr(record, field, None)) is not None:
+                rec[field] = value
+
+        return json.dumps(rec, default=str)
+
+
+def _log_formatter(fmt: str) -> logging.Formatter:
+    if fmt == "json":
+        return JsonFormatter()
+
+    return logging.Formatter(fmt="%(asctime)s %(levelname)s: %(message)s")
+
+
+def set_log_format(fmt: str):
+    """
+    set the log format, one of `LOG_FORMATS`, on the log output handler; the
+    format is applied by `setup_logging` when called before it.
+    """
+    global g_log_format
+
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unsupported log format: {fmt}")
+
+    g_log_format = fmt
+    if g_log_listener:
+        for handler in g_log_listener.handlers:
+            handler.setFormatter(_log_formatter(fmt))
+
+
+def set_log_stream(stream: TextIO):
+    """
+    set the log output stream, for example stderr when a report is written
+    to stdout
+    """
+    global g_log_stream
+
+    g_log_stream = stream
+    if g_log_listener:
+        for handler in g_log_listener.handlers:
+            handler.setStream(stream)
+
+
+def stop_logging():
+    """stop the queue listener, flushing any pending log records"""
+    global g_log_listener
+
+    if g_log_listener:
+        g_log_listener.stop()
+        g_log_listener = None
+
+
+def setup_logging(fmt: Optional[str] = None):
+    """
+    Setup the nauti logger so that the log records are put onto a queue, and
+    written to stdout, or the `set_log_stream` stream, by a listener thread.
+    This way emitting a log record from a coroutine never blocks the event
+    loop on the output I/O.  The log format is `fmt`, when given, or
+    otherwise the `set_log_format` format.
+    """
+    global g_log_listener
+
     log = get_logger()
-    log.addHandler(logging.StreamHandler(stream=sys.stdout))
-    log.handlers[0].setFormatter(
-        logging.Formatter(fmt="%(asctime)s %(levelname)s: %(message)s")
+    queue = SimpleQueue()
+
+    queue_handler = QueueHandler(queue)
+    queue_handler.addFilter(LogContextFilter())
+    log.addHandler(queue_handler)
+
+    g_log_listener = QueueListener(
+        queue,
+        logging.StreamHandler(stream=g_log_stream or sys.stdout),
+        respect_handler_level=True,
     )
+    set_log_format(fmt or g_log_format)
+    g_log_listener.start()
+    atexit.register(stop_logging)
+
     return log
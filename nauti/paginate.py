@@ -0,0 +1,236 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from time import monotonic
+from typing import Any, List, Optional, Tuple, AsyncIterator
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from nauti.igather import igather, DEFAULT_MAX_TASKS
+from nauti.progress import Progress
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["Paginator"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class Paginator(object):
+    """
+    The source-agnostic paginated fetch of the records of an API endpoint.  The
+    subclass implements `fetch_page` and `page_records`, and either
+    `page_total` for offset-based APIs, or `page_cursor` for cursor-based APIs.
+
+    The first page is fetched to obtain the total count of records; the
+    remaining offset pages are then fetched concurrently using `igather`.  The
+    page size is tuned from the latency and payload size of each page so that
+    each page takes about `target_latency` seconds and is no larger than
+    `max_page_bytes`.  When the API does not provide the total count, or
+    provides a cursor, the pages are fetched one after the other.
+
+    Parameters
+    ----------
+    page_size: int, optional
+        The page size of the first page, by default `page_size`.
+
+    limit: int, optional
+        The maximum number of concurrent page requests, typically the
+        `Source.concurrency`.
+
+    progress: Progress, optional
+        The progress that is advanced by the number of records of each page.
+
+    Examples
+    --------
+        class DevicesPaginator(Paginator):
+            async def fetch_page(self, offset, page_size, cursor=None):
+                return await client.get(url, params=dict(offset=offset, limit=page_size))
+
+            def page_records(self, response):
+                return decode_response(response)["results"]
+
+            def page_total(self, response):
+                return decode_response(response)["count"]
+
+        records = await DevicesPaginator(limit=source.concurrency).fetch()
+
+    See `nauti.jsonlib` for the JSON decoding of the responses.
+    """
+
+    page_size = 1000
+    min_page_size = 50
+    max_page_size = 10000
+
+    # The page latency, in seconds, and payload size, in bytes, that the page
+    # size is tuned for.
+    target_latency = 2.0
+    max_page_bytes = 8 * 1024 * 1024
+
+    # The largest factor by which the page size changes after each page.
+    max_growth = 2.0
+
+    def __init__(
+        self,
+        page_size: Optional[int] = None,
+        limit: Optional[int] = None,
+        progress: Optional[Progress] = None,
+    ):
+        self.page_size = page_size or self.page_size
+        self.limit = limit or DEFAULT_MAX_TASKS
+        self.progress = progress
+        self.total: Optional[int] = None
+
+    # -------------------------------------------------------------------------
+    #
+    #                     Subclass Methods
+    #
+    # -------------------------------------------------------------------------
+
+    async def fetch_page(
+        self, offset: Optional[int], page_size: int, cursor: Optional[Any] = None
+    ) -> Any:
+        """
+        Fetch the page of `page_size` records at the `offset`, or at the
+        `cursor` for cursor-based APIs, and return the response.  The offset
+        is None when fetching by cursor.
+        """
+        raise NotImplementedError()
+
+    def page_records(self, response: Any) -> List[Any]:
+        """returns the list of records of the page `response`"""
+        raise NotImplementedError()
+
+    def page_total(self, response: Any) -> Optional[int]:
+        """
+        Returns the total count of records, from the first page `response`, or
+        None when the API does not provide it.
+        """
+        return None
+
+    def page_cursor(self, response: Any) -> Optional[Any]:
+        """
+        Returns the cursor of the page after the page `response`, or None when
+        there are no more pages or the API is not cursor-based.
+        """
+        return None
+
+    def page_bytes(self, response: Any) -> int:
+        """returns the payload size of the page `response`"""
+        return len(getattr(response, "content", b""))
+
+    # -------------------------------------------------------------------------
+    #
+    #                     Pagination
+    #
+    # -------------------------------------------------------------------------
+
+    async def fetch(self) -> List[Any]:
+        """fetch, and return the list of, all of the records"""
+        records = list()
+
+        async for page_records in self.ipages():
+            records.extend(page_records)
+
+        return records
+
+    async def ipages(self) -> AsyncIterator[List[Any]]:
+        """
+        Fetch all of the pages, yielding the records of each page as they are
+        fetched; the offset pages are not necessarily yielded in order.
+        """
+        page_size = self.page_size
+        response, records = await self._fetch_page(0, page_size)
+        yield records
+
+        if (cursor := self.page_cursor(response)) is not None:
+            while cursor is not None:
+                response, records = await self._fetch_page(None, self.page_size, cursor)
+                yield records
+                cursor = self.page_cursor(response)
+            return
+
+        if (total := self.page_total(response)) is None:
+            offset = len(records)
+
+            while len(records) >= page_size:
+                page_size = self.page_size
+                response, records = await self._fetch_page(offset, page_size)
+                offset += len(records)
+                yield records
+            return
+
+        self.total = total
+        if self.progress and self.progress.total is None:
+            self.progress.total = total
+
+        def page_coros():
+            offset = len(records)
+
+            # the page size of each page is taken as the page is submitted, so
+            # that the pages use the page size tuned by the completed pages.
+
+            while offset < total:
+                page_size = self.page_size
+                yield self._fetch_page(offset, page_size)
+                offset += page_size
+
+        async for _, (_, page_records) in igather(page_coros(), limit=self.limit):
+            yield page_records
+
+    async def _fetch_page(
+        self, offset: Optional[int], page_size: int, cursor: Optional[Any] = None
+    ) -> Tuple[Any, List[Any]]:
+        started = monotonic()
+        response = await self.fetch_page(offset, page_size, cursor)
+        elapsed = monotonic() - started
+
+        records = self.page_records(response)
+        self.tune(page_size, len(records), elapsed, self.page_bytes(response))
+
+        if self.progress:
+            self.progress.advance(len(records))
+
+        return response, records
+
+    def tune(self, page_size: int, count: int, elapsed: float, nbytes: int):
+        """
+        Tune the `page_size` from the `elapsed` time and payload size of a
+        page of `count` records that was fetched with the `page_size`.
+        """
+        if count < page_size or elapsed <= 0:
+            return
+
+        size = page_size * self.target_latency / elapsed
+
+        if nbytes:
+            size = min(size, self.max_page_bytes * count / nbytes)
+
+        size = min(size, self.page_size * self.max_growth)
+        size = max(size, self.page_size / self.max_growth)
+        self.page_size = int(max(self.min_page_size, min(self.max_page_size, size)))
@@ -0,0 +1,154 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import sys
+from time import monotonic
+from collections import deque
+from typing import Optional, TextIO
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from nauti.log import get_logger
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["Progress"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# Progress is not shown for operations that complete within this many seconds.
+PROGRESS_DELAY = 1.0
+
+# The refresh interval, in seconds, of the progress line on a TTY, and of the
+# progress log messages otherwise.
+PROGRESS_TTY_INTERVAL = 0.25
+PROGRESS_LOG_INTERVAL = 10.0
+
+# The number of refresh samples used to compute the rolling rate.
+PROGRESS_RATE_SAMPLES = 20
+
+
+class Progress(object):
+    """
+    Reports the progress of a long running operation; the completed/total
+    counts, the rolling rate per second, the error count, and the ETA when
+    the total is known.  On a TTY the progress is shown as a single line that
+    is refreshed in place; otherwise a log message is emitted periodically.
+
+    The `advance` method is called from the hot loop, and so it only updates
+    the counters unless the refresh interval has elapsed.
+
+    Examples
+    --------
+        with Progress("update netbox/devices", total=len(items)) as progress:
+            for ...:
+                progress.advance()
+    """
+
+    def __init__(
+        self,
+        name: str,
+        total: Optional[int] = None,
+        stream: Optional[TextIO] = None,
+    ):
+        self.name = name
+        self.total = total
+        self.completed = 0
+        self.errors = 0
+
+        self.stream = stream or sys.stderr
+        self.is_tty = self.stream.isatty()
+        self.interval = PROGRESS_TTY_INTERVAL if self.is_tty else PROGRESS_LOG_INTERVAL
+
+        self.started = monotonic()
+        self._next_refresh = self.started + PROGRESS_DELAY
+        self._samples = deque(maxlen=PROGRESS_RATE_SAMPLES)
+        self._shown = False
+
+    def advance(self, count: Optional[int] = 1, error: Optional[bool] = False):
+        self.completed += count
+        if error:
+            self.errors += 1
+
+        if (now := monotonic()) >= self._next_refresh:
+            self.refresh(now)
+
+    @property
+    def rate(self) -> float:
+        """the rolling rate of completions per second"""
+        if len(self._samples) < 2:
+            elapsed = monotonic() - self.started
+            return self.completed / elapsed if elapsed else 0.0
+
+        (t0, c0), (t1, c1) = self._samples[0], self._samples[-1]
+        return (c1 - c0) / (t1 - t0) if t1 > t0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """the estimated number of seconds remaining, when the total is known"""
+        if not self.total or not (rate := self.rate):
+            return None
+
+        return max(self.total - self.completed, 0) / rate
+
+    def __str__(self):
+        counts = f"{self.completed}/{self.total}" if self.total else f"{self.completed}"
+        status = f"{self.name}: {counts}, {self.rate:.1f}/s, errors {self.errors}"
+
+        if (eta := self.eta) is not None:
+            status += f", ETA {int(eta) // 60}m{int(eta) % 60:02d}s"
+
+        return status
+
+    def refresh(self, now: Optional[float] = None):
+        now = now or monotonic()
+        self._samples.append((now, self.completed))
+        self._next_refresh = now + self.interval
+        self._shown = True
+
+        if self.is_tty:
+            self.stream.write(f"\r\033[K{self}")
+            self.stream.flush()
+        else:
+            get_logger().info(str(self))
+
+    def close(self):
+        """show the final progress, if the progress was shown at all"""
+        if not self._shown:
+            return
+
+        self.refresh()
+        if self.is_tty:
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,185 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import asyncio
+from collections import OrderedDict
+from typing import Callable, Awaitable, Dict, List, Any, Iterable, Optional, Hashable
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from nauti.igather import iawait
+from nauti.batching import chunk_query_values, DEFAULT_MAX_QUERY_LENGTH
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["RefResolver", "RefFetcher"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The coroutine function that fetches the references for a list of keys, and
+# returns a dict of the found key=<reference>; keys not found are omitted.
+RefFetcher = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+DEFAULT_RESOLVER_MAXSIZE = 10_000
+DEFAULT_RESOLVER_BATCH_SIZE = 100
+
+
+class RefResolver(object):
+    """
+    Resolves references, for example a hostname to the target source device
+    record, using a bounded LRU cache.  Concurrent lookups of the same missing
+    key share a single fetch ("singleflight"), and the `prefetch` method
+    resolves many keys in a few bulk fetches before the Caller starts making
+    the individual lookups.
+
+    Resolvers are shared per source, see `Source.resolver`.
+
+    Parameters
+    ----------
+    fetch_many:
+        The coroutine function used to fetch the references of a list of keys.
+
+    maxsize:
+        The maximum number of cached references.
+
+    batch_size:
+        The maximum number of keys passed to each `fetch_many` call by
+        `prefetch`.
+
+    param:
+        When provided, the prefetch batches are also bounded by the query
+        length of this multi-value query parameter name.
+    """
+
+    def __init__(
+        self,
+        fetch_many: RefFetcher,
+        maxsize: Optional[int] = DEFAULT_RESOLVER_MAXSIZE,
+        batch_size: Optional[int] = DEFAULT_RESOLVER_BATCH_SIZE,
+        param: Optional[str] = None,
+    ):
+        self.fetch_many = fetch_many
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.param = param
+
+        self.hits = 0
+        self.misses = 0
+
+        self._cache: OrderedDict = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = dict()
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def __len__(self):
+        return len(self._cache)
+
+    def set(self, key: Hashable, value: Any):
+        """cache the reference, for example after creating it in the source"""
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._cache.pop(key, None)
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """returns the reference for `key`, or None if it does not exist"""
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        if (pending := self._pending.get(key)) is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        return (await self._fetch([key])).get(key)
+
+    async def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """returns the dict of the found references for `keys`"""
+        keys = list(dict.fromkeys(keys))
+        await self.prefetch(keys)
+        found = await asyncio.gather(*(self.get(key) for key in keys))
+        return {key: ref for key, ref in zip(keys, found) if ref is not None}
+
+    async def prefetch(self, keys: Iterable[Hashable], limit: Optional[int] = None):
+        """
+        Resolve the `keys` that are not cached, or pending, using bulk fetches
+        of at most `batch_size` keys, with at most `limit` concurrent fetches.
+        """
+        missing = [
+            key
+            for key in dict.fromkeys(keys)
+            if key not in self._cache and key not in self._pending
+        ]
+
+        if not missing:
+            return
+
+        batches = chunk_query_values(
+            missing,
+            param=self.param or "",
+            max_length=DEFAULT_MAX_QUERY_LENGTH if self.param else float("inf"),
+            max_count=self.batch_size,
+        )
+
+        await iawait((self._fetch(batch) for batch in batches), limit=limit)
+
+    async def _fetch(self, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in keys}
+        self._pending.update(futures)
+        self.misses += len(keys)
+
+        try:
+            found = await self.fetch_many(keys)
+
+        except Exception as exc:
+            for future in futures.values():
+                future.set_exception(exc)
+                # the exception is raised to the Caller; mark it as retrieved
+                # for the futures that do not have any other waiters.
+                future.exception()
+            raise
+
+        finally:
+            for key in keys:
+                self._pending.pop(key, None)
+
+        for key, future in futures.items():
+            # references that are not found are not cached, since they could
+            # be created in the source later on.
+            if (ref := found.get(key)) is not None:
+                self.set(key, ref)
+            future.set_result(ref)
+
+        return found
@@ -13,15 +13,95 @@
 #      You should have received a copy of the GNU General Public License
 #      along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import time
+import asyncio
 from abc import ABC
-from typing import Coroutine, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Coroutine, Optional, Dict, List, Callable, Tuple, Any
 
+import httpx
 
-from nauti.igather import igather
-from nauti.config import get_config
+from nauti.igather import igather, DEFAULT_MAX_TASKS
+from nauti.config import get_config, get_state_dir
 from nauti.config_models import SourcesModel
+from nauti.stats import LatencyStats
+from nauti.progress import Progress
+from nauti.resolver import RefResolver, RefFetcher
+from nauti.httpcache import HTTPCacheTransport, DEFAULT_HTTP_CACHE_SIZE
+from nauti.cassette import CassetteTransport, get_cassette
 
-__all__ = ["Source", "get_source"]
+__all__ = ["Source", "get_source", "update_budget", "observe_updates"]
+
+DEFAULT_INSTANCE = "default"
+
+UpdateObserver = Callable[[Tuple[Any, Any], Any], None]
+
+# `g_update_budget` is the semaphore shared by the concurrent `Source.update`
+# calls, for example the reconcile phases, so that together they do not exceed
+# the concurrency of the source.  See `update_budget`.
+
+g_update_budget: ContextVar[Optional[asyncio.Semaphore]] = ContextVar(
+    "update_budget", default=None
+)
+
+
+@contextmanager
+def update_budget(limit: int):
+    """
+    Context manager used to share a budget of `limit` concurrent requests
+    across the `Source.update` calls made within the context.  The updates
+    made by an update coroutine are not counted against the budget.
+    """
+    token = g_update_budget.set(asyncio.Semaphore(limit))
+    try:
+        yield
+    finally:
+        g_update_budget.reset(token)
+
+
+# `g_update_observers` are the functions called with the (key, value) item and
+# the result of each `Source.update` coroutine as soon as it completes; for
+# example to journal the completed writes.  See `observe_updates`.
+
+g_update_observers: ContextVar[Tuple[UpdateObserver, ...]] = ContextVar(
+    "update_observers", default=()
+)
+
+
+@contextmanager
+def observe_updates(observer: UpdateObserver):
+    """
+    Context manager used to call the `observer` with the (key, value) item and
+    the result of each of the `Source.update` coroutines run within the
+    context.
+    """
+    token = g_update_observers.set((*g_update_observers.get(), observer))
+    try:
+        yield
+    finally:
+        g_update_observers.reset(token)
+
+
+# `g_progress` is a dict key=<id-of-Source>, value=<Progress> of the progress
+# reported by the client requests of each source made within the current
+# context, so that concurrent fetches of the same source each report to their
+# own progress.  See `Source.track_progress`.
+
+g_progress: ContextVar[Dict[int, Progress]] = ContextVar("progress", default={})
+
+
+async def _budgeted(budget: asyncio.Semaphore, coro: Coroutine):
+    async with budget:
+        g_update_budget.set(None)
+        return await coro
+
+
+async def _observed(observers: Tuple[UpdateObserver, ...], item, coro: Coroutine):
+    res = await coro
+    for observer in observers:
+        observer(item, res)
+    return res
 
 
 class Source(ABC):
@@ -32,6 +112,132 @@ class Source(ABC):
         self.client = None
         self.config = config
 
+        # `instance` is the name of the configured source instance, see
+        # `get_source`.  The `config.default` is the config of this instance.
+
+        self.instance = DEFAULT_INSTANCE
+
+        # `stats` accumulates the request latencies observed by the client when
+        # the subclass creates the client with the `client_event_hooks`.
+
+        self.stats = LatencyStats()
+
+        # `pool_stats` accumulates the times that the client requests waited
+        # for a pool connection when the client is created by
+        # `nauti.transport.create_client`.
+
+        self.pool_stats = LatencyStats()
+
+        # `resolvers` are the reference resolvers shared by the collections
+        # bound to this source, see `resolver`.
+
+        self.resolvers: Dict[str, RefResolver] = dict()
+
+    def resolver(
+        self, name: str, fetch_many: Optional[RefFetcher] = None, **options
+    ) -> RefResolver:
+        """
+        Returns the named reference resolver, for example "devices", creating
+        it with the `fetch_many` coroutine function and the RefResolver
+        `options` if it does not exist.
+        """
+        if (resolver := self.resolvers.get(name)) is not None:
+            return resolver
+
+        if fetch_many is None:
+            raise RuntimeError(f"Source {self.name}: resolver not found: {name}")
+
+        resolver = self.resolvers[name] = RefResolver(fetch_many, **options)
+        return resolver
+
+    @property
+    def options(self) -> Dict:
+        """the source instance options, from the configuration file"""
+        return self.config.default.options if self.config else {}
+
+    @property
+    def concurrency(self) -> int:
+        """the maximum number of concurrent requests made to this source"""
+        return self.options.get("concurrency") or DEFAULT_MAX_TASKS
+
+    def client_transport(
+        self, transport: Optional[httpx.AsyncBaseTransport] = None
+    ) -> httpx.AsyncBaseTransport:
+        """
+        Returns the httpx transport that the subclass should use when creating
+        its AsyncClient.  When the "http_cache" source option is enabled the
+        transport is wrapped by the conditional request cache; the
+        "http_cache_size" option sets the cache size in megabytes.
+
+        Parameters
+        ----------
+        transport: optional
+            The transport to use, by default an AsyncHTTPTransport.
+
+        When cassettes are used, see `nauti.cassette.use_cassettes`, the
+        transport records the client requests and responses, or replays them.
+        """
+        transport = transport or httpx.AsyncHTTPTransport()
+
+        if self.options.get("http_cache"):
+            cache_size = self.options.get("http_cache_size")
+            transport = HTTPCacheTransport(
+                transport,
+                cache_dir=get_state_dir().joinpath("http-cache", self.name),
+                max_size=(
+                    cache_size * 1024 * 1024 if cache_size else DEFAULT_HTTP_CACHE_SIZE
+                ),
+            )
+
+        if (cassette := get_cassette(self)) is not None:
+            transport = CassetteTransport(transport, cassette)
+
+        return transport
+
+    def client_event_hooks(self) -> Dict[str, List[Callable]]:
+        """
+        Returns the httpx event hooks that the subclass should use when creating
+        its AsyncClient so that the request latencies are accumulated into the
+        `stats` attribute.
+        """
+
+        async def on_request(request):
+            request.extensions["nauti_started"] = time.monotonic()
+
+        async def on_response(response):
+            if (started := response.request.extensions.get("nauti_started")) is None:
+                return
+
+            is_error = response.status_code >= 400
+            self.stats.record(time.monotonic() - started, error=is_error)
+
+            if progress := self.progress:
+                progress.advance(error=is_error)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    @property
+    def progress(self) -> Optional[Progress]:
+        """the progress of the client requests in the current context, if any"""
+        return g_progress.get().get(id(self))
+
+    @contextmanager
+    def track_progress(self, name: str, total: Optional[int] = None):
+        """
+        Context manager used to report the progress of the client requests,
+        for example while fetching a collection.  The client must be created
+        with the `client_event_hooks`.  The progress is tracked within the
+        current context, so that the concurrent tasks tracking the progress
+        of the same source each report their own client requests.
+        """
+        progress = Progress(name, total=total)
+        token = g_progress.set({**g_progress.get(), id(self): progress})
+        try:
+            yield progress
+        finally:
+            progress.close()
+            g_progress.reset(token)
+
     async def login(self, *vargs, **kwargs):
         raise NotImplementedError()
 
@@ -42,11 +248,16 @@ class Source(ABC):
     def is_connected(self):
         raise NotImplementedError()
 
-    @staticmethod
-    async def update(updates, callback, creator):
-
+    async def update(self, updates, callback, creator, limit=None):
+        """
+        Run the `creator` coroutine of each of the `updates` items, at most
+        `limit` at a time, by default the source `concurrency`, calling the
+        `callback` with the item and result of each as it completes.
+        """
         tasks = dict()
         callback = callback or (lambda _k, _t: True)
+        budget = g_update_budget.get()
+        observers = g_update_observers.get()
 
         for key, value in updates.items():
             if (coro := creator(key, value)) is None:
@@ -55,11 +266,19 @@ class Source(ABC):
             if not isinstance(coro, Coroutine):
                 raise RuntimeError("Source.update requires a coroutine")
 
+            if observers:
+                coro = _observed(observers, (key, value), coro)
+
+            if budget is not None:
+                coro = _budgeted(budget, coro)
+
             tasks[coro] = (key, value)
 
-        async for orig_coro, res in igather(tasks, limit=100):
-            item = tasks[orig_coro]
-            callback(item, res)
+        with Progress("Source.update", total=len(tasks)) as progress:
+            async for orig_coro, res in igather(tasks, limit=limit or self.concurrency):
+                item = tasks[orig_coro]
+                callback(item, res)
+                progress.advance(error=getattr(res, "is_error", False))
 
     async def __aenter__(self):
         await self.login()
@@ -69,7 +288,7 @@ class Source(ABC):
         await self.logout()
 
 
-def get_source(name: str, **kwargs) -> Source:
+def get_source(name: str, instance: Optional[str] = None, **kwargs) -> Source:
     """
     Return the Source class designated by the 'name' field.  If a source by `name` is not
     found, then raise RuntimeError.
@@ -78,6 +297,11 @@ def get_source(name: str, **kwargs) -> Source:
     ----------
     name: str
         The name of the source type, for example "netbox" or "ipfabric".
+
+    instance: str, optional
+        The name of the source instance, from the source config `instances`.
+        The Source config `default` is the config of the instance.  By
+        default the "default" instance.
     """
 
     source_cls = next(
@@ -88,5 +312,15 @@ def get_source(name: str, **kwargs) -> Source:
 
     cfg = get_config()
     src_cfg = cfg.sources[name]
-    src_inst_cfg = src_cfg.copy()
-    return source_cls(config=src_inst_cfg, **kwargs)
+    instance = instance or DEFAULT_INSTANCE
+
+    if instance == DEFAULT_INSTANCE:
+        src_inst_cfg = src_cfg.copy()
+    elif instance in (src_cfg.instances or {}):
+        src_inst_cfg = src_cfg.copy(update={"default": src_cfg.instances[instance]})
+    else:
+        raise RuntimeError(f"ERROR:NOT-FOUND: nauti source instance: {name}/{instance}")
+
+    source = source_cls(config=src_inst_cfg, **kwargs)
+    source.instance = instance
+    return source
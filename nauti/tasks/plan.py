@@ -0,0 +1,138 @@
+from typing import List, Iterable, Optional, TextIO
+from dataclasses import dataclass
+from math import ceil
+
+from tabulate import tabulate
+
+from .reconile import Reconciler
+
+__all__ = ["PlanEstimate", "estimate_plan", "projected_duration", "plan_report"]
+
+
+@dataclass()
+class PlanEstimate(object):
+    action: str
+    items: int
+    api_calls: int
+    batched_calls: int
+    duration: Optional[float]
+
+
+def estimate_plan(reconciler: Reconciler, actions: Iterable[str]) -> List[PlanEstimate]:
+    """
+    Estimate the cost of reconciling the diff results for each of the
+    `actions`.  The number of API calls is determined from the Reconciler
+    `calls_per_item` and `batch_size` attributes.  The duration is projected
+    from the mean request latency measured by the target source during the
+    fetch phase and the target source concurrency; it is None when the
+    target source has not measured any latency, see
+    `Source.client_event_hooks`.
+
+    Parameters
+    ----------
+    reconciler:
+        The reconciler that would apply the diff results.
+
+    actions:
+        The set of actions to reconcile, any of "all", "add", "del", "upd".
+    """
+    diff_res = reconciler.diff_res
+    target = diff_res.target.source
+    latency = target.stats.mean
+    concurrency = target.concurrency
+
+    planned = {"add": diff_res.missing, "del": diff_res.extras, "upd": diff_res.changes}
+
+    estimates = list()
+
+    for action, items in planned.items():
+        if not items or not any(("all" in actions, action in actions)):
+            continue
+
+        per_item = reconciler.calls_per_item.get(action, 1)
+        batch_size = reconciler.batch_size.get(action) or 1
+
+        batched_calls = ceil(len(items) / batch_size) * per_item
+        duration = (
+            ceil(batched_calls / concurrency) * latency if latency is not None else None
+        )
+
+        estimates.append(
+            PlanEstimate(
+                action=action,
+                items=len(items),
+                api_calls=len(items) * per_item,
+                batched_calls=batched_calls,
+                duration=duration,
+            )
+        )
+
+    return estimates
+
+
+def projected_duration(
+    reconciler: Reconciler, estimates: List[PlanEstimate]
+) -> Optional[float]:
+    """
+    Returns the projected duration of the reconcile plan.  When the reconciler
+    runs the phases concurrently, the phases share the target source
+    concurrency, so the duration is that of all the batched calls made at
+    the source concurrency, and at least that of the longest phase;
+    otherwise it is the sum of the phase durations.
+    """
+    durations = [est.duration for est in estimates]
+    if not durations or None in durations:
+        return None
+
+    if not reconciler.concurrent_phases:
+        return sum(durations)
+
+    target = reconciler.diff_res.target.source
+    batched_calls = sum(est.batched_calls for est in estimates)
+    shared = ceil(batched_calls / target.concurrency) * target.stats.mean
+    return max(shared, *durations)
+
+
+def plan_report(
+    reconciler: Reconciler,
+    estimates: List[PlanEstimate],
+    output: Optional[TextIO] = None,
+):
+    target = reconciler.diff_res.target.source
+    line = "-" * 80
+
+    def fmt_duration(duration):
+        return "n/a" if duration is None else f"{duration:.1f}s"
+
+    print(f"{line}\nReconcile Plan (dry-run)\n{line}\n", file=output)
+    print(
+        f"   Target {target.name}: {target.stats}, concurrency {target.concurrency}",
+        file=output,
+    )
+    print(f"   Pool wait: {target.pool_stats}\n", file=output)
+
+    if not estimates:
+        print("No reconcile actions.", file=output)
+        return
+
+    print(
+        tabulate(
+            tabular_data=[
+                (
+                    est.action,
+                    est.items,
+                    est.api_calls,
+                    est.batched_calls,
+                    fmt_duration(est.duration),
+                )
+                for est in estimates
+            ],
+            headers=["action", "items", "api calls", "batched calls", "duration"],
+        ),
+        end="\n\n",
+        file=output,
+    )
+
+    total = projected_duration(reconciler, estimates)
+    phases = "concurrent" if reconciler.concurrent_phases else "sequential"
+    print(f"Projected duration: {fmt_duration(total)} ({phases} phases)", file=output)
@@ -1,4 +1,14 @@
-from nauti.diff import DiffResults
+from typing import Iterable, Optional, Any, Coroutine, Set, Tuple, Callable, Dict
+from operator import itemgetter
+from dataclasses import replace
+from copy import copy
+import asyncio
+
+from nauti.diff import DiffResults, DiffEvent
+from nauti.igather import igather
+from nauti.progress import Progress
+from nauti.log import log_context, get_logger
+from nauti.source import update_budget, g_update_budget
 from .registrar import _registered_plugins
 
 __all__ = ["Reconciler"]
@@ -8,6 +18,44 @@ _PLUGIN_NAME = "reconciler"
 
 
 class Reconciler(object):
+    # The number of API calls the reconciler makes per item, by action; used
+    # to estimate the cost of the reconcile plan.
+    calls_per_item = {"add": 1, "del": 1, "upd": 1}
+
+    # The number of items the reconciler writes per API call, by action, for
+    # reconcilers that batch their writes.
+    batch_size = {"add": 1, "del": 1, "upd": 1}
+
+    # The references the reconciler resolves in the target source, as a dict
+    # of key=<resolver name>, value=<item field name, or tuple of field names>,
+    # for example {"devices": "hostname"}.  The references are resolved in
+    # bulk by `prefetch` before the reconcile writes start.
+    references = None
+
+    # When True the add, delete, and update phases are run concurrently, within
+    # the shared concurrency budget of the target source; see `reconcile`.  By
+    # default the phases are run one after the other.  A reconciler opts in
+    # when its writes only depend on the deletes by the `conflict_fields`, or
+    # the sync command enables it with the --concurrent-phases option.
+    concurrent_phases = False
+
+    # The item fields that are unique in the target, for example ("hostname",).
+    # An added or updated item whose values of these fields are the same as
+    # those of a deleted item conflicts with the delete, and is reconciled
+    # only once the deletes are done.
+    conflict_fields = None
+
+    # When True the results of the reconcile writes are applied to the target
+    # collection, see `Collection.write_through`.
+    write_through = True
+
+    # The target source resolvers that the added target records are cached
+    # into, as a dict of key=<resolver name>, value=<item field name, or tuple
+    # of field names>, for example {"devices": "hostname"}; so that the other
+    # reconcilers resolve the references to the added records without a
+    # fetch.  See `apply_result`.
+    resolves = None
+
     def __init__(self, diff_res: DiffResults, **options):
         self.diff_res = diff_res
         self.options = options
@@ -27,6 +75,289 @@ class Reconciler(object):
     async def update_items(self):
         raise NotImplementedError()
 
+    def collect_references(self, fields) -> Set:
+        """
+        Returns the set of reference values, of the item `fields`, used by the
+        diff results items that are added or updated.
+        """
+        fields = fields if isinstance(fields, tuple) else (fields,)
+        get_ref = itemgetter(*fields)
+        diff_res = self.diff_res
+        refs = set(map(get_ref, diff_res.missing.values()))
+
+        target_items = self.target.items
+        for key, changes in diff_res.changes.items():
+            refs.add(get_ref({**target_items[key], **changes}))
+
+        return refs
+
+    async def prefetch(self):
+        """
+        Resolve the `references` in bulk using the target source resolvers.
+        The references of a resolver that has not been created, see
+        `Source.resolver`, are resolved as they are used.
+        """
+        resolvers = self.target.source.resolvers
+
+        for name, fields in (self.references or {}).items():
+            if (resolver := resolvers.get(name)) is None:
+                get_logger().debug(f"Reconcile: no resolver {name}, prefetch skipped")
+                continue
+
+            await resolver.prefetch(self.collect_references(fields))
+
+    def split_conflicts(self) -> Tuple["Reconciler", "Reconciler"]:
+        """
+        Returns the tuple of reconcilers, copies of this reconciler, of the
+        diff results that are independent of the deletes, and of the added and
+        updated items that conflict with the deletes; see `conflict_fields`.
+        """
+        diff_res = self.diff_res
+        conflicts = dict(missing={}, changes={})
+
+        if self.conflict_fields and diff_res.extras:
+            get_ref = itemgetter(*self.conflict_fields)
+            deleted = set(map(get_ref, diff_res.extras.values()))
+
+            target_items = self.target.items
+            conflicts["missing"] = {
+                key: item
+                for key, item in diff_res.missing.items()
+                if get_ref(item) in deleted
+            }
+            conflicts["changes"] = {
+                key: changes
+                for key, changes in diff_res.changes.items()
+                if get_ref({**target_items[key], **changes}) in deleted
+            }
+
+        independent = copy(self)
+        independent.diff_res = replace(
+            diff_res,
+            missing={
+                key: item
+                for key, item in diff_res.missing.items()
+                if key not in conflicts["missing"]
+            },
+            changes={
+                key: changes
+                for key, changes in diff_res.changes.items()
+                if key not in conflicts["changes"]
+            },
+        )
+
+        deferred = copy(self)
+        deferred.diff_res = replace(diff_res, extras={}, **conflicts)
+
+        return independent, deferred
+
+    def update_callback(
+        self, action: str, callback: Optional[Callable] = None
+    ) -> Callable[[Tuple[Any, Any], Any], None]:
+        """
+        Returns the `Source.update` callback used by the `action` phase, one of
+        "add", "del", "upd", that applies the result of each write, see
+        `apply_result`, and then calls the optional `callback`; for example:
+
+            await source.update(
+                updates=self.diff_res.missing,
+                callback=self.update_callback("add", self.report_add),
+                creator=self.add_device,
+            )
+        """
+        diff_items = {"add": self.diff_res.missing, "upd": self.diff_res.changes}
+        items: Dict = diff_items.get(action, {})
+
+        def on_result(item, res):
+            key, value = item
+            self.apply_result(action, key, items.get(key, value), res)
+            if callback:
+                callback(item, res)
+
+        return on_result
+
+    def apply_result(self, action: str, key, item: Optional[Dict], res: Any):
+        """
+        Apply the result of a reconcile write, when `write_through` is True, to
+        the target collection; and cache the added target record into the
+        `resolves` resolvers that exist in the target source.
+        """
+        if not self.write_through:
+            return
+
+        if getattr(res, "is_error", False) or isinstance(res, Exception):
+            return
+
+        target = self.target
+        target.write_through(action, key, item, res)
+
+        if action != "add" or not self.resolves:
+            return
+
+        if (rec := target.response_record(res)) is None:
+            return
+
+        resolvers = target.source.resolvers
+        for name, fields in self.resolves.items():
+            if (resolver := resolvers.get(name)) is not None:
+                fields = fields if isinstance(fields, tuple) else (fields,)
+                resolver.set(itemgetter(*fields)(item), rec)
+
+    async def run_phases(self):
+        """
+        Run the add, delete, and update phases, for the sync actions given in
+        `options`, one after the other.
+        """
+        diff_res = self.diff_res
+        sync_opts = self.options
+
+        if diff_res.missing and any(("all" in sync_opts, "add" in sync_opts)):
+            await self.add_items()
+
+        if diff_res.extras and any(("all" in sync_opts, "del" in sync_opts)):
+            await self.delete_items()
+
+        if diff_res.changes and any(("all" in sync_opts, "upd" in sync_opts)):
+            await self.update_items()
+
+    async def run_concurrent_phases(self):
+        """
+        Run the add, delete, and update phases concurrently.  The adds and
+        updates that conflict with the deletes are run once the deletes are
+        done.
+        """
+        independent, deferred = self.split_conflicts()
+        diff_res = independent.diff_res
+        sync_opts = self.options
+
+        async def run_deletes():
+            if diff_res.extras and any(("all" in sync_opts, "del" in sync_opts)):
+                await independent.delete_items()
+
+            if deferred.diff_res.missing or deferred.diff_res.changes:
+                await deferred.run_concurrent_phases()
+
+        async def run_adds():
+            if diff_res.missing and any(("all" in sync_opts, "add" in sync_opts)):
+                await independent.add_items()
+
+        async def run_updates():
+            if diff_res.changes and any(("all" in sync_opts, "upd" in sync_opts)):
+                await independent.update_items()
+
+        await asyncio.gather(run_adds(), run_deletes(), run_updates())
+
+    async def reconcile(self):
+        """
+        Reconcile the diff results for the sync actions given in `options`,
+        any of "all", "add", "del", "upd".  When `concurrent_phases` is True,
+        the phases are run concurrently and the `Source.update` calls share a
+        budget of the target source concurrency.  When `write_through` is True
+        the write results are applied to the target collection by the phase
+        callbacks, see `update_callback`.
+        """
+        target = self.target
+
+        with log_context(
+            source=target.source.name, collection=target.name, phase="reconcile"
+        ):
+            await self.prefetch()
+            await self.run_reconcile_phases()
+
+    async def run_reconcile_phases(self):
+        if not self.concurrent_phases:
+            await self.run_phases()
+            return
+
+        if g_update_budget.get() is not None:
+            await self.run_concurrent_phases()
+            return
+
+        with update_budget(self.target.source.concurrency):
+            await self.run_concurrent_phases()
+
+    # -------------------------------------------------------------------------
+    # Streaming reconcile; the subclass implements the per-item coroutines
+    # so that reconcile_events can apply the diff events as they are produced
+    # by `nauti.diff.idiff`.
+    # -------------------------------------------------------------------------
+
+    def add_item(self, key, item: dict) -> Optional[Coroutine]:
+        """return the coroutine that adds the missing origin `item` to the target"""
+        raise NotImplementedError()
+
+    def delete_item(self, key, item: dict) -> Optional[Coroutine]:
+        """return the coroutine that removes the extra `item` from the target"""
+        raise NotImplementedError()
+
+    def update_item(self, key, changes: dict) -> Optional[Coroutine]:
+        """return the coroutine that updates the target item with the field `changes`"""
+        raise NotImplementedError()
+
+    def event_done(self, event: DiffEvent, result: Any):
+        """called with the result of each reconciled event"""
+        pass
+
+    async def reconcile_events(
+        self, events: Iterable[DiffEvent], actions: Iterable[str], limit=None
+    ):
+        """
+        Reconcile the diff `events`, as produced by `nauti.diff.idiff`.  The
+        events are only pulled from the iterator as the concurrency `limit`
+        allows; so the writes start while the diff is still being computed and
+        the number of in-flight events is bounded by `limit` rather than by the
+        size of the diff.
+
+        Parameters
+        ----------
+        events:
+            The iterable of DiffEvent
+
+        actions:
+            The set of actions to reconcile, any of "all", "add", "del", "upd".
+
+        limit: int, optional
+            The maximum number of concurrent item coroutines.
+        """
+        creators = {
+            "add": self.add_item,
+            "del": self.delete_item,
+            "upd": self.update_item,
+        }
+
+        actions = set(actions)
+        if "all" in actions:
+            actions = set(creators)
+
+        in_flight = dict()
+
+        def event_coros():
+            for event in events:
+                if event.action not in actions:
+                    continue
+
+                if (coro := creators[event.action](event.key, event.item)) is None:
+                    continue
+
+                in_flight[coro] = event
+                yield coro
+
+        source, collection = self.target.source.name, self.target.name
+
+        # the write results are applied to the target collection as each
+        # write completes; `idiff` walks a snapshot of the target keys, so the
+        # target items can change while the events are produced.
+
+        with log_context(
+            source=source, collection=collection, phase="reconcile"
+        ), Progress(f"Reconciling {source}/{collection}") as progress:
+            async for coro, res in igather(
+                event_coros(), limit=limit, progress=progress
+            ):
+                event = in_flight.pop(coro)
+                self.event_done(event, res)
+                self.apply_result(event.action, event.key, event.item, res)
+
     @staticmethod
     def register(origin, target, collection, name="default"):
         def decorator(cls):
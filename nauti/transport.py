@@ -0,0 +1,199 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import time
+from typing import Dict, TYPE_CHECKING
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+import httpx
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from nauti.stats import LatencyStats
+
+if TYPE_CHECKING:  # pragma: no cover
+    from nauti.source import Source
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["create_client", "PoolTimingTransport"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_KEEPALIVE_EXPIRY = 5.0
+
+# The trace events of the first activity on a connection, which occur once the
+# request has acquired a connection from the pool.
+_CONNECTION_EVENTS = (
+    "connection.connect_tcp.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+
+# The source options of the client timeouts, see `httpx.Timeout`.
+_TIMEOUT_OPTIONS = {
+    "connect_timeout": "connect",
+    "read_timeout": "read",
+    "write_timeout": "write",
+    "pool_timeout": "pool",
+}
+
+
+class PoolTimingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a transport to measure the time each request waits for a pool
+    connection, using the httpcore "trace" request extension, and record it
+    into `stats`.  Long waits show that the connection pool is smaller than
+    the request concurrency.
+
+    Parameters
+    ----------
+    transport:
+        The transport used to send the requests.
+
+    stats:
+        The stats of the pool wait times, see `Source.pool_stats`.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: LatencyStats):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        prev_trace = request.extensions.get("trace")
+        waiting = True
+
+        async def trace(event_name, info):
+            nonlocal waiting
+
+            if waiting and event_name in _CONNECTION_EVENTS:
+                waiting = False
+                self.stats.record(time.monotonic() - started)
+
+            if prev_trace:
+                await prev_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def client_timeout(options: Dict) -> httpx.Timeout:
+    """
+    Returns the client timeout from the source `options`; the "timeout" option
+    is the default, and the "connect_timeout", "read_timeout", "write_timeout",
+    and "pool_timeout" options override it.
+    """
+    return httpx.Timeout(
+        options.get("timeout", DEFAULT_TIMEOUT),
+        **{
+            timeout: options[opt_name]
+            for opt_name, timeout in _TIMEOUT_OPTIONS.items()
+            if opt_name in options
+        },
+    )
+
+
+def create_client(source: "Source", **client_kwargs) -> httpx.AsyncClient:
+    """
+    Returns the httpx AsyncClient that the Source subclass uses to access the
+    source API.  The client is configured from the source instance options:
+
+        concurrency: the connection pool size, so that the concurrent requests
+            do not wait for a connection, see `Source.concurrency`.
+
+        max_connections, max_keepalive: override the pool sizes.
+
+        keepalive_expiry: seconds that idle connections are kept.
+
+        timeout, connect_timeout, read_timeout, write_timeout, pool_timeout:
+            the timeouts in seconds, see `client_timeout`.
+
+        http2: enables HTTP/2; requires the "h2" package (httpx[http2]).
+
+        compression: when False, requests uncompressed responses; otherwise
+            the gzip and deflate, and brotli when the "brotli" package is
+            installed, responses are negotiated and decoded.
+
+        retries: the number of connection retries.
+
+    The client uses the `Source.client_event_hooks`, and the
+    `Source.client_transport`, and records the pool wait times into the
+    `Source.pool_stats`.
+
+    Other Parameters
+    ----------------
+    The other AsyncClient parameters, for example `base_url` and `headers`.
+    """
+    options = source.options
+    concurrency = source.concurrency
+
+    if (http2 := bool(options.get("http2"))) is True:
+        try:
+            import h2  # noqa
+        except ImportError:
+            raise RuntimeError(
+                f"Source {source.name}: the http2 option requires the h2 package, "
+                "please install httpx[http2]."
+            )
+
+    limits = httpx.Limits(
+        max_connections=options.get("max_connections") or concurrency,
+        max_keepalive_connections=options.get("max_keepalive") or concurrency,
+        keepalive_expiry=options.get("keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY),
+    )
+
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2, limits=limits, retries=options.get("retries") or 0
+    )
+    transport = PoolTimingTransport(
+        source.client_transport(transport), stats=source.pool_stats
+    )
+
+    headers = httpx.Headers(client_kwargs.pop("headers", None))
+    if options.get("compression", True) is False:
+        headers["Accept-Encoding"] = "identity"
+
+    event_hooks = source.client_event_hooks()
+    for event, hooks in client_kwargs.pop("event_hooks", {}).items():
+        event_hooks.setdefault(event, []).extend(hooks)
+
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=client_kwargs.pop("timeout", None) or client_timeout(options),
+        headers=headers,
+        event_hooks=event_hooks,
+        **client_kwargs,
+    )
@@ -0,0 +1,332 @@
+#      Copyright (C) 2020  Jeremy Schulman
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This file contains the watch mode; a long running process that keeps the
+sources logged in, and the collections in memory, and periodically re-audits
+each of the registered (origin, target, collection) combinations.  The
+status, and the last diff, of each audit is made available from a small
+local HTTP endpoint:
+
+    GET /status
+        JSON list of the audit status
+
+    GET /diff/<origin>/<target>/<collection>
+        JSON lines of the last diff results, see `nauti.diff.iter_diff_jsonl`
+"""
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+import json
+import asyncio
+from time import time, monotonic
+from contextlib import AsyncExitStack
+from typing import Optional, List, Dict, Iterable
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from nauti.auditor import Auditor
+from nauti.source import Source
+from nauti.diff import DiffResults, iter_diff_jsonl
+from nauti.tasks.reconile import Reconciler
+from nauti.log import get_logger, log_context
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["WatchTask", "Watcher"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                              CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+_login_locks: Dict[int, asyncio.Lock] = dict()
+
+
+def _login_lock(source: Source) -> asyncio.Lock:
+    # the sources are shared by the watch tasks; the lock ensures that a
+    # source is logged in again by one task at a time.
+    return _login_locks.setdefault(id(source), asyncio.Lock())
+
+
+class WatchTask(object):
+    """
+    The periodic audit, and optional reconcile, of one (origin, target,
+    collection) combination.
+
+    Parameters
+    ----------
+    auditor:
+        The auditor for the combination; its sources are expected to be
+        logged in by the Watcher.
+
+    interval:
+        The number of seconds between audits.
+
+    sync_actions:
+        The reconcile actions automatically applied after each audit, any of
+        "all", "add", "del", "upd"; none by default.
+
+    max_changes:
+        The reconcile policy limit; when the diff count exceeds this value the
+        reconcile is skipped so that a bad fetch cannot cause a mass change.
+
+    incremental:
+        When True, the collections that support `fetch_since` are
+        refreshed incrementally rather than refetched.
+
+    full_sweep_interval:
+        The number of seconds between the full fetches of the incrementally
+        refreshed collections.
+    """
+
+    def __init__(
+        self,
+        auditor: Auditor,
+        interval: float,
+        sync_actions: Optional[Iterable[str]] = None,
+        max_changes: Optional[int] = None,
+        incremental: Optional[bool] = False,
+        full_sweep_interval: Optional[float] = None,
+    ):
+        self.auditor = auditor
+        self.incremental = incremental
+
+        if incremental:
+            auditor.options["incremental"] = True
+            auditor.options["full_sweep_interval"] = full_sweep_interval
+
+        self.interval = interval
+        self.sync_actions = tuple(sync_actions or ())
+        self.max_changes = max_changes
+
+        self.diff_res: Optional[DiffResults] = None
+        self.runs = 0
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_reconcile: Optional[str] = None
+
+        # when True the sources are logged in again before the next audit,
+        # for example after the source session expired; see `relogin`.
+        self.needs_login = False
+
+    @property
+    def ident(self) -> str:
+        aud = self.auditor
+        return f"{aud.origin.source.name}/{aud.target.source.name}/{aud.name}"
+
+    def status(self) -> Dict:
+        diff_res = self.diff_res
+
+        return dict(
+            audit=self.ident,
+            runs=self.runs,
+            last_run=self.last_run,
+            last_duration=self.last_duration,
+            last_error=self.last_error,
+            last_reconcile=self.last_reconcile,
+            diff=(
+                None
+                if diff_res is None
+                else dict(
+                    add=len(diff_res.missing),
+                    delete=len(diff_res.extras),
+                    update=len(diff_res.changes),
+                )
+            ),
+        )
+
+    async def refresh(self):
+        """
+        Refresh the collections and compute the new diff results.  The audit
+        uses new collections so that the current diff results, and their
+        collections, can be served while the audit is running; the auditor
+        and the diff results are then replaced together.  The incrementally
+        refreshed collections start from a copy of the current items.
+        """
+        aud = self.auditor
+        new_aud = aud.fresh()
+
+        for new_col, col in (
+            (new_aud.origin, aud.origin),
+            (new_aud.target, aud.target),
+        ):
+            if self.incremental and col.supports_fetch_since:
+                new_col.copy_items(col)
+
+        diff_res = await new_aud.audit()
+        self.auditor, self.diff_res = new_aud, diff_res
+
+    async def relogin(self):
+        """log into the sources of the auditor again"""
+        aud = self.auditor
+
+        for source in {
+            id(src): src for src in (*aud.origin.sources, *aud.target.sources)
+        }.values():
+            async with _login_lock(source):
+                try:
+                    await source.logout()
+                except Exception:  # noqa
+                    pass
+
+                await source.login()
+
+    async def reconcile(self):
+        log = get_logger()
+        diff_res = self.diff_res
+
+        if not (self.sync_actions and diff_res.count):
+            self.last_reconcile = None
+            return
+
+        if self.max_changes is not None and diff_res.count > self.max_changes:
+            log.warning(
+                f"Watch {self.ident}: {diff_res.count} changes exceeds the "
+                f"max-changes {self.max_changes}, reconcile skipped."
+            )
+            self.last_reconcile = "skipped"
+            return
+
+        if (reconciler := Reconciler.get_registered(diff_res)) is None:
+            log.error(f"Watch {self.ident}: missing registered reconcile task")
+            self.last_reconcile = "missing"
+            return
+
+        reconciler.options = self.sync_actions
+        await reconciler.reconcile()
+        self.last_reconcile = "done"
+
+    async def run_once(self):
+        started = monotonic()
+        self.last_run = time()
+
+        with log_context(phase="watch"):
+            try:
+                if self.needs_login:
+                    await self.relogin()
+                    self.needs_login = False
+
+                await self.refresh()
+                await self.reconcile()
+                self.last_error = None
+
+            except Exception as exc:  # noqa
+                get_logger().exception(f"Watch {self.ident}: audit failed")
+                self.last_error = str(exc)
+
+                # the failure could be caused by an expired source session, so
+                # log in again before the next audit.
+                self.needs_login = True
+
+        self.runs += 1
+        self.last_duration = monotonic() - started
+
+    async def run(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+
+class Watcher(object):
+    """
+    Runs the watch tasks concurrently, with the shared sources logged in, and
+    serves the HTTP status endpoint.
+    """
+
+    def __init__(self, tasks: List[WatchTask], sources: Dict[str, Source]):
+        self.tasks = {task.ident: task for task in tasks}
+        self.sources = sources
+
+    async def run(self, host: str, port: int):
+        async with AsyncExitStack() as stack:
+            for source in self.sources.values():
+                await stack.enter_async_context(source)
+
+            server = await asyncio.start_server(self.handle_http, host, port)
+            get_logger().info(f"Watch: serving status on http://{host}:{port}")
+
+            async with server:
+                await asyncio.gather(*(task.run() for task in self.tasks.values()))
+
+    async def handle_http(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+
+            # consume the request headers; the request body is not used.
+            while await reader.readline() not in (b"\r\n", b"\n", b""):
+                pass
+
+            if len(parts := request_line.decode(errors="replace").split()) < 2:
+                self._http_response(writer, 400, b"")
+                await writer.drain()
+                return
+
+            method, path = parts[:2]
+
+            if method != "GET":
+                self._http_response(writer, 405, b"")
+
+            elif path == "/status":
+                body = json.dumps([task.status() for task in self.tasks.values()])
+                self._http_response(writer, 200, body.encode(), "application/json")
+
+            elif path.startswith("/diff/") and (
+                task := self.tasks.get(path[len("/diff/") :])
+            ):
+                self._http_response(writer, 200, None, "application/x-ndjson")
+                if task.diff_res:
+                    for line in iter_diff_jsonl(task.diff_res, {"all"}):
+                        writer.write(line.encode())
+                        await writer.drain()
+
+            else:
+                self._http_response(writer, 404, b"")
+
+            await writer.drain()
+
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _http_response(writer, status, body: Optional[bytes], content_type=None):
+        reason = {
+            200: "OK",
+            400: "Bad Request",
+            404: "Not Found",
+            405: "Method Not Allowed",
+        }[status]
+        headers = [f"HTTP/1.1 {status} {reason}", "Connection: close"]
+
+        if content_type:
+            headers.append(f"Content-Type: {content_type}")
+
+        if body is not None:
+            headers.append(f"Content-Length: {len(body)}")
+
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode())
+
+        if body:
+            writer.write(body)
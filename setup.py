@@ -44,6 +44,12 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=requirements(),
+    extras_require={
+        "fast-json": ["orjson"],
+        "http2": ["httpx[http2]"],
+        "brotli": ["httpx[brotli]"],
+        "columnar": ["numpy"],
+    },
     entry_points={"console_scripts": ["nauti = nauti.cli:main"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
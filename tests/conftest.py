@@ -0,0 +1,13 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def cli_loop():
+    # the sync command runs on the current event loop.
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
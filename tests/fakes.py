@@ -0,0 +1,128 @@
+"""
+The fake source and collection used by the tests; the source records are
+provided by the test, on the fake source, rather than fetched from a source
+API.
+"""
+
+import asyncio
+
+from nauti.source import Source
+from nauti.collection import Collection
+from nauti.collections.devices import DeviceCollection
+from nauti.tasks.reconile import Reconciler
+
+
+class FakeSource(Source):
+    name = "fake"
+
+    def __init__(self, options=None, records=(), **kwargs):
+        super().__init__(**kwargs)
+        self._options = options or {}
+        self.records = list(records)
+
+    @property
+    def options(self):
+        return self._options
+
+    async def login(self, *vargs, **kwargs):
+        pass
+
+    async def logout(self):
+        pass
+
+
+class FakeDevices(Collection, DeviceCollection):
+    source_class = FakeSource
+
+    def __init__(self, source=None, records=None):
+        super().__init__(source or FakeSource())
+        if records is not None:
+            self.source.records = list(records)
+        self.fetch_calls = 0
+
+    @property
+    def records(self):
+        return self.source.records
+
+    async def fetch(self, **fetch_args):
+        self.fetch_calls += 1
+        self.source.fetch_calls = getattr(self.source, "fetch_calls", 0) + 1
+        self.source_records.extend(self.records)
+
+    def itemize(self, rec):
+        return {field: rec.get(field, "") for field in self.FIELDS}
+
+
+class SiteDevices(FakeDevices):
+    """pushes the site constraint down into the fetch"""
+
+    def pushdown_filter(self, constraints, filters=None):
+        filters = dict(filters or {})
+        remaining = list()
+
+        for field, value in constraints:
+            if field == "site":
+                filters[field] = value
+            else:
+                remaining.append((field, value))
+
+        return filters, remaining
+
+    async def fetch(self, filters=None, **fetch_args):
+        self.fetch_calls += 1
+        site = (filters or {}).get("site")
+        self.source_records.extend(
+            rec for rec in self.records if site is None or rec["site"] == site
+        )
+
+
+def make_records(count, start=0, site="a", **fields):
+    return [
+        dict(
+            sn=f"sn{i}",
+            hostname=f"h{i}",
+            ipaddr=f"10.0.0.{i}",
+            site=site,
+            os_name="eos",
+            vendor="arista",
+            model="m1",
+            **fields,
+        )
+        for i in range(start, start + count)
+    ]
+
+
+def keyed(records, cls=FakeDevices, source=None):
+    """returns the collection of `cls` keyed from the `records`"""
+    col = cls(source=source, records=records)
+    col.source_records.extend(col.records)
+    col.make_keys()
+    return col
+
+
+class FakeReconciler(Reconciler):
+    """records the order of the reconcile writes into `writes`"""
+
+    def __init__(self, diff_res, **options):
+        super().__init__(diff_res, **options)
+        self.writes = list()
+
+    async def write_items(self, action, items):
+        async def write(key, value):
+            self.writes.append(("start", action, key))
+            await asyncio.sleep(0)
+            self.writes.append(("done", action, key))
+            return value
+
+        await self.target.source.update(
+            items, callback=self.update_callback(action), creator=write
+        )
+
+    async def add_items(self):
+        await self.write_items("add", self.diff_res.missing)
+
+    async def delete_items(self):
+        await self.write_items("del", self.diff_res.extras)
+
+    async def update_items(self):
+        await self.write_items("upd", self.diff_res.changes)
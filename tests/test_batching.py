@@ -0,0 +1,42 @@
+from nauti.batching import chunk_query_values
+
+from fakes import FakeDevices, FakeSource, make_records
+
+
+def test_chunk_query_values_length():
+    values = [f"host{i:02d}" for i in range(10)]
+    chunks = list(chunk_query_values(values, "name", max_length=40))
+
+    assert sum(chunks, []) == values
+    assert all(len("&".join(f"name={v}" for v in chunk)) <= 40 for chunk in chunks)
+    assert list(chunk_query_values(["x" * 100, "y"], "name", max_length=40)) == [
+        ["x" * 100],
+        ["y"],
+    ]
+
+
+def test_chunk_query_values_count():
+    chunks = list(chunk_query_values(range(7), "id", max_count=3))
+    assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+class BatchDevices(FakeDevices):
+    def fetch_batch_args(self, field, values):
+        return dict(filters={field: values})
+
+    async def fetch(self, filters=None, **fetch_args):
+        self.fetch_calls += 1
+        ((field, values),) = filters.items()
+        self.source_records.extend(rec for rec in self.records if rec[field] in values)
+
+
+async def test_fetch_coalesced():
+    col = BatchDevices(FakeSource(records=make_records(10)))
+    hostnames = ["h1", "h3", "h1", "h5", "missing"]
+
+    by_value = await col.fetch_coalesced("hostname", hostnames, max_count=2)
+
+    assert col.fetch_calls == 2
+    assert list(by_value) == ["h1", "h3", "h5", "missing"]
+    assert [rec["sn"] for rec in by_value["h3"]] == ["sn3"]
+    assert by_value["missing"] == []
@@ -0,0 +1,66 @@
+import gzip
+
+import httpx
+import pytest
+
+from nauti.cassette import Cassette, CassetteTransport
+
+BODY = b'{"results": [' + b",".join(b'{"id": %d}' % i for i in range(100)) + b"]}"
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/gzip":
+        return httpx.Response(
+            200,
+            headers={"content-encoding": "gzip", "content-type": "application/json"},
+            content=gzip.compress(BODY),
+        )
+
+    return httpx.Response(404, content=b"not found")
+
+
+async def fetch(transport, *paths):
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        return [await client.get(path) for path in paths]
+
+
+async def test_cassette_roundtrip_compressed(tmp_path):
+    filepath = tmp_path / "fake-default.jsonl"
+
+    recorder = CassetteTransport(
+        httpx.MockTransport(handler), Cassette(filepath, mode="record")
+    )
+    recorded = await fetch(recorder, "/gzip", "/missing")
+    assert recorded[0].content == BODY
+    assert recorded[1].status_code == 404
+
+    def offline(request):
+        raise AssertionError("replay must not send requests")
+
+    player = CassetteTransport(
+        httpx.MockTransport(offline),
+        Cassette(filepath, mode="replay", latency_scale=0),
+    )
+    replayed = await fetch(player, "/gzip", "/missing", "/gzip")
+
+    assert [res.status_code for res in replayed] == [200, 404, 200]
+    assert replayed[0].content == BODY
+    assert replayed[0].headers["content-encoding"] == "gzip"
+    assert replayed[0].extensions["nauti_cassette"] == "replay"
+
+
+async def test_cassette_replay_unrecorded(tmp_path):
+    filepath = tmp_path / "fake-default.jsonl"
+    filepath.write_text("")
+
+    player = CassetteTransport(
+        httpx.MockTransport(handler), Cassette(filepath, mode="replay")
+    )
+
+    with pytest.raises(RuntimeError):
+        await fetch(player, "/gzip")
+
+
+def test_cassette_replay_missing_file(tmp_path):
+    with pytest.raises(RuntimeError):
+        Cassette(tmp_path / "none.jsonl", mode="replay")
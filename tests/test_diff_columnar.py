@@ -0,0 +1,84 @@
+import pytest
+
+from nauti import diff_columnar
+from nauti.diff import diff
+
+from fakes import FakeDevices, make_records, keyed
+
+
+class MixedDevices(FakeDevices):
+    FIELDS = (*FakeDevices.FIELDS, "ports", "speed")
+
+
+def make_collections(cls=FakeDevices):
+    origin = make_records(6)
+    target = make_records(6, start=2)
+
+    for rec in origin:
+        rec.update(ports=1, speed=1.5)
+    for rec in target:
+        rec.update(ports=1, speed=1.5)
+
+    origin[2]["model"] = "m2"
+    origin[3]["hostname"] = "H3"
+    origin[4]["ports"] = None
+    origin[5]["ports"] = 2**70
+    target[3]["speed"] = 1
+
+    return keyed(origin, cls), keyed(target, cls)
+
+
+def assert_same_diff(origin, target, **diff_args):
+    expected = diff(origin, target, **diff_args)
+    diff_res = diff(origin, target, engine="numpy", **diff_args)
+
+    assert diff_res == expected
+    return diff_res
+
+
+def test_columnar_diff_same_results():
+    diff_res = assert_same_diff(*make_collections(MixedDevices))
+    assert set(diff_res.missing) == {"sn0", "sn1"}
+    assert set(diff_res.extras) == {"sn6", "sn7"}
+    assert diff_res.changes == {
+        "sn2": {"model": "m2"},
+        "sn3": {"hostname": "H3"},
+        "sn4": {"ports": None},
+        "sn5": {"ports": 2**70, "speed": 1.5},
+    }
+
+
+def test_columnar_diff_fields():
+    origin, target = make_collections(MixedDevices)
+
+    diff_res = assert_same_diff(origin, target, fields_cmp={"hostname": str.lower})
+    assert "sn3" not in diff_res.changes
+
+    diff_res = assert_same_diff(origin, target, fields=["model"])
+    assert diff_res.changes == {"sn2": {"model": "m2"}}
+
+
+def test_columnar_diff_tuple_keys_and_empty():
+    origin, target = make_collections()
+    for col in (origin, target):
+        col.rekey("sn", "hostname")
+
+    assert_same_diff(origin, target)
+    assert_same_diff(origin, FakeDevices())
+    assert_same_diff(FakeDevices(), target)
+
+
+def test_columnar_diff_key_hash_collision(monkeypatch):
+    origin, target = make_collections()
+    monkeypatch.setattr(diff_columnar, "hash", lambda key: 0, raising=False)
+    assert_same_diff(origin, target)
+
+
+def test_columnar_diff_requires_numpy(monkeypatch):
+    monkeypatch.setattr(diff_columnar, "np", None)
+
+    with pytest.raises(RuntimeError, match="numpy"):
+        diff(*make_collections(), engine="numpy")
+
+    with pytest.raises(RuntimeError, match="Unsupported"):
+        diff(*make_collections(), engine="pandas")
@@ -0,0 +1,65 @@
+import io
+import csv
+import json
+
+from nauti.diff import diff, diff_report
+from nauti.log import set_log_stream, setup_logging, stop_logging, get_logger
+
+from fakes import FakeDevices, make_records, keyed
+
+
+class ActionDevices(FakeDevices):
+    FIELDS = (*FakeDevices.FIELDS, "action", "changed")
+
+
+def make_diff(cls=FakeDevices):
+    origin = make_records(3, action="keep", changed="no")
+    origin[0]["model"] = "m2"
+    target = make_records(2, start=1, action="keep", changed="no")
+    target.append(make_records(1, start=9)[0])
+    return diff(keyed(origin, cls), keyed(target, cls))
+
+
+def test_diff_report_default_reports_none(capsys):
+    for fmt in ("table", "jsonl", "csv"):
+        output = io.StringIO()
+        diff_report(make_diff(), fmt=fmt, output=output)
+        assert output.getvalue() == ""
+
+
+def test_diff_report_jsonl():
+    output = io.StringIO()
+    diff_report(make_diff(), reports={"all"}, fmt="jsonl", output=output)
+
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [row["action"] for row in rows] == ["add", "del"]
+
+    output = io.StringIO()
+    diff_report(make_diff(), reports={"add"}, fmt="jsonl", output=output)
+    assert len(output.getvalue().splitlines()) == 1
+
+
+def test_diff_report_csv_field_named_action():
+    diff_res = make_diff(ActionDevices)
+    diff_res.changes = {"sn1": {"model": "m9", "action": "move"}}
+
+    output = io.StringIO()
+    diff_report(diff_res, reports={"all"}, fmt="csv", output=output)
+
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert [row["_action"] for row in rows] == ["add", "del", "upd"]
+    assert rows[0]["action"] == "keep"
+    assert rows[2]["action"] == "move"
+    assert rows[2]["_changed"] == "model;action"
+
+
+def test_log_stream_set_before_setup():
+    stream = io.StringIO()
+    set_log_stream(stream)
+    try:
+        setup_logging()
+        get_logger().warning("to the stream")
+        stop_logging()
+        assert "to the stream" in stream.getvalue()
+    finally:
+        set_log_stream(None)
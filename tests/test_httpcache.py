@@ -0,0 +1,105 @@
+import threading
+
+import httpx
+
+from nauti.httpcache import HTTPCacheTransport
+
+
+class Origin(object):
+    """the fake API server; responds 304 when the ETag matches"""
+
+    def __init__(self, **headers):
+        self.headers = headers
+        self.requests = list()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+
+        return httpx.Response(
+            200,
+            headers={"etag": '"v1"', **self.headers},
+            content=request.url.path.encode() * 10,
+        )
+
+
+async def get(transport, *paths, **headers):
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        return [await client.get(path, headers=headers) for path in paths]
+
+
+def make_cache(tmp_path, origin, **kwargs):
+    return HTTPCacheTransport(httpx.MockTransport(origin), tmp_path, **kwargs)
+
+
+async def test_httpcache_conditional_hit(tmp_path):
+    cache = make_cache(tmp_path, origin := Origin())
+    first, second = await get(cache, "/a", "/a")
+
+    assert second.content == first.content == b"/a" * 10
+    assert second.extensions.get("nauti_cache") == "hit"
+    assert origin.requests[1].headers["if-none-match"] == '"v1"'
+    assert cache.hits == 1
+
+
+async def test_httpcache_no_store(tmp_path):
+    for cache_control in ("no-store", "private, max-age=60"):
+        cache = make_cache(tmp_path, Origin(**{"cache-control": cache_control}))
+        await get(cache, "/a", "/a")
+        assert cache.hits == 0 and not cache.index
+
+
+async def test_httpcache_vary(tmp_path):
+    cache = make_cache(tmp_path, origin := Origin(vary="Accept"))
+
+    await get(cache, "/a", accept="application/json")
+    await get(cache, "/a", accept="text/csv")
+    assert "if-none-match" not in origin.requests[1].headers
+
+    await get(cache, "/a", accept="text/csv")
+    assert cache.hits == 1
+
+
+async def test_httpcache_evict_low_water(tmp_path):
+    # each body is 20 bytes; the cache holds at most 5 of them.
+    cache = make_cache(tmp_path, Origin(), max_size=100)
+    await get(cache, *(f"/{i}" for i in range(5)))
+    assert cache.size == 100 and len(cache.index) == 5
+
+    # the hit of /0 makes /1 and /2 the least recently used, which are both
+    # evicted to bring the size under the low-water mark.
+    await get(cache, "/0", "/5")
+    assert cache.hits == 1
+    assert (cache.size, len(cache.index)) == (80, 4)
+
+    await get(cache, "/1", "/0")
+    assert cache.hits == 2
+    assert len(list(tmp_path.glob("*.body"))) == len(cache.index)
+
+    # the index is rebuilt from the cache directory.
+    assert make_cache(tmp_path, Origin(), max_size=100).size == cache.size
+
+
+async def test_httpcache_unbounded(tmp_path):
+    cache = make_cache(tmp_path, Origin(), max_size=None)
+    await get(cache, *(f"/{i}" for i in range(5)))
+    assert cache.size == 100 and len(cache.index) == 5
+
+
+async def test_httpcache_io_thread(tmp_path):
+    cache = make_cache(tmp_path, Origin())
+    io_threads = set()
+
+    for name in ("_load", "_read_body", "_write_entry"):
+        func = getattr(cache, name)
+
+        def traced(*args, _func=func):
+            io_threads.add(threading.current_thread())
+            return _func(*args)
+
+        setattr(cache, name, traced)
+
+    await get(cache, "/a", "/a")
+    assert cache.hits == 1
+    assert io_threads and threading.main_thread() not in io_threads
@@ -0,0 +1,73 @@
+from nauti.diff import diff, idiff
+
+from fakes import FakeReconciler, make_records, keyed
+
+
+def make_collections():
+    origin = make_records(3)
+    origin[1]["model"] = "m2"
+    target = make_records(2, start=1) + make_records(1, start=9)
+    return keyed(origin), keyed(target)
+
+
+def test_idiff_matches_diff():
+    origin, target = make_collections()
+    events = list(idiff(origin, target))
+    diff_res = diff(origin, target)
+
+    assert [(event.action, event.key) for event in events] == [
+        ("add", "sn0"),
+        ("upd", "sn1"),
+        ("del", "sn9"),
+    ]
+    assert {e.key: e.item for e in events if e.action == "upd"} == diff_res.changes
+
+
+class EventReconciler(FakeReconciler):
+    """records the writes, and the number of results applied as each starts"""
+
+    def __init__(self, diff_res, **options):
+        super().__init__(diff_res, **options)
+        self.applied = 0
+
+    async def write(self, action, key, item):
+        self.writes.append((action, key, self.applied))
+        return item
+
+    def apply_result(self, action, key, item, res):
+        super().apply_result(action, key, item, res)
+        self.applied += 1
+
+    def add_item(self, key, item):
+        return self.write("add", key, item)
+
+    def delete_item(self, key, item):
+        return self.write("del", key, item)
+
+    def update_item(self, key, changes):
+        return self.write("upd", key, changes)
+
+
+async def test_reconcile_events():
+    origin, target = make_collections()
+
+    reconciler = EventReconciler(diff(origin, target))
+    await reconciler.reconcile_events(idiff(origin, target), actions={"add", "upd"})
+
+    assert sorted(key for _, key, _ in reconciler.writes) == ["sn0", "sn1"]
+    assert target.items["sn1"]["model"] == "m2"
+    assert "sn0" in target.items and "sn9" in target.items
+
+
+async def test_reconcile_events_applied_as_completed():
+    origin, target = make_collections()
+    target.upsert_records(make_records(2, start=10))
+
+    reconciler = EventReconciler(diff(origin, target))
+    await reconciler.reconcile_events(idiff(origin, target), actions={"all"}, limit=1)
+
+    # each result is applied before the next write starts, and the target
+    # items are changed while the target keys are walked.
+    assert [applied for *_, applied in reconciler.writes] == [0, 1, 2, 3, 4]
+    assert set(target.items) == set(origin.items)
+    assert target.items["sn1"]["model"] == "m2"
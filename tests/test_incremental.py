@@ -0,0 +1,86 @@
+from nauti.auditor import Auditor
+
+from fakes import FakeSource, FakeDevices, make_records
+
+
+class SinceDevices(FakeDevices):
+    since_calls = 0
+
+    def __init__(self, source=None, records=None):
+        super().__init__(source, records)
+        self.changed = []
+
+    async def fetch_since(self, watermark, **fetch_args):
+        self.since_calls += 1
+        self.source_records.extend(
+            rec for rec in self.changed if rec["modified"] > watermark
+        )
+
+    def record_watermark(self, rec):
+        return rec["modified"]
+
+
+async def test_incremental_refresh_merges_changes():
+    col = SinceDevices(records=make_records(3, modified=1))
+
+    assert await col.fetch_incremental() is False
+    assert col.watermark == 1 and len(col.items) == 3
+
+    col.changed = make_records(1, start=3, modified=2)
+    assert await col.fetch_incremental() is True
+    assert col.watermark == 2 and len(col.items) == 4
+
+
+async def test_incremental_refresh_does_not_grow_source_records():
+    col = SinceDevices(records=make_records(3, modified=1))
+    await col.fetch_incremental()
+
+    for modified in range(2, 12):
+        col.changed = make_records(2, start=1, modified=modified)
+        assert await col.fetch_incremental() is True
+        assert len(col.source_records) == 3
+
+    assert col.watermark == 11
+    assert col.source_record_keys["sn2"]["modified"] == 11
+
+
+async def test_incremental_watermarks_are_per_collection():
+    # two collections of the same source and collection name, for example
+    # two watch tasks with different filters, keep their own watermarks.
+
+    source = FakeSource(records=make_records(3, modified=1))
+    col_a, col_b = SinceDevices(source), SinceDevices(source)
+
+    await col_a.fetch_incremental()
+    col_a.changed = make_records(1, start=3, modified=5)
+    await col_a.fetch_incremental()
+    assert col_a.watermark == 5
+
+    assert await col_b.fetch_incremental() is False
+    assert col_b.watermark == 1 and len(col_b.items) == 3
+
+
+async def test_incremental_full_sweep_interval():
+    col = SinceDevices(records=make_records(2, modified=1))
+    await col.fetch_incremental(full_sweep_interval=3600)
+    assert await col.fetch_incremental(full_sweep_interval=3600) is True
+
+    col.swept -= 3600
+    assert await col.fetch_incremental(full_sweep_interval=3600) is False
+
+
+async def test_incremental_fresh_copy_keeps_watermark():
+    auditor = Auditor(
+        origin=SinceDevices(FakeSource(records=make_records(2, modified=1))),
+        target=FakeDevices(FakeSource()),
+        incremental=True,
+    )
+    await auditor.audit()
+
+    fresh = auditor.fresh()
+    fresh.origin.copy_items(auditor.origin)
+    assert fresh.origin.watermark == 1
+
+    await fresh.audit()
+    assert fresh.origin.since_calls == 1
+    assert len(fresh.diff_res.missing) == 2
@@ -0,0 +1,31 @@
+from fakes import FakeDevices, make_records, keyed
+
+
+class IndexedDevices(FakeDevices):
+    INDEXES = [("site",)]
+
+
+def test_indexes_query():
+    col = keyed(
+        make_records(3, site="a") + make_records(2, start=3, site="b"), IndexedDevices
+    )
+
+    assert col.query(site="b") == {"sn3", "sn4"}
+    assert len(col.indexes[("site",)]) == 2
+
+    # a query without a matching index scans the items.
+    assert col.query(hostname="h1") == {"sn1"}
+
+    col.add_index("site", "model")
+    assert col.query(site="a", model="m1") == {"sn0", "sn1", "sn2"}
+    assert [item["sn"] for item in col.query_items(site="c")] == []
+
+
+def test_indexes_follow_upsert_and_remove():
+    col = keyed(make_records(3, site="a"), IndexedDevices)
+
+    col.upsert_records([dict(make_records(1, start=1)[0], site="b")])
+    col.remove_keys(["sn2"])
+
+    assert col.query(site="a") == {"sn0"}
+    assert col.query(site="b") == {"sn1"}
@@ -0,0 +1,55 @@
+from fakes import FakeSource, FakeDevices, make_records
+
+
+class UidDevices(FakeDevices):
+    def record_uid(self, rec):
+        return rec["sn"]
+
+
+def merged_devices(cls=UidDevices):
+    col = cls()
+    col.instances = {
+        "east": cls(FakeSource(records=make_records(2, site="east"))),
+        "west": cls(FakeSource(records=make_records(3, start=2, site="west"))),
+    }
+    return col
+
+
+async def test_instances_merge_provenance():
+    col = merged_devices()
+    await col.fetch_instances()
+
+    assert len(col.items) == 5
+    assert col.instance_of("sn0") is col.instances["east"]
+    assert col.instance_of("sn4") is col.instances["west"]
+
+    # the instance collections are released once merged.
+    assert all(not inst_col.items for inst_col in col.instances.values())
+    assert all(not inst_col.source_records for inst_col in col.instances.values())
+
+
+async def test_instances_rekey_keeps_provenance():
+    col = merged_devices()
+    await col.fetch_instances()
+
+    col.rekey("hostname")
+    assert set(col.items) == {f"h{i}" for i in range(5)}
+    assert col.instance_of("h1") is col.instances["east"]
+    assert col.instance_of("h3") is col.instances["west"]
+
+    # the uid index of the instance records is also kept.
+    assert col.uid_keys[("west", "sn3")] == "h3"
+
+
+async def test_instances_upsert_keeps_provenance():
+    col = merged_devices()
+    await col.fetch_instances()
+
+    col.rekey("hostname")
+    rec = dict(make_records(1, start=3, site="west")[0], hostname="renamed")
+    col.response_record = lambda res: res
+    col.write_through("upd", "h3", {}, rec)
+
+    assert "h3" not in col.items
+    assert col.instance_of("renamed") is col.instances["west"]
+    assert col.uid_keys[("west", "sn3")] == "renamed"
@@ -0,0 +1,146 @@
+import asyncio
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from nauti.auditor import Auditor
+from nauti.diff import diff
+from nauti.journal import WriteJournal
+from nauti.tasks.reconile import Reconciler
+from nauti.cli.sync import begin_journal, cli_sync
+
+from fakes import FakeSource, FakeDevices, make_records, keyed
+
+
+def make_diff():
+    origin = make_records(3)
+    origin[0]["model"] = "m2"
+    target = make_records(2, start=0)
+    target.append(make_records(1, start=9)[0])
+
+    origin_col, target_col = keyed(origin), keyed(target)
+    for col in (origin_col, target_col):
+        col.rekey("sn", "hostname")
+
+    # values that do not round-trip as plain JSON.
+    origin_col.items[("sn2", "h2")]["tags"] = ("a", "b")
+    origin_col.source_record_keys[("sn2", "h2")]["ports"] = {1: "eth1"}
+    return diff(origin_col, target_col)
+
+
+def test_journal_resume_roundtrip(tmp_path):
+    diff_res = make_diff()
+    assert diff_res.count == 3
+
+    journal = WriteJournal(tmp_path / "journal.jsonl")
+    journal.begin(diff_res, ("all",))
+    journal.record_done((("sn9", "h9"), None), res=object())
+    journal.close()
+
+    origin, target = FakeDevices(), FakeDevices()
+    resumed, actions = journal.load(origin, target)
+
+    assert actions == ("all",)
+    assert journal.done == {("sn9", "h9")}
+    assert set(resumed.missing) == {("sn2", "h2")}
+    assert set(resumed.changes) == {("sn0", "h0")}
+    assert not resumed.extras and resumed.count == 2
+
+    # the keys, items, and origin source records are restored with their types.
+    assert resumed.missing[("sn2", "h2")]["tags"] == ("a", "b")
+    assert origin.source_record_keys[("sn2", "h2")]["ports"] == {1: "eth1"}
+    assert origin.items[("sn0", "h0")]["model"] == "m2"
+    assert target.items[("sn0", "h0")]["model"] == "m1"
+    assert target.source_record_keys[("sn0", "h0")]["sn"] == "sn0"
+
+
+def test_journal_load_keeps_indexes(tmp_path):
+    class IndexedDevices(FakeDevices):
+        INDEXES = [("site",)]
+
+        def record_uid(self, rec):
+            return rec["sn"]
+
+    journal = WriteJournal(tmp_path / "journal.jsonl")
+    journal.begin(make_diff(), ("all",))
+    journal.close()
+
+    origin, target = IndexedDevices(), IndexedDevices()
+    journal.load(origin, target)
+
+    assert origin.query(site="a") == {("sn0", "h0"), ("sn2", "h2")}
+    assert target.query(site="a") == {("sn0", "h0"), ("sn9", "h9")}
+    assert target.uid_keys["sn9"] == ("sn9", "h9")
+
+
+def test_journal_complete_nothing_to_resume(tmp_path):
+    journal = WriteJournal(tmp_path / "journal.jsonl")
+    journal.begin(make_diff(), ("add",))
+    journal.complete()
+
+    assert journal.load(FakeDevices(), FakeDevices()) is None
+    assert [entry["op"] for entry in journal.entries()] == ["begin", "plan", "end"]
+
+
+def test_journal_unwritable_state_dir(tmp_path, monkeypatch):
+    not_a_dir = tmp_path / "state"
+    not_a_dir.write_text("")
+    monkeypatch.setenv("NAUTI_STATE_DIR", str(not_a_dir))
+
+    with pytest.raises(click.ClickException):
+        begin_journal("fake", "fake", "devices", make_diff(), ("all",))
+
+
+def test_cli_resume_interrupted_twice(tmp_path, monkeypatch, cli_loop):
+    monkeypatch.setenv("NAUTI_STATE_DIR", str(tmp_path))
+    written, stops = list(), [2, 4, None]
+
+    class InterruptedReconciler(Reconciler):
+        async def add_items(self):
+            async def write(key, value):
+                await asyncio.sleep(0)
+                if len(written) == stops[0]:
+                    raise RuntimeError("interrupted")
+                written.append(key)
+                return value
+
+            await self.target.source.update(
+                self.diff_res.missing, callback=None, creator=write, limit=1
+            )
+
+    monkeypatch.setattr(
+        Auditor,
+        "get_registered",
+        staticmethod(
+            lambda *vargs, **kwargs: Auditor(
+                FakeDevices(FakeSource(records=make_records(6))), FakeDevices()
+            )
+        ),
+    )
+    monkeypatch.setattr(
+        Reconciler, "get_registered", staticmethod(InterruptedReconciler)
+    )
+
+    def sync(*args):
+        return CliRunner().invoke(
+            cli_sync,
+            ["--origin", "fake", "--target", "fake", "--collection", "devices", *args],
+        )
+
+    result = sync("--sync-action", "add", "--journal")
+    assert str(result.exception) == "interrupted"
+    assert len(written) == 2
+
+    stops.pop(0)
+    result = sync("--resume")
+    assert str(result.exception) == "interrupted"
+    assert len(set(written)) == len(written) == 4
+
+    stops.pop(0)
+    result = sync("--resume")
+    assert result.exit_code == 0, result.output
+
+    # each write is made once across the interrupted and resumed runs.
+    assert sorted(written) == [f"sn{i}" for i in range(6)]
+    assert "No interrupted reconcile" in sync("--resume").output
@@ -0,0 +1,67 @@
+import json
+
+import httpx
+import pytest
+
+from nauti import jsonlib
+from nauti.jsonlib import loads, set_decoder, decode_response, iter_records
+
+
+async def achunks(data, size):
+    for offset in range(0, len(data), size):
+        yield data[offset : offset + size]
+
+
+async def parse(data, size, key=None):
+    return [rec async for rec in iter_records(achunks(data, size), key=key)]
+
+
+RECORDS = [
+    {"name": "sw1", "ports": [1, 2], "note": "café ☃"},
+    {"name": "sw2", "ports": [], "note": None},
+    12345,
+    -1.5e3,
+]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+async def test_iter_records_array(size):
+    data = json.dumps(RECORDS, ensure_ascii=False).encode()
+    assert await parse(data, size) == RECORDS
+
+
+@pytest.mark.parametrize("size", [1, 5, 1024])
+async def test_iter_records_key(size):
+    body = {"count": 4, "meta": {"data": [0]}, "data": RECORDS, "next": None}
+    data = json.dumps(body, indent=2).encode()
+    assert await parse(data, size, key="data") == RECORDS
+
+    assert await parse(b'{"count": 0}', size, key="data") == []
+    assert await parse(b" [ ] ", size) == []
+
+
+async def test_iter_records_malformed():
+    with pytest.raises(ValueError):
+        await parse(b'{"data": [1, 2}', 4, key="data")
+
+    with pytest.raises(ValueError):
+        await parse(b"[1, 2", 2)
+
+
+def test_set_decoder():
+    calls = list()
+
+    def decoder(data):
+        calls.append(data)
+        return json.loads(data)
+
+    set_decoder(decoder)
+    try:
+        response = httpx.Response(200, json={"a": 1})
+        assert decode_response(response) == {"a": 1}
+        assert calls == [response.content]
+    finally:
+        set_decoder()
+
+    assert jsonlib._decoder is not decoder
+    assert loads(b'{"a": [1]}') == {"a": [1]}
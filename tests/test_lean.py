@@ -0,0 +1,38 @@
+import logging
+
+from nauti.auditor import Auditor
+
+from fakes import FakeSource, FakeDevices, make_records
+
+
+class LeanDevices(FakeDevices):
+    RECORD_FIELDS = ("sn", "site")
+
+
+def make_auditor(cls):
+    return Auditor(
+        origin=cls(FakeSource(records=make_records(3, extra="x" * 100))),
+        target=cls(FakeSource()),
+        lean=True,
+    )
+
+
+async def test_lean_projects_records():
+    auditor = make_auditor(LeanDevices)
+    diff_res = await auditor.audit()
+
+    origin = auditor.origin
+    assert origin.lean and not origin.source_records
+    assert origin.source_record_keys["sn0"] == {"sn": "sn0", "site": "a"}
+    assert len(diff_res.missing) == 3
+
+
+async def test_lean_unsupported_warns(caplog):
+    auditor = make_auditor(FakeDevices)
+
+    with caplog.at_level(logging.WARNING, logger="nauti"):
+        await auditor.audit()
+
+    assert not auditor.origin.lean
+    assert "extra" in auditor.origin.source_record_keys["sn0"]
+    assert caplog.text.count("lean mode is not supported") == 2
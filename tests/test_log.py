@@ -0,0 +1,61 @@
+import io
+import json
+
+import pytest
+
+import nauti.log as nauti_log
+from nauti.log import (
+    JsonFormatter,
+    setup_logging,
+    stop_logging,
+    set_log_format,
+    set_log_stream,
+    get_logger,
+    log_context,
+)
+
+
+def capture_logs(emit):
+    stream = io.StringIO()
+    set_log_stream(stream)
+    log = get_logger()
+    handlers = list(log.handlers)
+
+    try:
+        setup_logging()
+        emit(log)
+        stop_logging()
+    finally:
+        log.handlers[:] = handlers
+        set_log_stream(None)
+        set_log_format("text")
+
+    return stream.getvalue().splitlines()
+
+
+def test_set_log_format_before_setup():
+    set_log_format("json")
+
+    def emit(log):
+        with log_context(source="fake", phase="fetch"):
+            log.warning("hello")
+
+    (line,) = capture_logs(emit)
+    rec = json.loads(line)
+    assert (rec["message"], rec["level"]) == ("hello", "WARNING")
+    assert (rec["source"], rec["phase"]) == ("fake", "fetch")
+    assert "collection" not in rec
+
+
+def test_set_log_format_after_setup():
+    def emit(log):
+        set_log_format("json")
+        (handler,) = nauti_log.g_log_listener.handlers
+        assert isinstance(handler.formatter, JsonFormatter)
+
+    capture_logs(emit)
+
+
+def test_set_log_format_invalid():
+    with pytest.raises(ValueError):
+        set_log_format("xml")
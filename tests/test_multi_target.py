@@ -0,0 +1,44 @@
+import click
+import pytest
+
+from nauti.auditor import Auditor
+from nauti.cli.sync import parse_target, target_label
+
+from fakes import FakeSource, FakeDevices, make_records
+
+
+def test_parse_target():
+    assert parse_target("netbox", ()) == ("netbox", ())
+    assert parse_target("netbox", ("east",)) == ("netbox", ("east",))
+    assert parse_target("netbox:west", ()) == ("netbox", ("west",))
+
+    with pytest.raises(click.UsageError):
+        parse_target("netbox:west", ("east",))
+
+
+def instance_devices(instance, records):
+    source = FakeSource(records=records)
+    source.instance = instance
+    col = FakeDevices()
+    col.instances = {instance: FakeDevices(source)}
+    return col
+
+
+def test_target_label():
+    assert target_label(FakeDevices()) == "fake"
+    assert target_label(instance_devices("east", [])) == "fake:east"
+
+
+async def test_audit_targets_instances_of_one_source():
+    origin = FakeDevices(FakeSource(records=make_records(3)))
+    east = instance_devices("east", make_records(1))
+    west = instance_devices("west", make_records(2, start=1))
+
+    diff_east, diff_west = await Auditor.audit_targets(
+        [Auditor(origin, east), Auditor(origin.fresh(), west)]
+    )
+
+    assert origin.fetch_calls == 1
+    assert set(diff_east.missing) == {"sn1", "sn2"}
+    assert set(diff_west.missing) == {"sn0"}
+    assert east.instance_of("sn0") is east.instances["east"]
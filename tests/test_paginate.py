@@ -0,0 +1,84 @@
+from nauti.paginate import Paginator
+from nauti.progress import Progress
+
+
+class ListPaginator(Paginator):
+    """pages the `records` by offset, or by cursor"""
+
+    # the page size is not tuned, so that the pages are predictable.
+    max_growth = 1.0
+    min_page_size = 1
+
+    def __init__(self, records, with_total=True, with_cursor=False, **kwargs):
+        super().__init__(**kwargs)
+        self.records = records
+        self.with_total = with_total
+        self.with_cursor = with_cursor
+        self.requests = list()
+
+    async def fetch_page(self, offset, page_size, cursor=None):
+        self.requests.append((offset, page_size, cursor))
+        start = cursor if cursor is not None else offset
+        return dict(start=start, records=self.records[start : start + page_size])
+
+    def page_records(self, response):
+        return response["records"]
+
+    def page_total(self, response):
+        return len(self.records) if self.with_total else None
+
+    def page_cursor(self, response):
+        if not self.with_cursor:
+            return None
+        end = response["start"] + len(response["records"])
+        return end if end < len(self.records) else None
+
+
+async def test_paginate_offset_pages():
+    progress = Progress("test")
+    pager = ListPaginator(list(range(25)), page_size=10, progress=progress)
+
+    assert sorted(await pager.fetch()) == list(range(25))
+    assert pager.total == progress.total == 25
+    assert progress.completed == 25
+    assert sorted(offset for offset, *_ in pager.requests) == [0, 10, 20]
+
+
+async def test_paginate_without_total():
+    pager = ListPaginator(list(range(25)), page_size=10, with_total=False)
+
+    assert await pager.fetch() == list(range(25))
+    assert pager.total is None
+    assert [offset for offset, *_ in pager.requests] == [0, 10, 20]
+
+
+async def test_paginate_cursor():
+    pager = ListPaginator(list(range(25)), page_size=10, with_cursor=True)
+
+    pages = [page async for page in pager.ipages()]
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [(offset, cursor) for offset, _, cursor in pager.requests] == [
+        (0, None),
+        (None, 10),
+        (None, 20),
+    ]
+
+
+def test_paginate_tune():
+    pager = Paginator(page_size=1000)
+
+    # a fast page grows the page size, bounded by the growth factor.
+    pager.tune(1000, 1000, elapsed=0.1, nbytes=0)
+    assert pager.page_size == 2000
+
+    # a slow page shrinks it toward the target latency.
+    pager.tune(2000, 2000, elapsed=4.0, nbytes=0)
+    assert pager.page_size == 1000
+
+    # a large payload bounds it by the max page bytes.
+    pager.tune(1000, 1000, elapsed=2.0, nbytes=pager.max_page_bytes * 4 // 3)
+    assert pager.page_size == 750
+
+    # a short page, the last page, does not change it.
+    pager.tune(750, 10, elapsed=10.0, nbytes=0)
+    assert pager.page_size == 750
@@ -0,0 +1,59 @@
+import asyncio
+
+from nauti.diff import diff
+from nauti.tasks.plan import estimate_plan, projected_duration
+
+from fakes import FakeReconciler, make_records, keyed
+
+
+def make_reconciler(**attrs):
+    origin = make_records(10)
+    target = make_records(4, start=8)
+    reconciler = FakeReconciler(diff(keyed(origin), keyed(target)))
+    for name, value in attrs.items():
+        setattr(reconciler, name, value)
+    return reconciler
+
+
+def test_estimate_plan_calls():
+    reconciler = make_reconciler(batch_size={"add": 3}, calls_per_item={"del": 2})
+    estimates = {est.action: est for est in estimate_plan(reconciler, ["all"])}
+
+    assert (estimates["add"].items, estimates["add"].batched_calls) == (8, 3)
+    assert (estimates["del"].api_calls, estimates["del"].batched_calls) == (4, 4)
+    assert estimates["add"].duration is None
+
+
+def test_estimate_plan_duration():
+    reconciler = make_reconciler()
+    stats = reconciler.target.source.stats
+    for _ in range(4):
+        stats.record(0.5)
+
+    estimates = estimate_plan(reconciler, ["add", "del"])
+    assert [est.action for est in estimates] == ["add", "del"]
+    assert [est.duration for est in estimates] == [0.5, 0.5]
+    assert projected_duration(reconciler, estimates) == 1.0
+
+
+async def test_estimate_plan_source_concurrency():
+    reconciler = make_reconciler()
+    source = reconciler.target.source
+    source._options = dict(concurrency=3)
+    source.stats.record(1.0)
+
+    (estimate,) = estimate_plan(reconciler, ["add"])
+    assert estimate.duration == 3.0
+
+    # the writes are made at the source concurrency that the plan uses.
+    running, peak = 0, 0
+
+    async def write(key, value):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+
+    await source.update(reconciler.diff_res.missing, callback=None, creator=write)
+    assert peak == 3
@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+
+from nauti.progress import Progress
+
+from fakes import FakeSource
+
+
+def make_client(source):
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+    return httpx.AsyncClient(
+        transport=transport,
+        base_url="http://api",
+        event_hooks=source.client_event_hooks(),
+    )
+
+
+async def test_progress_counts():
+    progress = Progress("test", total=4)
+    progress.advance()
+    progress.advance(2, error=True)
+
+    assert (progress.completed, progress.errors) == (3, 1)
+    assert "3/4" in str(progress)
+
+
+async def test_track_progress_concurrent_users():
+    source = FakeSource()
+    started = asyncio.Event()
+
+    async def fetch(client, name, count, wait):
+        with source.track_progress(name) as progress:
+            if wait:
+                await started.wait()
+            else:
+                started.set()
+            for _ in range(count):
+                await client.get("/")
+                await asyncio.sleep(0)
+        return progress
+
+    async with make_client(source) as client:
+        prog_a, prog_b = await asyncio.gather(
+            fetch(client, "a", 3, wait=False), fetch(client, "b", 5, wait=True)
+        )
+
+        # the progress is not left set, nor restored to a closed progress.
+        assert source.progress is None
+        await client.get("/")
+
+    assert prog_a.completed == 3
+    assert prog_b.completed == 5
+
+
+async def test_track_progress_nested():
+    source = FakeSource()
+
+    async with make_client(source) as client:
+        with source.track_progress("outer") as outer:
+            await client.get("/")
+            with source.track_progress("inner") as inner:
+                await client.get("/")
+            await client.get("/")
+
+    assert (outer.completed, inner.completed) == (2, 1)
@@ -0,0 +1,27 @@
+from nauti.auditor import Auditor
+from nauti.filtering import is_literal, parse_constraints
+
+from fakes import FakeSource, SiteDevices, make_records
+
+
+def test_parse_constraints_literals():
+    constraints = parse_constraints(["site=atl", "hostname=sw.*"], ["site", "hostname"])
+    assert constraints == [("site", "atl"), ("hostname", "sw.*")]
+    assert [is_literal(value) for _, value in constraints] == [True, False]
+
+
+async def test_origin_include_pushdown():
+    records = make_records(2, site="a") + make_records(2, start=2, site="b")
+    records[2]["hostname"] = "sw2"
+
+    auditor = Auditor(
+        origin=SiteDevices(FakeSource(records=records)),
+        target=SiteDevices(FakeSource()),
+        origin_include=["site=b", "hostname=sw.*"],
+    )
+    diff_res = await auditor.audit()
+
+    # the site constraint is pushed down into the fetch, and the hostname
+    # constraint is applied client-side when keying.
+    assert len(auditor.origin.source_records) == 2
+    assert set(diff_res.missing) == {"sn2"}
@@ -0,0 +1,90 @@
+from click.testing import CliRunner
+
+from nauti.auditor import Auditor
+from nauti.diff import diff
+from nauti.tasks.reconile import Reconciler
+from nauti.cli.sync import cli_sync
+
+from fakes import FakeSource, FakeDevices, FakeReconciler, make_records, keyed
+
+
+def make_diff():
+    # sn0 is added, sn1 is updated, and sn9 is deleted; the added sn0 uses
+    # the hostname of the deleted sn9.
+
+    origin = make_records(2)
+    origin[1]["model"] = "m2"
+    target = make_records(1, start=1)
+    target.append(dict(make_records(1, start=9)[0], hostname="h0"))
+    return diff(keyed(origin), keyed(target))
+
+
+def phase_order(writes):
+    return [action for event, action, _ in writes if event == "start"]
+
+
+async def test_reconcile_phases_sequential_by_default():
+    reconciler = FakeReconciler(make_diff())
+    assert reconciler.concurrent_phases is False
+
+    reconciler.options = ("all",)
+    await reconciler.reconcile()
+
+    assert phase_order(reconciler.writes) == ["add", "del", "upd"]
+    assert [event for event, *_ in reconciler.writes[:2]] == ["start", "done"]
+
+
+async def test_reconcile_phases_concurrent_opt_in():
+    class ConcurrentReconciler(FakeReconciler):
+        concurrent_phases = True
+        conflict_fields = ("hostname",)
+
+    reconciler = ConcurrentReconciler(make_diff())
+    reconciler.options = ("all",)
+    await reconciler.reconcile()
+
+    writes = reconciler.writes
+    assert sorted(phase_order(writes)) == ["add", "del", "upd"]
+
+    # the conflicting add is only started once the delete is done.
+    assert writes.index(("done", "del", "sn9")) < writes.index(("start", "add", "sn0"))
+    assert "sn9" not in reconciler.target.items
+    assert reconciler.target.items["sn0"]["hostname"] == "h0"
+
+
+def test_cli_concurrent_phases_option(monkeypatch, cli_loop):
+    reconcilers = list()
+
+    def get_auditor(*vargs, **kwargs):
+        origin, target = make_records(2), make_records(1, start=5)
+        return Auditor(
+            FakeDevices(FakeSource(records=origin)),
+            FakeDevices(FakeSource(records=target)),
+        )
+
+    def get_reconciler(diff_res, name="default"):
+        reconcilers.append(FakeReconciler(diff_res))
+        return reconcilers[-1]
+
+    monkeypatch.setattr(Auditor, "get_registered", staticmethod(get_auditor))
+    monkeypatch.setattr(Reconciler, "get_registered", staticmethod(get_reconciler))
+
+    def sync(*args):
+        args = [
+            "--origin",
+            "fake",
+            "--target",
+            "fake",
+            "--collection",
+            "devices",
+            *args,
+        ]
+        return CliRunner().invoke(cli_sync, [*args, "--sync", "all"])
+
+    assert "(sequential phases)" in sync("--dry-run").output
+    assert "(concurrent phases)" in sync("--dry-run", "--concurrent-phases").output
+
+    result = sync("--concurrent-phases")
+    assert result.exit_code == 0, result.output
+    assert reconcilers[-1].concurrent_phases is True
+    assert set(phase_order(reconcilers[-1].writes)) == {"add", "del"}
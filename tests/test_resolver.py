@@ -0,0 +1,53 @@
+import asyncio
+
+from nauti.diff import diff
+from nauti.resolver import RefResolver
+
+from fakes import FakeReconciler, make_records, keyed
+
+
+class Fetcher(object):
+    def __init__(self, known):
+        self.known = known
+        self.calls = list()
+
+    async def __call__(self, keys):
+        self.calls.append(list(keys))
+        await asyncio.sleep(0)
+        return {key: self.known[key] for key in keys if key in self.known}
+
+
+async def test_resolver_singleflight_and_cache():
+    fetch = Fetcher({"h0": 0, "h1": 1})
+    resolver = RefResolver(fetch)
+
+    found = await asyncio.gather(*(resolver.get("h0") for _ in range(5)))
+    assert found == [0] * 5
+    assert fetch.calls == [["h0"]]
+
+    assert await resolver.get("h0") == 0
+    assert await resolver.get("nope") is None
+    assert "nope" not in resolver
+
+
+async def test_resolver_prefetch_batches():
+    fetch = Fetcher({f"h{i}": i for i in range(10)})
+    resolver = RefResolver(fetch, batch_size=4, maxsize=8)
+
+    await resolver.prefetch(f"h{i}" for i in range(10))
+    assert list(map(len, fetch.calls)) == [4, 4, 2]
+    assert len(resolver) == 8
+
+
+class RefReconciler(FakeReconciler):
+    references = {"devices": "hostname", "sites": "site"}
+
+
+async def test_reconcile_prefetch_existing_resolvers():
+    reconciler = RefReconciler(diff(keyed(make_records(3)), keyed([])))
+    fetch = Fetcher({})
+    reconciler.target.source.resolver("devices", fetch)
+
+    # the "sites" resolver has not been created; its prefetch is skipped.
+    await reconciler.prefetch()
+    assert sorted(fetch.calls[0]) == ["h0", "h1", "h2"]
@@ -0,0 +1,45 @@
+import logging
+
+from nauti.auditor import Auditor
+
+from fakes import FakeSource, FakeDevices, SiteDevices, make_records
+
+
+def make_auditor(cls):
+    origin = make_records(2, site="a") + make_records(3, start=2, site="b")
+    target = make_records(1, site="a") + make_records(2, start=3, site="b")
+    return Auditor(
+        origin=cls(FakeSource(records=origin)),
+        target=cls(FakeSource(records=target)),
+        shard_field="site",
+    )
+
+
+async def audit_shards(auditor):
+    results = dict()
+
+    async def on_diff(shard, diff_res):
+        results[shard] = (len(diff_res.missing), len(diff_res.extras))
+
+    await auditor.audit_shards(["a", "b"], on_diff=on_diff)
+    return results
+
+
+async def test_audit_shards_pushdown(caplog):
+    auditor = make_auditor(SiteDevices)
+    assert auditor.shard_unpushed("a") == []
+
+    with caplog.at_level(logging.WARNING, logger="nauti"):
+        assert await audit_shards(auditor) == {"a": (1, 0), "b": (1, 0)}
+
+    assert "push down" not in caplog.text
+
+
+async def test_audit_shards_warns_without_pushdown(caplog):
+    auditor = make_auditor(FakeDevices)
+    assert auditor.shard_unpushed("a") == [auditor.origin, auditor.target]
+
+    with caplog.at_level(logging.WARNING, logger="nauti"):
+        assert await audit_shards(auditor) == {"a": (1, 0), "b": (1, 0)}
+
+    assert caplog.text.count("cannot push down the shard constraint") == 2
@@ -0,0 +1,86 @@
+import httpx
+import pytest
+
+from nauti.stats import LatencyStats
+from nauti.transport import PoolTimingTransport, client_timeout, create_client
+
+from fakes import FakeSource
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """emits the trace events of the httpcore connection pool"""
+
+    def __init__(self, events):
+        self.events = events
+
+    async def handle_async_request(self, request):
+        trace = request.extensions.get("trace")
+        for event_name in self.events:
+            await trace(event_name, {})
+        return httpx.Response(200, json={})
+
+
+async def test_pool_timing_transport():
+    stats = LatencyStats()
+    seen = list()
+
+    async def prev_trace(event_name, info):
+        seen.append(event_name)
+
+    events = [
+        "connection.connect_tcp.started",
+        "http11.send_request_headers.started",
+    ]
+    transport = PoolTimingTransport(TracingTransport(events), stats)
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        await client.get("http://api/", extensions={"trace": prev_trace})
+        await client.get("http://api/")
+
+    # one pool wait per request, and the request trace is still called.
+    assert stats.count == 2
+    assert seen == events
+
+
+def test_client_timeout():
+    timeout = client_timeout(dict(timeout=10, connect_timeout=2))
+    assert (timeout.connect, timeout.read, timeout.write, timeout.pool) == (
+        2,
+        10,
+        10,
+        10,
+    )
+    assert client_timeout({}).read == 60.0
+
+
+async def test_create_client():
+    source = FakeSource(options=dict(concurrency=7, compression=False, read_timeout=5))
+    client = create_client(source, base_url="http://api", headers={"X-Test": "1"})
+
+    async with client:
+        assert isinstance(client._transport, PoolTimingTransport)
+        assert client._transport.stats is source.pool_stats
+
+        pool = client._transport.transport._pool
+        assert pool._max_connections == pool._max_keepalive_connections == 7
+
+        assert client.headers["Accept-Encoding"] == "identity"
+        assert client.headers["X-Test"] == "1"
+        assert client.timeout.read == 5
+        assert client.event_hooks["response"]
+
+
+def test_create_client_http2_requires_h2(monkeypatch):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_h2(name, *vargs, **kwargs):
+        if name == "h2":
+            raise ImportError(name)
+        return real_import(name, *vargs, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_h2)
+
+    with pytest.raises(RuntimeError, match="h2 package"):
+        create_client(FakeSource(options=dict(http2=True)))
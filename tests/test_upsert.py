@@ -0,0 +1,42 @@
+from fakes import FakeDevices, make_records, keyed
+
+
+class UidDevices(FakeDevices):
+    def record_uid(self, rec):
+        return rec["id"]
+
+
+def make_collection():
+    records = make_records(3)
+    for i, rec in enumerate(records):
+        rec["id"] = i
+    return keyed(records, UidDevices)
+
+
+def test_upsert_replaces_changed_key():
+    col = make_collection()
+    col.rekey("hostname")
+
+    rec = dict(col.source_record_keys["h1"], hostname="renamed")
+    assert col.upsert_records([rec]) == ["renamed"]
+
+    assert set(col.items) == {"h0", "renamed", "h2"}
+    assert col.uid_keys[1] == "renamed"
+
+
+def test_remove_records_by_uid():
+    col = make_collection()
+    col.remove_records([{"id": 2}])
+
+    assert set(col.items) == {"sn0", "sn1"}
+    assert set(col.source_record_keys) == {"sn0", "sn1"}
+    assert 2 not in col.uid_keys
+
+
+def test_rekey_without_itemize():
+    col = make_collection()
+    col.itemize = None
+
+    col.rekey("hostname", with_translate=str.upper)
+    assert set(col.items) == {"H0", "H1", "H2"}
+    assert col.uid_keys[0] == "H0"
@@ -0,0 +1,93 @@
+import asyncio
+
+from nauti.auditor import Auditor
+from nauti.watch import WatchTask, Watcher
+
+from fakes import FakeSource, FakeDevices, make_records
+
+
+def make_task(origin_records, target_records):
+    auditor = Auditor(
+        origin=FakeDevices(FakeSource(records=origin_records)),
+        target=FakeDevices(FakeSource(records=target_records)),
+    )
+    return WatchTask(auditor, interval=60)
+
+
+async def test_watch_refresh_keeps_served_collections():
+    task = make_task(make_records(3), make_records(2))
+    await task.run_once()
+
+    served_res = task.diff_res
+    served_target = served_res.target
+    assert len(served_res.missing) == 1
+
+    await task.run_once()
+
+    # the previous results, and their collections, are left intact so that a
+    # concurrent /diff request can continue to read them.
+    assert task.diff_res is not served_res
+    assert len(served_target.items) == 2
+    assert all(key in served_target.items for key in served_res.changes)
+    assert len(task.diff_res.missing) == 1
+    assert task.auditor.origin is task.diff_res.origin
+
+
+async def test_watch_relogin_after_failure():
+    class ExpiringSource(FakeSource):
+        logins = 0
+        expired = True
+
+        async def login(self, *vargs, **kwargs):
+            self.logins += 1
+            self.expired = False
+
+    class ExpiringDevices(FakeDevices):
+        async def fetch(self, **fetch_args):
+            if self.source.expired:
+                raise RuntimeError("session expired")
+            await super().fetch(**fetch_args)
+
+    source = ExpiringSource(records=make_records(2))
+    task = WatchTask(
+        Auditor(origin=ExpiringDevices(source), target=FakeDevices(FakeSource())),
+        interval=60,
+    )
+
+    await task.run_once()
+    assert task.last_error == "session expired"
+    assert task.needs_login
+
+    await task.run_once()
+    assert task.last_error is None
+    assert source.logins == 1
+    assert len(task.diff_res.missing) == 2
+
+
+async def http_get(port, request_line: bytes):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(request_line + b"\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+async def test_watch_http_bad_request():
+    task = make_task(make_records(2), [])
+    await task.run_once()
+
+    watcher = Watcher([task], sources={})
+    server = await asyncio.start_server(watcher.handle_http, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    async with server:
+        assert (await http_get(port, b"GARBAGE")).startswith(b"HTTP/1.1 400")
+        assert (await http_get(port, b"\xff\xfe")).startswith(b"HTTP/1.1 400")
+        assert (await http_get(port, b"POST /status HTTP/1.1")).startswith(
+            b"HTTP/1.1 405"
+        )
+
+        response = await http_get(port, f"GET /diff/{task.ident} HTTP/1.1".encode())
+        assert response.startswith(b"HTTP/1.1 200")
+        assert response.count(b'"action": "add"') == 2
@@ -0,0 +1,66 @@
+from nauti.diff import diff
+
+from fakes import FakeReconciler, make_records, keyed
+
+
+class CreatingReconciler(FakeReconciler):
+    resolves = {"devices": "hostname"}
+
+    async def add_items(self):
+        # an unrelated update, made within the add phase, is not applied to
+        # the target collection.
+        await self.target.source.update(
+            {"sn1": {"note": "unrelated"}},
+            callback=None,
+            creator=lambda key, value: self.noop(value),
+        )
+        await super().add_items()
+
+    @staticmethod
+    async def noop(value):
+        return value
+
+
+def make_reconciler(cls=CreatingReconciler):
+    origin = make_records(3)
+    origin[1]["model"] = "m2"
+    target = make_records(2, start=1)
+    reconciler = cls(diff(keyed(origin), keyed(target)))
+    reconciler.options = ("all",)
+
+    # the added records are returned as created; the updates return the
+    # changes, which are not a source record.
+    reconciler.target.response_record = lambda res: (
+        dict(res, id=100) if "sn" in res else None
+    )
+    return reconciler
+
+
+async def test_write_through_from_phase_callbacks():
+    reconciler = make_reconciler()
+
+    async def fetch_many(keys):
+        return {}
+
+    resolver = reconciler.target.source.resolver("devices", fetch_many)
+    await reconciler.reconcile()
+
+    target = reconciler.target
+    assert target.items["sn0"]["hostname"] == "h0"
+    assert target.items["sn1"]["model"] == "m2"
+    assert "note" not in target.items["sn1"]
+
+    # the added record is resolved without a fetch.
+    assert await resolver.get("h0") == dict(make_records(1)[0], id=100)
+    assert resolver.misses == 0
+
+
+async def test_write_through_disabled():
+    class NoWriteThrough(CreatingReconciler):
+        write_through = False
+
+    reconciler = make_reconciler(NoWriteThrough)
+    await reconciler.reconcile()
+
+    assert "sn0" not in reconciler.target.items
+    assert reconciler.target.items["sn1"]["model"] == "m1"